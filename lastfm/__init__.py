@@ -13,6 +13,7 @@ __package__ = "lastfm"
 
 from lastfm.album import Album
 from lastfm.api import Api
+from lastfm.asyncapi import AsyncApi
 from lastfm.artist import Artist
 from lastfm.error import LastfmError
 from lastfm.event import Event
@@ -27,6 +28,6 @@ from lastfm.user import User
 from lastfm.venue import Venue
 from lastfm.shout import Shout
 
-__all__ = ['LastfmError', 'Api', 'Album', 'Artist', 'Event',
+__all__ = ['LastfmError', 'Api', 'AsyncApi', 'Album', 'Artist', 'Event',
            'Location', 'Country', 'Group', 'Playlist', 'Tag',
            'Tasteometer', 'Track', 'User', 'Venue', 'ObjectCache']
\ No newline at end of file
@@ -9,6 +9,7 @@ __package__ = "lastfm"
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.decorators import cached_property, top_property
+from lastfm.util.schema import Schema, Arg, Date, Entity, EntityList, Flag, Images, Int
 
 @mixin("crawlable", "taggable", "searchable", 
     "cacheable", "property_adder")
@@ -19,6 +20,7 @@ class Album(LastfmBase):
             "streamable"]
         fillable_properties = ["id", "mbid", "url",
             "release_date", "image", "stats", ]
+        key_properties = ["name", "artist"]
         
     def init(self, api, subject = None, **kwargs):
         """
@@ -56,14 +58,18 @@ class Album(LastfmBase):
             raise InvalidParametersError("api reference must be supplied as an argument")
         self._api = api
         super(Album, self).init(**kwargs)
-        self._stats = hasattr(self, "_stats") and Stats(
-             subject = self,
-             listeners = self._stats.listeners,
-             playcount = self._stats.playcount,
-             match = self._stats.match,
-             rank = self._stats.rank
-        ) or None
+        self._stats = hasattr(self, "_stats") and self._own_stats(self._stats) or None
         self._subject = subject
+
+    def _own_stats(self, stats):
+        # a copy of the stats, with this object as their subject
+        return Stats(
+                     subject = self,
+                     listeners = stats.listeners,
+                     playcount = stats.playcount,
+                     match = stats.match,
+                     rank = stats.rank
+                     )
         
     @cached_property
     def top_tags(self):
@@ -127,16 +133,20 @@ class Album(LastfmBase):
         @note: Use the L{Api.get_album} method instead of using this method directly.
         """
         data = Album._fetch_data(api, artist, album, mbid)
-        a = Album(
-                  api,
-                  name = data.findtext('name'),
-                  artist = Artist(
-                                  api,
-                                  name = data.findtext('artist'),
-                                  ),
-                  )
+        a = Album._create_from_info(api, data)
         a._fill_info()
         return a
+
+    @staticmethod
+    def _create_from_info(api, data):
+        return Album(
+                     api,
+                     name = data.findtext('name'),
+                     artist = Artist(
+                                     api,
+                                     name = data.findtext('artist'),
+                                     ),
+                     )
     
     @staticmethod
     def _get_all(seed_album):
@@ -159,6 +169,12 @@ class Album(LastfmBase):
                 artist = None,
                 album = None,
                 mbid = None):
+        return api._fetch_data(Album._info_params(artist, album, mbid)).find('album')
+
+    @staticmethod
+    def _info_params(artist = None,
+                     album = None,
+                     mbid = None):
         params = {'method': 'album.getInfo'}
         if not ((artist and album) or mbid):
             raise InvalidParametersError("either (artist and album) or mbid has to be given as argument.")
@@ -166,47 +182,16 @@ class Album(LastfmBase):
             params.update({'artist': artist, 'album': album})
         elif mbid:
             params.update({'mbid': mbid})
-        return api._fetch_data(params).find('album')
-    
-    def _fill_info(self):
-        data = Album._fetch_data(self._api, self.artist.name, self.name)
-        self._id = int(data.findtext('id'))
-        self._mbid = data.findtext('mbid')
-        self._url = data.findtext('url')
-        self._release_date = data.findtext('releasedate') and data.findtext('releasedate').strip() and \
-                            datetime(*(time.strptime(data.findtext('releasedate').strip(), '%d %b %Y, 00:00')[0:6]))
-        self._image = dict([(i.get('size'), i.text) for i in data.findall('image')])
-        if not self._stats:
-            self._stats = Stats(
-                       subject = self,
-                       listeners = int(data.findtext('listeners')),
-                       playcount = int(data.findtext('playcount')),
-                       )
-        self._top_tags = [
-                    Tag(
-                        self._api,
-                        subject = self,
-                        name = t.findtext('name'),
-                        url = t.findtext('url')
-                        ) 
-                    for t in data.findall('toptags/tag')
-                    ]
-                         
-    @staticmethod
-    def _search_yield_func(api, album):
-        return Album(
-                      api,
-                      name = album.findtext('name'),
-                      artist = Artist(
-                                      api,
-                                      name = album.findtext('artist')
-                                      ),
-                      id = int(album.findtext('id')),
-                      url = album.findtext('url'),
-                      image = dict([(i.get('size'), i.text) for i in album.findall('image')]),
-                      streamable = (album.findtext('streamable') == '1'),
-                      )
-    
+        return params
+
+    def _fill_info(self, data = None):
+        if data is None:
+            data = Album._fetch_data(self._api, self.artist.name, self.name)
+        info = _INFO_SCHEMA.extract(data, self._api, self)
+        if self._stats:
+            del info['stats']
+        super(Album, self).init(**info)
+
     @staticmethod
     def _hash_func(*args, **kwds):
         try:
@@ -235,12 +220,38 @@ class Album(LastfmBase):
         return "<lastfm.Album: '%s' by %s>" % (self.name, self.artist.name)
         
                      
-from datetime import datetime
-import time
-
 from lastfm.api import Api
 from lastfm.artist import Artist
 from lastfm.error import InvalidParametersError
 from lastfm.playlist import Playlist
 from lastfm.stats import Stats
-from lastfm.tag import Tag
\ No newline at end of file
+from lastfm.tag import Tag
+
+_SEARCH_SCHEMA = Schema(Album, {
+    'name':       'name',
+    'artist':     Entity(Schema(Artist, {'name': 'artist'})),
+    'id':         Int('id'),
+    'url':        'url',
+    'image':      Images(),
+    'streamable': Flag('streamable'),
+    }, element_last = True)
+
+Album._search_yield_func = staticmethod(_SEARCH_SCHEMA.extract)
+
+_INFO_SCHEMA = Schema(dict, {
+    'id':           Int('id'),
+    'mbid':         'mbid',
+    'url':          'url',
+    'release_date': Date('releasedate', '%d %b %Y, 00:00'),
+    'image':        Images(),
+    'stats':        Entity(Schema(Stats, {
+                        'subject':   Arg('subject'),
+                        'listeners': Int('listeners'),
+                        'playcount': Int('playcount'),
+                        }, params = ('subject',), args = ())),
+    'top_tags':     EntityList(Schema(Tag, {
+                        'subject': Arg('subject'),
+                        'name':    'name',
+                        'url':     'url',
+                        }, params = ('api', 'subject')), 'toptags/tag'),
+    }, params = ('api', 'subject'), args = ())
\ No newline at end of file
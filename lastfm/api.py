@@ -6,22 +6,63 @@ __version__ = "0.2"
 __license__ = "GNU Lesser General Public License"
 __package__ = "lastfm"
 
+import re
 from threading import Lock
 from lastfm.util import Wormhole, logging
 from lastfm.decorators import cached_property, async_callback
 _lock = Lock()
+_rate_limiters = {}
 
 class Api(object):
     """The class representing the last.fm web services API."""
 
     DEFAULT_CACHE_TIMEOUT = 3600 # cache for 1 hour
     """Default file cache timeout, in seconds"""
+
+    CREDENTIAL_PARAMS = ('api_key', 'sk', 'api_sig')
+    """The parameters left out of the cache keys of the unsigned, sessionless calls"""
+
+    DEFAULT_NEGATIVE_CACHE_TIMEOUT = 300 # cache errors for 5 minutes
+    """
+    Default cache timeout, in seconds, of the error responses which occur every time
+    the request is tried, like the ones for missing resources. The other errors are
+    never cached.
+    """
+
+    DEFAULT_CACHE_POLICY = {
+        'album.getInfo': 7*86400,
+        'artist.getInfo': 7*86400,
+        'track.getInfo': 7*86400,
+        'event.getInfo': 86400,
+        'group.getMembers': 86400,
+        'artist.getEvents': 15*60,
+        'geo.getEvents': 15*60,
+        'user.getEvents': 15*60,
+        'venue.getEvents': 15*60,
+        'user.getRecentTracks': 0,
+        'auth.*': 0
+    }
+    """
+    Default cache timeouts, in seconds, for the web service methods. A name like
+    C{'auth.*'} applies to all the methods of a package. A timeout of 0 means the
+    responses of the method are never cached. The methods not listed here use the
+    L{DEFAULT_CACHE_TIMEOUT}.
+    """
     
     API_ROOT_URL = "http://ws.audioscrobbler.com/2.0/"
     """URL of the webservice API root"""
     
     FETCH_INTERVAL = 200
     """The minimum interval between successive HTTP request, in milliseconds"""
+
+    FETCH_BURST = 1
+    """The number of HTTP requests which can be sent back to back, without waiting"""
+
+    FETCH_LEASE_WAIT = 30
+    """
+    The maximum time, in seconds, to wait for another process sharing the cache to
+    fetch a response, when the cache supports fetch leases like the L{CacheClient}
+    """
     
     SEARCH_XMLNS = "http://a9.com/-/spec/opensearch/1.1/"
     
@@ -66,17 +107,30 @@ class Api(object):
         self._secret = secret
         self._session_key = session_key
         self._urllib = urllib2
+        self._transport = UrllibTransport(urllib2)
         self._cache_timeout = Api.DEFAULT_CACHE_TIMEOUT
+        self._cache_policy = dict(Api.DEFAULT_CACHE_POLICY)
+        self._negative_cache_timeout = Api.DEFAULT_NEGATIVE_CACHE_TIMEOUT
+        self._stale_while_revalidate = 0
+        self._stale_if_error = 0
+        self._revalidating = set()
+        self._revalidating_lock = Lock()
         self._initialize_request_headers(request_headers)
         self._initialize_user_agent()
         self._input_encoding = input_encoding
         self._no_cache = no_cache
         self._logfile = logfile
-        self._last_fetch_time = datetime.now()
+        self._rate_limiter = self._get_default_rate_limiter()
+        self._single_flight = SingleFlight()
+        self._parsed_cache = None
+        self._streaming = False
+        self._lazy = False
+        self._format = 'xml'
+        self._metrics = Metrics()
         if self._no_cache:
             self._cache = None
         else:
-            self._cache = FileCache()
+            self._cache = MemoryCache(backend = FileCache(codec = ZlibCodec()))
         
         if debug is not None:
             if debug in Api.DEBUG_LEVELS:
@@ -159,31 +213,294 @@ class Api(object):
 
     def set_cache(self, cache):
         """
-        Override the default cache.  Set to None to prevent caching.
+        Override the default cache. By default, the responses are kept in a L{MemoryCache}
+        in front of a L{FileCache} storing them compressed.  Set to None to prevent caching.
+        To share one cache between the processes of a host, run a L{CacheServer} and
+        set a L{CacheClient} connected to it.
         
         @param cache: an instance that supports the same API as the L{FileCache}
         @type cache: L{FileCache}
         """
         self._cache = cache
 
+    @property
+    def parsed_cache(self):
+        """
+        The cache of the parsed responses
+        @rtype: L{ParsedCache}
+        """
+        return self._parsed_cache
+
+    def set_parsed_cache(self, parsed_cache):
+        """
+        Keep the parsed and checked responses in a cache in front of the response cache,
+        so that the hits on it skip the parsing of the response. It is not used by default.
+        Set to None to switch it off.
+
+        @param parsed_cache: an instance that supports the same API as the L{ParsedCache}
+        @type parsed_cache: L{ParsedCache}
+        """
+        self._parsed_cache = parsed_cache
+
+    def stats(self):
+        """
+        A snapshot of the counters and histograms of the web service calls made through
+        this Api. For each web service method, and for all of them together, there are
+        counters of the cache hits (of the response cache and of the parsed response
+        cache), misses, stale responses served, errors, bytes read from and written to
+        the cache, requests sent and bytes downloaded, and histograms of the age of the
+        cached responses served, the upstream latency, the parse latency and the time
+        spent waiting for the rate limiter, in seconds.
+
+        @return:  a dict with the snapshots of the methods under C{'methods'}, of all
+                  the methods together under C{'total'}, and the counters of the
+                  L{single_flight} under C{'single_flight'}
+        @rtype:   L{dict}
+
+        @see:     L{Metrics.snapshot}
+        """
+        snapshot = self._metrics.snapshot()
+        snapshot['single_flight'] = {
+            'executed': self._single_flight.executed,
+            'coalesced': self._single_flight.coalesced
+        }
+        return snapshot
+
+    def reset_stats(self):
+        """Reset the counters and histograms returned by L{stats}."""
+        self._metrics.reset()
+
     def set_urllib(self, urllib):
         """
-        Override the default urllib implementation.
+        Override the default urllib implementation. This also resets the transport to
+        an L{UrllibTransport} using the provided implementation.
 
         @param urllib: an instance that supports the same API as the urllib2 module
         @type urllib: urllib2
         """
         self._urllib = urllib
+        self._transport = UrllibTransport(urllib)
+
+    @property
+    def transport(self):
+        """
+        The transport used to send the HTTP requests
+        @rtype: L{UrllibTransport} OR L{PooledTransport}
+        """
+        return self._transport
+
+    def set_transport(self, transport):
+        """
+        Override the default transport. Use a L{PooledTransport} to reuse keep-alive
+        connections to the web service.
+
+        @param transport: an instance that supports the same API as the L{UrllibTransport}
+        @type transport: L{UrllibTransport}
+        """
+        self._transport = transport
+
+    @property
+    def rate_limiter(self):
+        """
+        The rate limiter for the HTTP requests
+        @rtype: L{RateLimiter}
+        """
+        return self._rate_limiter
+
+    def set_rate_limiter(self, rate_limiter):
+        """
+        Override the default rate limiter. By default, all the Api objects sharing an
+        API key share a rate limiter allowing one request per L{FETCH_INTERVAL}.
+        Set to None to switch off rate limiting.
+
+        @param rate_limiter: an instance that supports the same API as the L{RateLimiter}
+        @type rate_limiter: L{RateLimiter}
+        """
+        self._rate_limiter = rate_limiter
+
+    @property
+    def single_flight(self):
+        """
+        The coalescer of the identical requests made at the same time. Its counters
+        tell how many requests were sent and how many were coalesced.
+        @rtype: L{SingleFlight}
+        """
+        return self._single_flight
 
     def set_cache_timeout(self, cache_timeout):
         """
-        Override the default cache timeout.
+        Override the default cache timeout. It applies to the web service methods
+        which do not have a cache timeout of their own.
 
         @param cache_timeout: time, in seconds, that responses should be reused
         @type cache_timeout: L{int}
+
+        @see: L{set_cache_policy}
         """
         self._cache_timeout = cache_timeout
 
+    def set_negative_cache_timeout(self, negative_cache_timeout):
+        """
+        Override the default cache timeout of the error responses. Only the errors which
+        occur every time the request is tried (like a missing resource) are cached, the
+        transient ones (like service offline, or rate limit exceeded) never are.
+
+        @param negative_cache_timeout: time, in seconds, that error responses should be
+                                       reused. 0 to never cache them.
+        @type negative_cache_timeout:  L{int}
+
+        @see: L{lastfm.error.negative_cacheable_errors}
+        """
+        self._negative_cache_timeout = negative_cache_timeout
+
+    def set_stale_while_revalidate(self, stale_while_revalidate):
+        """
+        Serve the cached responses for some time after they have expired. An expired
+        response is returned right away, and is refreshed in the background, on the
+        shared L{ThreadPool}. Only one refresh per URL is done at a time.
+
+        @param stale_while_revalidate: time, in seconds, after the expiry of a cached
+                                       response for which it can still be served. 0
+                                       to switch it off.
+        @type stale_while_revalidate:  L{int}
+        """
+        self._stale_while_revalidate = stale_while_revalidate
+
+    def set_stale_if_error(self, stale_if_error):
+        """
+        Serve the expired cached responses when the web service can not be reached
+        or fails with a server error.
+
+        @param stale_if_error: time, in seconds, after the expiry of a cached
+                               response for which it can be served in place of an
+                               error. 0 to switch it off.
+        @type stale_if_error:  L{int}
+        """
+        self._stale_if_error = stale_if_error
+
+    @property
+    def format(self):
+        """
+        The format of the responses requested from the web service, C{'xml'} or C{'json'}
+        @rtype: L{str}
+        """
+        return self._format
+
+    def set_format(self, format):
+        """
+        Set the format of the responses requested from the web service. The JSON
+        responses are read by the JSON functions of the schemas of the entities (see
+        L{lastfm.util.Schema}), and the rest of them through L{JsonElement}s, so the
+        objects created from them are the same as the ones created from the XML
+        responses. The write methods, the playlists and the streaming mode always
+        use XML.
+
+        @param format: C{'xml'} or C{'json'}
+        @type format:  L{str}
+
+        @raise ValueError: if the format is not supported
+        @raise ImportError: if the JSON format is asked for, but neither the json
+                            nor the simplejson module is available
+        """
+        if format not in ('xml', 'json'):
+            raise ValueError("format must be 'xml' or 'json'")
+        if format == 'json' and jsontree.json is None:
+            raise ImportError("Install the simplejson package for using the JSON format")
+        self._format = format
+
+    @property
+    def streaming(self):
+        """
+        Whether the large paginated responses are parsed incrementally
+        @rtype: L{bool}
+        """
+        return self._streaming
+
+    def set_streaming(self, streaming):
+        """
+        Parse the large paginated responses (the tracks and albums of the libraries,
+        the recent tracks of the users and the members of the groups) incrementally,
+        as they are downloaded. Each item is handed over as soon as it is parsed and
+        then dropped, so the whole response is never kept as a tree, and is kept as
+        bytes only if it is to be cached. A response is cached once all its items have
+        been read, and the stale cached responses are not served in this mode.
+
+        @param streaming: True to parse the large responses incrementally
+        @type streaming:  L{bool}
+        """
+        self._streaming = streaming and hasattr(ElementTree, 'iterparse')
+
+    @property
+    def lazy(self):
+        """
+        Whether the objects are created with only their keys, and read the rest on first use
+        @rtype: L{bool}
+        """
+        return self._lazy
+
+    def set_lazy(self, lazy):
+        """
+        Create the artists, albums, tracks, tags, events and venues of the responses
+        with only the properties identifying them, like the names of the tracks of a
+        library. The texts of their other properties are recorded in a tuple, and the
+        elements are not kept. The other properties of an object are all computed
+        from its record when one of them is first used.
+
+        It is off by default: it saves time and memory when only the identifying
+        properties of most of the objects are used, but reading all the properties
+        of all the objects is a little slower than in the default, eager mode.
+
+        @param lazy: True to create the objects lazily
+        @type lazy:  L{bool}
+        """
+        self._lazy = lazy
+
+    @property
+    def cache_policy(self):
+        """
+        The cache timeouts, in seconds, of the web service methods
+        @rtype: L{dict}
+        """
+        return self._cache_policy
+
+    def set_cache_policy(self, method, cache_timeout):
+        """
+        Override the cache timeout of a web service method, or of all the methods of
+        a package.
+
+        @param method:          name of the method, like C{'artist.getInfo'}, or
+                                of the package followed by C{'.*'}, like C{'auth.*'}
+        @type method:           L{str}
+        @param cache_timeout:   time, in seconds, that responses should be reused. 0
+                                to never cache the responses, None to use the default
+                                cache timeout.
+        @type cache_timeout:    L{int}
+
+        @see: L{DEFAULT_CACHE_POLICY}
+        """
+        if cache_timeout is None:
+            self._cache_policy.pop(method, None)
+        else:
+            self._cache_policy[method] = cache_timeout
+
+    def get_cache_timeout(self, method = None):
+        """
+        Get the cache timeout of a web service method.
+
+        @param method:  name of the method (optional)
+        @type method:   L{str}
+
+        @return:        time, in seconds, that responses of the method are reused
+        @rtype:         L{int}
+        """
+        if method:
+            if method in self._cache_policy:
+                return self._cache_policy[method]
+            wildcard = method.split('.', 1)[0] + '.*'
+            if wildcard in self._cache_policy:
+                return self._cache_policy[wildcard]
+        return self._cache_timeout
+
     def set_user_agent(self, user_agent):
         """
         Override the default user agent.
@@ -609,6 +926,74 @@ class Api(object):
         """
         return Venue.search(self, search_item = venue, limit = limit, country = country)
 
+    def fetch_many(self, requests, max_workers = 4):
+        """
+        Run many independent web service calls concurrently, on a bounded pool of
+        worker threads. The calls still go through the rate limiter, but the ones
+        which can be answered from the cache are answered right away.
+        
+        @param requests:     the calls to run. Each item is either a dict of the web
+                             service method parameters (like C{{'method': 'artist.getInfo',
+                             'artist': 'Bon Jovi'}}), or an entity object (like an
+                             L{Artist}) whose info is to be filled.
+        @type requests:      L{list} of L{dict} OR L{LastfmBase}
+        @param max_workers:  maximum number of calls run at the same time (optional)
+        @type max_workers:   L{int}
+        
+        @return:             a (result, error) pair for each request, in the order of the
+                             requests. The result is the parsed response for the parameter
+                             dicts and the filled entity for the entities. If the call failed,
+                             the result is None and error is the exception raised.
+        @rtype:              L{list} of L{tuple}
+        """
+        pool = ThreadPool(max_workers)
+        futures = []
+        try:
+            for request in requests:
+                if isinstance(request, dict):
+                    futures.append(self._fetch_many_data(pool, request))
+                else:
+                    futures.append(pool.submit(self._fill_entity, request))
+        finally:
+            pool.shutdown(wait = False)
+
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is None:
+                results.append((future.result(), None))
+            else:
+                results.append((None, error))
+        return results
+
+    def _fetch_many_data(self, pool, params):
+        if not self._no_cache:
+            method = params.get('method')
+            key = self._get_cache_key(Api.API_ROOT_URL, self._prepare_params(params))
+            cache_timeout = self.get_cache_timeout(method)
+            if self._parsed_cache is not None and cache_timeout:
+                data = self._parsed_cache.Get(key, cache_timeout)
+                if data is not None:
+                    self._metrics.incr(method, 'parsed_hits')
+                    future = Future()
+                    future.set_result(data)
+                    return future
+            xml = self._get_cached_url_data(key, cache_timeout)
+            if xml is not None:
+                self._record_hit(method, 'hits', xml,
+                    time.time() - (self._cache.GetCachedTime(key) or time.time()))
+                future = Future()
+                try:
+                    future.set_result(self._parse_response(method, xml))
+                except Exception, e:
+                    future.set_exception(e)
+                return future
+        return pool.submit(self._fetch_data, params)
+
+    def _fill_entity(self, entity):
+        entity._fill_info()
+        return entity
+
     @Wormhole.entrance('lfm-api-url')
     def _build_url(self, url, path_elements=None, extra_params=None):
         # Break url into consituent parts
@@ -646,13 +1031,6 @@ class Api(object):
                      (self._urllib.__version__, __version__)
         self.set_user_agent(user_agent)
 
-    def _get_opener(self, url):
-        opener = self._urllib.build_opener()
-        if self._urllib._opener is not None:
-            opener = self._urllib.build_opener(*self._urllib._opener.handlers)
-        opener.addheaders = self._request_headers.items()
-        return opener
-
     def _encode(self, s):
         if self._input_encoding:
             return unicode(s, self._input_encoding).encode('utf-8')
@@ -667,56 +1045,342 @@ class Api(object):
             keys.sort()
             return urllib.urlencode([(k, self._encode(parameters[k])) for k in keys if parameters[k] is not None])
 
-    def _read_url_data(self, opener, url, data = None):
+    def _get_default_rate_limiter(self):
         with _lock:
-            now = datetime.now()
-            delta = now - self._last_fetch_time
-            delta = delta.seconds*1000 + float(delta.microseconds)/1000
-            if delta < Api.FETCH_INTERVAL:
-                time.sleep((Api.FETCH_INTERVAL - delta)/1000)
-            url_data = opener.open(url, data).read()
-            self._last_fetch_time = datetime.now()
-        return url_data
+            if self._api_key not in _rate_limiters:
+                _rate_limiters[self._api_key] = RateLimiter(
+                    Api.FETCH_INTERVAL and 1000.0/Api.FETCH_INTERVAL or None,
+                    Api.FETCH_BURST)
+            return _rate_limiters[self._api_key]
+
+    def _read_url_data(self, url, data = None, headers = None):
+        method = self._get_method(url, data)
+        if self._rate_limiter is not None:
+            self._metrics.observe(method, 'rate_limit_wait', self._rate_limiter.wait())
+        if headers:
+            headers = dict(self._request_headers, **headers)
+        else:
+            headers = self._request_headers
+        start = time.time()
+        try:
+            response = self._transport.open(url, data, headers)
+        except Exception:
+            self._metrics.incr(method, 'errors')
+            raise
+        self._metrics.observe(method, 'upstream_latency', time.time() - start)
+        self._metrics.incr(method, 'requests')
+        self._metrics.incr(method, 'bytes_downloaded', len(response.body))
+        return response
+
+    _METHOD_RE = re.compile(r'(?:^|[?&])method=([^&]*)')
+
+    def _get_method(self, url, data = None):
+        match = Api._METHOD_RE.search(url) or (data and Api._METHOD_RE.search(data))
+        return match and urllib.unquote_plus(match.group(1)) or None
 
     @Wormhole.entrance('lfm-api-raw-data')
-    def _fetch_url(self, url, parameters = None, no_cache = False):
+    def _fetch_url(self, url, parameters = None, no_cache = False, cache_timeout = None):
+        if cache_timeout is None:
+            cache_timeout = self.get_cache_timeout(parameters and parameters.get('method'))
+
+        # Open and return the URL immediately if we're not going to cache
+        if no_cache or self._cache is None or not cache_timeout:
+            return self._read_url_data(self._build_url(url, extra_params=parameters)).body
+
+        key = self._get_cache_key(url, parameters)
+        method = parameters and parameters.get('method')
         # Add key/value parameters to the query string of the url
         url = self._build_url(url, extra_params=parameters)
-        # Get a url opener that can handle basic auth
-        opener = self._get_opener(url)
 
-        # Open and return the URL immediately if we're not going to cache
-        if no_cache or not self._cache or not self._cache_timeout:
+        # Return the cached version if it is not outdated, or if it is within the
+        # stale-while-revalidate window, in which case it is refreshed in background
+        last_cached = self._cache.GetCachedTime(key)
+        age = last_cached and time.time() - last_cached
+        stale = None
+        if last_cached:
+            if age < cache_timeout + self._stale_while_revalidate or \
+               age < cache_timeout + self._stale_if_error:
+                stale = self._cache.Get(key)
+            if stale is not None and self._get_error_code(stale) is not None:
+                # the errors are cached for a short time, and never served stale
+                if age < min(cache_timeout, self._negative_cache_timeout):
+                    self._record_hit(method, 'hits', stale, age)
+                    return stale
+                stale = None
+            if stale is not None:
+                if age < cache_timeout:
+                    self._record_hit(method, 'hits', stale, age)
+                    return stale
+                if age < cache_timeout + self._stale_while_revalidate:
+                    self._revalidate(url, key, cache_timeout)
+                    self._record_hit(method, 'stale', stale, age)
+                    return stale
+                if age >= cache_timeout + self._stale_if_error:
+                    stale = None
+        self._metrics.incr(method, 'misses')
+
+        # Otherwise fetch another and store it. If the same URL is already
+        # being fetched by another thread, wait for that one instead
+        try:
+            response = self._single_flight.do(key, self._fetch_and_cache_url,
+                url, key, cache_timeout)
+        except IOError:
+            if stale is None:
+                raise
+            self._record_hit(method, 'stale', stale, age)
+            return stale
+        if stale is not None and (response.status >= 500 or
+                self._get_error_code(response.body) in transient_errors):
+            self._record_hit(method, 'stale', stale, age)
+            return stale
+        return response.body
+
+    def _record_hit(self, method, kind, url_data, age):
+        self._metrics.incr(method, kind)
+        self._metrics.incr(method, 'bytes_read', len(url_data))
+        self._metrics.observe(method, 'age', age)
+
+    def _fetch_and_cache_url(self, url, key, cache_timeout):
+        # an identical request may have completed while this one was waiting
+        url_data = self._get_cached_url_data(key, cache_timeout)
+        if url_data is not None:
+            return Response(200, {}, url_data)
+        if not hasattr(self._cache, 'Acquire'):
+            return self._fetch_into_cache(url, key)
+
+        # Let only one of the processes sharing the cache fetch the response
+        if not self._cache.Acquire(key, Api.FETCH_LEASE_WAIT):
+            url_data = self._get_cached_url_data(key, cache_timeout)
+            if url_data is not None:
+                return Response(200, {}, url_data)
+            return self._fetch_into_cache(url, key)
+        try:
+            return self._fetch_into_cache(url, key)
+        finally:
+            self._cache.Release(key)
+
+    def _fetch_into_cache(self, url, key):
+        # Revalidate the expired copy, if the cache keeps the validators of the responses
+        headers = None
+        validators = hasattr(self._cache, 'GetValidators') and \
+            self._cache.GetValidators(key) or {}
+        if validators:
+            headers = {}
+            if 'etag' in validators:
+                headers['If-None-Match'] = validators['etag']
+            if 'last-modified' in validators:
+                headers['If-Modified-Since'] = validators['last-modified']
+        response = self._read_url_data(url, headers = headers)
+        if response.status == 304:
+            url_data = self._cache.Get(key)
+            if url_data is not None:
+                if hasattr(self._cache, 'Touch'):
+                    self._cache.Touch(key)
+                return Response(200, response.headers, url_data)
+            response = self._read_url_data(url)
+
+        if self._is_cacheable(response):
+            self._cache.Set(key, response.body)
+            self._metrics.incr(self._get_method(url), 'bytes_written', len(response.body))
+            validators = dict((k, response.headers[k])
+                for k in ('etag', 'last-modified') if k in response.headers)
+            if validators and hasattr(self._cache, 'SetValidators'):
+                self._cache.SetValidators(key, validators)
+        return response
+
+    def _revalidate(self, url, key, cache_timeout):
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        def refresh():
             try:
-                url_data = self._read_url_data(opener, url)
-            except urllib2.HTTPError, e:
-                url_data = e.read()
-        else:
-            # Unique keys are a combination of the url and the username
-            key = url.encode('utf-8')
+                self._single_flight.do(key, self._fetch_and_cache_url, url, key, 0)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+        ThreadPool.get_default().submit(refresh)
 
-            # See if it has been cached before
-            last_cached = self._cache.GetCachedTime(key)
+    def _get_cache_key(self, url, parameters = None):
+        # The responses of the unsigned, sessionless calls do not depend on the
+        # credentials, so they are left out of the key, and the Api objects using
+        # different API keys can share the cached responses
+        if parameters and not ('sk' in parameters or 'api_sig' in parameters):
+            parameters = dict((k, v) for (k, v) in parameters.items()
+                if k not in Api.CREDENTIAL_PARAMS)
+        # the parameters are sorted by the name, so the same call always gets the same key
+        return self._build_url(url, extra_params=parameters).encode('utf-8')
 
-            # If the cached version is outdated then fetch another and store it
-            if not last_cached or time.time() >= last_cached + self._cache_timeout:
-                try:
-                    url_data = self._read_url_data(opener, url)
-                except urllib2.HTTPError, e:
-                    url_data = e.read()
-                self._cache.Set(key, url_data)
-            else:
-                url_data = self._cache.Get(key)
+    def _get_cached_url_data(self, key, cache_timeout = None):
+        if cache_timeout is None:
+            cache_timeout = self._cache_timeout
+        if self._cache is None or not cache_timeout:
+            return None
 
-        # Always return the latest version
+        # See if it has been cached before
+        last_cached = self._cache.GetCachedTime(key)
+        if not last_cached or time.time() >= last_cached + cache_timeout:
+            return None
+        url_data = self._cache.Get(key)
+        if url_data is not None and self._get_error_code(url_data) is not None and \
+           time.time() >= last_cached + self._negative_cache_timeout:
+            return None
         return url_data
 
+    def _is_cacheable(self, response):
+        if response.status >= 500:
+            return False
+        code = self._get_error_code(response.body)
+        return code is None or \
+            (code in negative_cacheable_errors and bool(self._negative_cache_timeout))
+
+    def _get_error_code(self, xml):
+        # a cheap check, which does not parse the whole response
+        if xml.find('status="failed"', 0, 200) == -1 and xml.find('"error"', 0, 20) == -1:
+            return None
+        match = Api._ERROR_CODE_RE.search(xml)
+        return match and int(match.group(1) or match.group(2)) or 0
+
     @Wormhole.entrance('lfm-api-processed-data')
     def _fetch_data(self,
                    params,
                    sign = False,
                    session = False,
                    no_cache = False):
+        params = self._prepare_params(params, sign, session)
+        method = params.get('method')
+        no_cache = self._no_cache or no_cache
+        if self._parsed_cache is None or no_cache or self._cache is None:
+            xml = self._fetch_url(Api.API_ROOT_URL, params, no_cache = no_cache)
+            return self._parse_response(method, xml)
+
+        key = self._get_cache_key(Api.API_ROOT_URL, params)
+        cache_timeout = self.get_cache_timeout(method)
+        if cache_timeout:
+            data = self._parsed_cache.Get(key, cache_timeout)
+            if data is not None:
+                self._metrics.incr(method, 'parsed_hits')
+                return data
+        xml = self._fetch_url(Api.API_ROOT_URL, params, cache_timeout = cache_timeout)
+        data = self._parse_response(method, xml)
+        # keep it only as long as the response it was parsed from is fresh
+        cached_time = self._cache.GetCachedTime(key)
+        if cache_timeout and cached_time is not None:
+            self._parsed_cache.Set(key, data, cached_time)
+        return data
+
+    def _fetch_items(self,
+                     params,
+                     container,
+                     tag,
+                     sign = False,
+                     session = False):
+        """
+        Fetch a paginated response, parsing it incrementally in the streaming mode.
+
+        @return:  the container element, with its attributes, and an iterator over the
+                  C{tag} elements in it
+        @rtype:   L{tuple}
+        """
+        if not self._streaming or self._format != 'xml':
+            data = self._fetch_data(params, sign, session).find(container)
+            if data is None:
+                raise OperationFailedError("No %s element in the response" % container)
+            return (data, iter(data.findall(tag)))
+
+        params = self._prepare_params(params, sign, session)
+        method = params.get('method')
+        cache_timeout = not self._no_cache and self._cache is not None and \
+            self.get_cache_timeout(method)
+        key = self._get_cache_key(Api.API_ROOT_URL, params)
+        xml = cache_timeout and self._get_cached_url_data(key, cache_timeout)
+        if xml:
+            self._record_hit(method, 'hits', xml,
+                time.time() - (self._cache.GetCachedTime(key) or time.time()))
+            source = StringIO(xml)
+        else:
+            if cache_timeout:
+                self._metrics.incr(method, 'misses')
+            source = self._open_url_stream(self._build_url(Api.API_ROOT_URL, extra_params = params))
+            if cache_timeout:
+                source.keep_body()
+        events = iter(ElementTree.iterparse(source, ('start', 'end')))
+        try:
+            data = self._stream_container(events, container)
+        except:
+            source.close()
+            raise
+        return (data, self._stream_elements(method, key, source, events, data, tag))
+
+    def _open_url_stream(self, url):
+        method = self._get_method(url)
+        if self._rate_limiter is not None:
+            self._metrics.observe(method, 'rate_limit_wait', self._rate_limiter.wait())
+        start = time.time()
+        try:
+            if hasattr(self._transport, 'open_stream'):
+                response = self._transport.open_stream(url, None, self._request_headers)
+            else:
+                response = self._transport.open(url, None, self._request_headers)
+                response = StreamingResponse(response.status, response.headers,
+                    StringIO(response.body))
+        except Exception:
+            self._metrics.incr(method, 'errors')
+            raise
+        self._metrics.observe(method, 'upstream_latency', time.time() - start)
+        self._metrics.incr(method, 'requests')
+        return response
+
+    def _stream_container(self, events, container):
+        root = None
+        try:
+            for (event, elem) in events:
+                if event != 'start':
+                    continue
+                if root is None:
+                    root = elem
+                    if root.get('status') != "ok":
+                        # an error response is small, parse it whole
+                        for (event, elem) in events:
+                            pass
+                        self._check_status(root)
+                if elem.tag == container:
+                    return elem
+        except SyntaxError, e:
+            raise OperationFailedError("Error in parsing XML: %s" % e)
+        raise OperationFailedError("No %s element in the response" % container)
+
+    def _stream_elements(self, method, key, source, events, data, tag):
+        depth = 0
+        try:
+            try:
+                for (event, elem) in events:
+                    if event == 'start':
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth < 0:
+                        break
+                    if depth == 0:
+                        if elem.tag == tag:
+                            yield elem
+                        # drop the element, once it has been handed over
+                        data.remove(elem)
+                # read the rest of the response, so that it can be cached
+                for (event, elem) in events:
+                    pass
+            except SyntaxError, e:
+                raise OperationFailedError("Error in parsing XML: %s" % e)
+        finally:
+            source.close()
+        if isinstance(source, StreamingResponse):
+            self._metrics.incr(method, 'bytes_downloaded', source.bytes_read)
+            if source.body is not None and source.complete and self._is_cacheable(
+                    Response(source.status, source.headers, source.body)):
+                self._cache.Set(key, source.body)
+                self._metrics.incr(method, 'bytes_written', len(source.body))
+
+    def _prepare_params(self, params, sign = False, session = False):
         params = params.copy()
         params['api_key'] = self.api_key
 
@@ -728,9 +1392,13 @@ class Api(object):
 
         if sign:
             params['api_sig'] = self._get_api_sig(params)
+        # the format is not a part of the signature
+        if self._format != 'xml' and params.get('method') not in Api._XML_METHODS:
+            params['format'] = self._format
+        return params
 
-        xml = self._fetch_url(Api.API_ROOT_URL, params, no_cache = self._no_cache or no_cache)
-        return self._check_xml(xml)
+    # the methods whose responses are always read as XML
+    _XML_METHODS = frozenset(['playlist.fetch'])
 
     @Wormhole.entrance('lfm-api-raw-data')
     def _post_url(self,
@@ -738,9 +1406,7 @@ class Api(object):
                  parameters):
         url = self._build_url(url)
         data = self._encode_parameters(parameters)
-        opener = self._get_opener(url)
-        url_data = self._read_url_data(opener, url, data)
-        return url_data
+        return self._read_url_data(url, data).body
 
     @Wormhole.entrance('lfm-api-processed-data')
     def _post_data(self, params):
@@ -769,12 +1435,38 @@ class Api(object):
         else:
             raise AuthenticationFailedError("api secret must be present to call this method")
 
+    def _parse_response(self, method, body):
+        start = time.time()
+        try:
+            if body[:1] == '{':
+                return self._check_json(body)
+            return self._check_xml(body)
+        except LastfmError:
+            self._metrics.incr(method, 'errors')
+            raise
+        finally:
+            self._metrics.observe(method, 'parse_latency', time.time() - start)
+
+    _ERROR_CODE_RE = re.compile(r'<error\s+code="(\d+)"|^\{\s*"error"\s*:\s*(\d+)')
+
     def _check_xml(self, xml):
         data = None
         try:
             data = ElementTree.XML(xml)
         except SyntaxError, e:
             raise OperationFailedError("Error in parsing XML: %s" % e)
+        self._check_status(data)
+        return data
+
+    def _check_json(self, json):
+        try:
+            data = jsontree.fromstring(json)
+        except ValueError, e:
+            raise OperationFailedError("Error in parsing JSON: %s" % e)
+        self._check_status(data)
+        return data
+
+    def _check_status(self, data):
         if data.get('status') != "ok":
             code = int(data.find("error").get('code'))
             message = data.findtext('error')
@@ -782,24 +1474,26 @@ class Api(object):
                 raise error_map[code](message, code)
             else:
                 raise LastfmError(message, code)
-        return data
 
     def __repr__(self):
         return "<lastfm.Api: %s>" % self._api_key
 
-from datetime import datetime
 import sys
 import time
 import urllib
+from cStringIO import StringIO
 import urllib2
 import urlparse
 
 from lastfm.album import Album
 from lastfm.artist import Artist
 from lastfm.error import error_map, LastfmError, OperationFailedError, AuthenticationFailedError,\
-    InvalidParametersError
+    InvalidParametersError, transient_errors, negative_cacheable_errors
 from lastfm.event import Event
-from lastfm.util import FileCache
+from lastfm.util import FileCache, MemoryCache, ZlibCodec, ParsedCache, RateLimiter, UrllibTransport, ThreadPool, Future, \
+    SingleFlight, Metrics
+from lastfm.util import jsontree
+from lastfm.util.transport import Response, StreamingResponse
 from lastfm.geo import Location, Country
 from lastfm.group import Group
 from lastfm.playlist import Playlist
@@ -9,6 +9,7 @@ __package__ = "lastfm"
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.decorators import cached_property, top_property
+from lastfm.util.schema import Schema, Arg, Date, Entity, EntityList, Flag, Images, Int
 
 @mixin("crawlable", "shoutable", "sharable",
     "taggable", "searchable", "cacheable", "property_adder")
@@ -18,6 +19,7 @@ class Artist(LastfmBase):
         properties = ["name", "similar", "top_tags"]
         fillable_properties = ["mbid", "url", "image",
             "streamable", "stats", "bio"]
+        key_properties = ["name"]
         
     def init(self, api, subject = None, **kwargs):
         """
@@ -54,14 +56,7 @@ class Artist(LastfmBase):
         
         self._api = api
         super(Artist, self).init(**kwargs)
-        self._stats = hasattr(self, "_stats") and Stats(
-            subject = self,
-            listeners = self._stats.listeners,
-            playcount = self._stats.playcount,
-            weight = self._stats.weight,
-            match = self._stats.match,
-            rank = self._stats.rank
-        ) or None
+        self._stats = hasattr(self, "_stats") and self._own_stats(self._stats) or None
         self._bio = hasattr(self, "_bio") and Wiki(
             subject = self,
             published = self._bio.published,
@@ -70,6 +65,17 @@ class Artist(LastfmBase):
         ) or None
         self._subject = subject
 
+    def _own_stats(self, stats):
+        # a copy of the stats, with this object as their subject
+        return Stats(
+                     subject = self,
+                     listeners = stats.listeners,
+                     playcount = stats.playcount,
+                     weight = stats.weight,
+                     match = stats.match,
+                     rank = stats.rank
+                     )
+
     def get_similar(self, limit = None):
         """
         Get the artists similar to this artist.
@@ -297,7 +303,7 @@ class Artist(LastfmBase):
         """
         data = Artist._fetch_data(api, artist, mbid)
 
-        a = Artist(api, name = data.findtext('name'))
+        a = Artist._create_from_info(api, data)
         a._fill_info()
         return a
     
@@ -318,6 +324,11 @@ class Artist(LastfmBase):
     def _fetch_data(api,
                 artist = None,
                 mbid = None):
+        return api._fetch_data(Artist._info_params(artist, mbid)).find('artist')
+
+    @staticmethod
+    def _info_params(artist = None,
+                     mbid = None):
         params = {'method': 'artist.getInfo'}
         if not (artist or mbid):
             raise InvalidParametersError("either artist or mbid has to be given as argument.")
@@ -325,61 +336,20 @@ class Artist(LastfmBase):
             params.update({'artist': artist})
         elif mbid:
             params.update({'mbid': mbid})
-        return api._fetch_data(params).find('artist')
-
-    def _fill_info(self):
-        data = Artist._fetch_data(self._api, self.name)
-        self._name = data.findtext('name')
-        self._mbid = data.findtext('mbid')
-        self._url = data.findtext('url')
-        self._image = dict([(i.get('size'), i.text) for i in data.findall('image')])
-        self._streamable = (data.findtext('streamable') == 1)
-        if not self._stats:
-            self._stats = Stats(
-                             subject = self,
-                             listeners = int(data.findtext('stats/listeners')),
-                             playcount = int(data.findtext('stats/playcount'))
-                             )
-#        self._similar = [
-#                          Artist(
-#                                 self._api,
-#                                 subject = self,
-#                                 name = a.findtext('name'),
-#                                 url = a.findtext('url'),
-#                                 image = dict([(i.get('size'), i.text) for i in a.findall('image')])
-#                                 )
-#                          for a in data.findall('similar/artist')
-#                          ]
-        self._top_tags = [
-                          Tag(
-                              self._api,
-                              subject = self,
-                              name = t.findtext('name'),
-                              url = t.findtext('url')
-                              )
-                          for t in data.findall('tags/tag')
-                          ]
-        self._bio = Wiki(
-                         self,
-                         published = data.findtext('bio/published').strip() and
-                                        datetime(*(time.strptime(
-                                                              data.findtext('bio/published').strip(),
-                                                              '%a, %d %b %Y %H:%M:%S +0000'
-                                                              )[0:6])),
-                         summary = data.findtext('bio/summary'),
-                         content = data.findtext('bio/content')
-                         )
+        return params
 
     @staticmethod
-    def _search_yield_func(api, artist):
-        return Artist(
-                      api,
-                      name = artist.findtext('name'),
-                      mbid = artist.findtext('mbid'),
-                      url = artist.findtext('url'),
-                      image = dict([(i.get('size'), i.text) for i in artist.findall('image')]),
-                      streamable = (artist.findtext('streamable') == '1'),
-                      )
+    def _create_from_info(api, data):
+        return Artist(api, name = data.findtext('name'))
+
+    def _fill_info(self, data = None):
+        if data is None:
+            data = Artist._fetch_data(self._api, self.name)
+        info = _INFO_SCHEMA.extract(data, self._api, self)
+        if self._stats:
+            del info['stats']
+        super(Artist, self).init(**info)
+
     @staticmethod
     def _hash_func(*args, **kwds):
         try:
@@ -406,9 +376,6 @@ class Artist(LastfmBase):
     def __repr__(self):
         return "<lastfm.Artist: %s>" % self._name
 
-from datetime import datetime
-import time
-
 from lastfm.album import Album
 from lastfm.api import Api
 from lastfm.error import InvalidParametersError
@@ -418,3 +385,32 @@ from lastfm.tag import Tag
 from lastfm.track import Track
 from lastfm.user import User
 from lastfm.wiki import Wiki
+
+_SEARCH_SCHEMA = Schema(Artist, {
+    'name':       'name',
+    'mbid':       'mbid',
+    'url':        'url',
+    'image':      Images(),
+    'streamable': Flag('streamable'),
+    }, element_last = True)
+
+Artist._search_yield_func = staticmethod(_SEARCH_SCHEMA.extract)
+
+_INFO_SCHEMA = _SEARCH_SCHEMA.extend({
+    'stats':    Entity(Schema(Stats, {
+                    'subject':   Arg('subject'),
+                    'listeners': Int('stats/listeners'),
+                    'playcount': Int('stats/playcount'),
+                    }, params = ('subject',), args = ())),
+    'top_tags': EntityList(Schema(Tag, {
+                    'subject': Arg('subject'),
+                    'name':    'name',
+                    'url':     'url',
+                    }, params = ('api', 'subject')), 'tags/tag'),
+    'bio':      Entity(Schema(Wiki, {
+                    'subject':   Arg('subject'),
+                    'published': Date('bio/published', '%a, %d %b %Y %H:%M:%S +0000'),
+                    'summary':   'bio/summary',
+                    'content':   'bio/content',
+                    }, params = ('subject',), args = ())),
+    }, factory = dict, params = ('api', 'subject'), args = ())
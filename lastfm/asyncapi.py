@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+"""The non-blocking, event loop based access to the last.fm web services API"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm"
+
+import time
+
+from lastfm.api import Api
+
+class Request(object):
+    """
+    A request for the web service, yielded by the steps of a call run by
+    L{AsyncApi.call}.
+    """
+    def __init__(self, params, sign = False, session = False):
+        """
+        @param params:    the parameters of the request, with the method name
+        @type params:     L{dict}
+        @param sign:      should the request be signed? (optional)
+        @type sign:       L{bool}
+        @param session:   should the session key be sent? (optional)
+        @type session:    L{bool}
+        """
+        self.params = params
+        self.sign = sign
+        self.session = session
+
+    def __repr__(self):
+        return "<lastfm.Request: %s>" % self.params.get('method')
+
+class AsyncApi(object):
+    """
+    The class representing the last.fm web services API, with non-blocking methods.
+
+    All the requests are sent on a single threaded event loop, so a large number
+    of lookups can be in flight at the same time without a thread for each of them.
+    The methods mirror the ones of L{Api}. They return a L{Future} and call the
+    optional callback function with the result (or the exception raised), once
+    the loop has fetched all the data required. The search methods return an
+    L{AsyncIterator} over all the pages of the results.
+
+    The objects are created from the responses by the same code which is used
+    by the L{Api}. Their properties which need more data from the web service
+    fetch it in the usual, blocking way.
+
+    Example::
+        api = AsyncApi(api_key)
+        artists = [api.get_artist(name) for name in names]
+        api.run()
+        print [a.result().stats.listeners for a in artists]
+    """
+    DEFAULT_REQUEST_TIMEOUT = 30
+
+    def __init__(self, api_key, *args, **kwargs):
+        """
+        Create an AsyncApi object. The arguments are the same as those of L{Api}.
+
+        @param api_key:    last.fm API key
+        @type api_key:     L{str}
+        """
+        self._api = Api(api_key, *args, **kwargs)
+        self._loop = EventLoop()
+        self._request_timeout = AsyncApi.DEFAULT_REQUEST_TIMEOUT
+
+    @property
+    def api(self):
+        """
+        The blocking Api used to create the objects
+        @rtype: L{Api}
+        """
+        return self._api
+
+    @property
+    def loop(self):
+        """
+        The event loop on which the requests are sent
+        @rtype: L{EventLoop}
+        """
+        return self._loop
+
+    @property
+    def request_timeout(self):
+        """
+        The time, in seconds, after which a request on the loop fails
+        @rtype: L{float}
+        """
+        return self._request_timeout
+
+    def set_request_timeout(self, timeout):
+        """
+        Set the time after which a request on the event loop fails with a
+        C{socket.timeout}, if the server has not answered it completely. A stalled
+        server would otherwise keep the future of the call pending forever.
+
+        @param timeout:  the timeout, in seconds, or None for none
+        @type timeout:   L{float}
+        """
+        self._request_timeout = timeout
+
+    def run(self, timeout = None):
+        """
+        Run the event loop till all the pending calls are completed.
+
+        @param timeout:  maximum time, in seconds, to run the loop for (optional)
+        @type timeout:   L{float}
+        """
+        self._loop.run(timeout)
+
+    def close(self):
+        """Close the connections kept open by the event loop."""
+        self._loop.close()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Run a call made of steps without blocking. The function is a generator,
+        which is passed the blocking L{Api} and the arguments given after it. It
+        yields a L{Request} for each response it needs, and is sent the parsed
+        response once the event loop has fetched it (or the exception raised
+        while fetching it is thrown into it). The first value it yields which is
+        not a L{Request} is the result of the call.
+
+        Each response is fetched and parsed once, and each step of the function
+        is run once.
+
+        Example::
+            def get_listeners(api, name):
+                data = yield Request({'method': 'artist.getInfo', 'artist': name})
+                yield int(data.findtext('artist/stats/listeners'))
+            future = async_api.call(get_listeners, "Bon Jovi")
+
+        @param func:      the generator function to run
+        @type func:       C{function}
+        @param callback:  callback function called with the result (optional)
+        @type callback:   C{function}
+
+        @return:          the future result of the call
+        @rtype:           L{Future}
+        """
+        callback = kwargs.pop('callback', None)
+        future = Future()
+
+        def finish(result, exception = None):
+            if exception is not None:
+                future.set_exception(exception)
+                result = exception
+            else:
+                future.set_result(result)
+            if callback is not None:
+                callback(result)
+
+        def step(response):
+            try:
+                if isinstance(response, Exception):
+                    request = steps.throw(response)
+                else:
+                    request = steps.send(response)
+            except StopIteration:
+                finish(None)
+                return
+            except Exception, e:
+                finish(None, e)
+                return
+            if not isinstance(request, Request):
+                steps.close()
+                finish(request)
+                return
+            try:
+                self._fetch(request, step)
+            except Exception, e:
+                step(e)
+
+        try:
+            steps = func(self._api, *args, **kwargs)
+        except Exception, e:
+            self._loop.call_soon(finish, None, e)
+        else:
+            self._loop.call_soon(step, None)
+        return future
+
+    def _search(self, cls, search_item, limit = None, **kwds):
+        def fetch_page(api, page):
+            # the first page is fetched without the page parameter, like L{Api} does
+            data = yield Request(cls._search_params(search_item, limit,
+                page > 1 and page or None, **kwds))
+            total_pages, matches = cls._search_matches(data)
+            yield (total_pages, [cls._search_yield_func(api, a) for a in matches])
+        return AsyncIterator(self, fetch_page)
+
+    def search_album(self, album, limit = None):
+        """
+        Search for an album by name.
+
+        @see:    L{Api.search_album}
+        @rtype:  L{AsyncIterator} of L{Album}
+        """
+        return self._search(Album, album, limit)
+
+    def search_artist(self, artist, limit = None):
+        """
+        Search for an artist by name.
+
+        @see:    L{Api.search_artist}
+        @rtype:  L{AsyncIterator} of L{Artist}
+        """
+        return self._search(Artist, artist, limit)
+
+    def search_tag(self, tag, limit = None):
+        """
+        Search for a tag by name.
+
+        @see:    L{Api.search_tag}
+        @rtype:  L{AsyncIterator} of L{Tag}
+        """
+        return self._search(Tag, tag, limit)
+
+    def search_track(self, track, artist = None, limit = None):
+        """
+        Search for a track by name.
+
+        @see:    L{Api.search_track}
+        @rtype:  L{AsyncIterator} of L{Track}
+        """
+        if isinstance(artist, Artist):
+            artist = artist.name
+        return self._search(Track, track, limit, artist = artist)
+
+    def search_venue(self, venue, limit = None, country = None):
+        """
+        Search for a venue by name.
+
+        @see:    L{Api.search_venue}
+        @rtype:  L{AsyncIterator} of L{Venue}
+        """
+        return self._search(Venue, venue, limit, country = country)
+
+    def _fetch(self, request, callback):
+        # the cache is used like in the streaming mode of L{Api}
+        api = self._api
+        params = api._prepare_params(request.params, request.sign, request.session)
+        method = params.get('method')
+        cache_timeout = not api._no_cache and api._cache is not None and \
+            api.get_cache_timeout(method)
+        key = api._get_cache_key(Api.API_ROOT_URL, params)
+        xml = cache_timeout and api._get_cached_url_data(key, cache_timeout)
+        if xml:
+            api._record_hit(method, 'hits', xml,
+                time.time() - (api._cache.GetCachedTime(key) or time.time()))
+            self._loop.call_soon(self._parse, method, xml, callback)
+            return
+        if cache_timeout:
+            api._metrics.incr(method, 'misses')
+        start = time.time()
+
+        def received(response):
+            if isinstance(response, Exception):
+                api._metrics.incr(method, 'errors')
+                callback(response)
+                return
+            api._metrics.observe(method, 'upstream_latency', time.time() - start)
+            api._metrics.incr(method, 'requests')
+            api._metrics.incr(method, 'bytes_downloaded', len(response.body))
+            if cache_timeout and api._is_cacheable(response):
+                api._cache.Set(key, response.body)
+                api._metrics.incr(method, 'bytes_written', len(response.body))
+            self._parse(method, response.body, callback)
+        self._send(api._build_url(Api.API_ROOT_URL, extra_params = params), None, received)
+
+    def _parse(self, method, xml, callback):
+        try:
+            data = self._api._parse_response(method, xml)
+        except Exception, e:
+            data = e
+        callback(data)
+
+    def _send(self, url, data, callback):
+        delay = 0
+        if self._api.rate_limiter is not None:
+            delay = self._api.rate_limiter.reserve()
+        self._loop.call_later(delay, HttpRequest,
+            self._loop, url, data, self._api._request_headers, callback,
+            self._request_timeout)
+
+    def __repr__(self):
+        return "<lastfm.AsyncApi: %s>" % self._api.api_key
+
+def _get_album(api, album = None, artist = None, mbid = None):
+    if isinstance(artist, Artist):
+        artist = artist.name
+    data = (yield Request(Album._info_params(artist, album, mbid))).find('album')
+    a = Album._create_from_info(api, data)
+    a._fill_info(data)
+    yield a
+
+def _get_artist(api, artist = None, mbid = None):
+    data = (yield Request(Artist._info_params(artist, mbid))).find('artist')
+    a = Artist._create_from_info(api, data)
+    a._fill_info(data)
+    yield a
+
+def _get_event(api, event):
+    data = yield Request(Event._info_params(event))
+    yield Event.create_from_data(api, data.find('event'))
+
+def _get_location(api, city):
+    yield Location(api, city = city)
+
+def _get_country(api, name):
+    yield Country(api, name = name)
+
+def _get_group(api, name):
+    yield Group(api, name = name)
+
+def _get_playlist(api, url):
+    yield Playlist.fetch(api, url)
+
+def _get_tag(api, name):
+    yield Tag(api, name = name)
+
+def _get_global_top_tags(api):
+    data = yield Request({'method': 'tag.getTopTags'})
+    yield Tag._create_top_tags(api, data)
+
+def _compare_taste(api, type1, type2, value1, value2, limit = None):
+    data = yield Request(Tasteometer._compare_params(type1, type2, value1, value2, limit))
+    yield Tasteometer._create_from_data(api, data)
+
+def _get_track(api, track, artist = None, mbid = None):
+    if isinstance(artist, Artist):
+        artist = artist.name
+    params = Track._check_params({'method': 'track.getInfo'}, artist, track, mbid)
+    data = (yield Request(params)).find('track')
+    t = Track._create_from_info(api, data)
+    t._fill_info(data)
+    yield t
+
+def _get_user(api, name):
+    data = yield Request({'method' : 'user.getInfo', 'user' : name})
+    yield User._create_from_info(api, data.find('user'))
+
+def _get_authenticated_user(api):
+    data = yield Request({'method': 'user.getInfo'}, sign = True, session = True)
+    yield User._create_authenticated(api, data.find('user'))
+
+def _get_venue(api, venue):
+    data = yield Request(Venue._search_params(venue))
+    total_pages, matches = Venue._search_matches(data)
+    if not matches:
+        raise InvalidParametersError("No such venue exists")
+    yield Venue._search_yield_func(api, matches[0])
+
+def _mirror(name, steps):
+    def wrapper(self, *args, **kwargs):
+        return self.call(steps, *args, **kwargs)
+    wrapper.__name__ = name
+    wrapper.__doc__ = """
+        Non-blocking version of L{Api.%s}. Takes the same arguments.
+
+        @return:   the future result
+        @rtype:    L{Future}
+        """ % name
+    return wrapper
+
+for steps in [_get_album, _get_artist, _get_event, _get_location, _get_country,
+              _get_group, _get_playlist, _get_tag, _get_global_top_tags,
+              _compare_taste, _get_track, _get_user, _get_authenticated_user,
+              _get_venue]:
+    setattr(AsyncApi, steps.__name__[1:], _mirror(steps.__name__[1:], steps))
+del steps
+
+class AsyncIterator(object):
+    """
+    An iterator over all the pages of the results of a search, fetching the pages
+    on the event loop of an L{AsyncApi}. Items are requested one at a time.
+    """
+    def __init__(self, api, fetch_page):
+        self._api = api
+        self._fetch_page = fetch_page
+        self._items = []
+        self._page = 0
+        self._total_pages = None
+
+    def next(self, callback):
+        """
+        Get the next item. The callback function is called with the item, with
+        an instance of C{StopIteration} when there are no more items, or with
+        the exception raised while fetching the item.
+
+        @param callback:  callback function
+        @type callback:   C{function}
+        """
+        if self._items:
+            self._api.loop.call_soon(callback, self._items.pop(0))
+            return
+        if self._total_pages is not None and self._page >= self._total_pages:
+            self._api.loop.call_soon(callback, StopIteration())
+            return
+        self._page += 1
+        def received(result):
+            if isinstance(result, Exception):
+                callback(result)
+            else:
+                self._total_pages, self._items = result
+                self.next(callback)
+        self._api.call(self._fetch_page, self._page, callback = received)
+
+    def each(self, callback, done = None):
+        """
+        Call the callback function with each of the items.
+
+        @param callback:  callback function called with each item
+        @type callback:   C{function}
+        @param done:      function called with None when all the items are done, or
+                          with the exception raised while fetching an item (optional)
+        @type done:       C{function}
+        """
+        def step(item):
+            if isinstance(item, Exception):
+                if done is not None:
+                    done(not isinstance(item, StopIteration) and item or None)
+                return
+            callback(item)
+            self.next(step)
+        self.next(step)
+
+    def __repr__(self):
+        return "<lastfm.AsyncIterator: page %s of %s>" % (self._page, self._total_pages)
+
+from lastfm.album import Album
+from lastfm.artist import Artist
+from lastfm.error import InvalidParametersError
+from lastfm.event import Event
+from lastfm.geo import Country, Location
+from lastfm.group import Group
+from lastfm.playlist import Playlist
+from lastfm.tag import Tag
+from lastfm.tasteometer import Tasteometer
+from lastfm.track import Track
+from lastfm.user import User
+from lastfm.venue import Venue
+from lastfm.util import Future
+from lastfm.util.asyncloop import EventLoop, HttpRequest
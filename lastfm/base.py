@@ -10,11 +10,19 @@ class LastfmBase(object):
     """Base class for all the classes in this package"""
     
     def init(self, **kwargs):
+        try:
+            attributes = self.Meta._attributes
+        except AttributeError:
+            # the attributes of the properties by their names, once per Meta, with
+            # _source: the schema, the params and the values recorded from the element
+            # the other properties are read from on their first use, see property_adder
+            attributes = dict([(p, "_{0}".format(p)) for p in
+                self.Meta.properties + getattr(self.Meta, 'fillable_properties', [])])
+            attributes['_source'] = '_source'
+            self.Meta._attributes = attributes
         for k in kwargs:
-            if (k in self.Meta.properties or
-                (hasattr(self.Meta, 'fillable_properties') and
-                    k in self.Meta.fillable_properties)):
-                setattr(self, "_{0}".format(k), kwargs[k])
+            if k in attributes:
+                setattr(self, attributes[k], kwargs[k])
     
     def __eq__(self, other):
         raise NotImplementedError("The subclass must override this method")
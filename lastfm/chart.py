@@ -5,10 +5,11 @@ __version__ = "0.2"
 __license__ = "GNU Lesser General Public License"
 __package__ = "lastfm"
 
-from functools import reduce
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.util import logging
+from lastfm.util.schema import Schema, Arg, Compute, Elements, Entity, EntityList, Int, \
+    Ref, Timestamp
 from operator import xor
 
 @mixin("cacheable", "property_adder")
@@ -119,11 +120,7 @@ class WeeklyChart(Chart):
     """A class for representing the weekly charts"""
     @staticmethod
     def create_from_data(api, subject, data):
-        return WeeklyChart(
-                     subject = subject,
-                     start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-                     end = datetime.utcfromtimestamp(int(data.attrib['to']))
-                     )
+        return _WEEKLY_CHART_SCHEMA.extract(data, api, subject)
         
     @staticmethod
     def _check_chart_params(params, subject, start = None, end = None):
@@ -142,135 +139,20 @@ class WeeklyAlbumChart(AlbumChart, WeeklyChart):
     """A class for representing the weekly album charts"""
     @staticmethod
     def create_from_data(api, subject, data):
-        w = WeeklyChart(
-                        subject = subject,
-                        start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-                        end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-                        )
-        return WeeklyAlbumChart(
-            subject = subject,
-            start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-            end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-            stats = Stats(
-                subject = subject,
-                playcount = reduce(
-                    lambda x,y:(
-                        x + int(y.findtext('playcount'))
-                    ),
-                    data.findall('album'),
-                    0
-                )
-            ),
-            albums = [
-                Album(
-                      api,
-                      subject = w,
-                      name = a.findtext('name'),
-                      mbid = a.findtext('mbid'),
-                      artist = Artist(
-                          api,
-                          subject = w,
-                          name = a.findtext('artist'),
-                          mbid = a.find('artist').attrib['mbid'],
-                          ),
-                      stats = Stats(
-                          subject = a.findtext('name'),
-                          rank = int(a.attrib['rank']),
-                          playcount = int(a.findtext('playcount')),
-                          ),
-                      url = a.findtext('url'),
-                      )
-                for a in data.findall('album')
-                ]
-            )
-    
+        return _WEEKLY_ALBUM_CHART_SCHEMA.extract(data, api, subject)
+
 class WeeklyArtistChart(ArtistChart, WeeklyChart):
     """A class for representing the weekly artist charts"""
     @staticmethod
     def create_from_data(api, subject, data):
-        w = WeeklyChart(
-                        subject = subject,
-                        start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-                        end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-                        )
-        count_attribute = data.find('artist').findtext('playcount') and 'playcount' or 'weight'
-        def get_count_attribute(artist):
-            return {count_attribute: int(eval(artist.findtext(count_attribute)))}
-        def get_count_attribute_sum(artists):
-            return {count_attribute: reduce(
-                        lambda x, y:(x + int(eval(y.findtext(count_attribute)))), artists, 0
-                    )}
-            
-        return WeeklyArtistChart(
-            subject = subject,
-            start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-            end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-            stats = Stats(
-                          subject = subject,
-                          **get_count_attribute_sum(data.findall('artist'))
-                    ),
-            artists = [
-                      Artist(
-                            api,
-                            subject = w,
-                            name = a.findtext('name'),
-                            mbid = a.findtext('mbid'),
-                            stats = Stats(
-                                          subject = a.findtext('name'),
-                                          rank = int(a.attrib['rank']),
-                                          **get_count_attribute(a)
-                                          ),
-                            url = a.findtext('url'),
-                            )
-                      for a in data.findall('artist')
-                      ]
-            )
-    
+        return _WEEKLY_ARTIST_CHART_SCHEMA.extract(data, api, subject)
+
 class WeeklyTrackChart(TrackChart, WeeklyChart):
     """A class for representing the weekly track charts"""
     @staticmethod
     def create_from_data(api, subject, data):
-        w = WeeklyChart(
-            subject = subject,
-            start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-            end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-            )
-        return WeeklyTrackChart(
-            subject = subject,
-            start = datetime.utcfromtimestamp(int(data.attrib['from'])),
-            end = datetime.utcfromtimestamp(int(data.attrib['to'])),
-            stats = Stats(
-                subject = subject,
-                playcount = reduce(
-                                   lambda x,y:(
-                                               x + int(y.findtext('playcount'))
-                                               ),
-                                   data.findall('track'),
-                                   0
-                )
-            ),
-            tracks = [
-                      Track(
-                            api,
-                            subject = w,
-                            name = t.findtext('name'),
-                            mbid = t.findtext('mbid'),
-                            artist = Artist(
-                                            api,
-                                            name = t.findtext('artist'),
-                                            mbid = t.find('artist').attrib['mbid'],
-                                            ),
-                            stats = Stats(
-                                          subject = t.findtext('name'),
-                                          rank = int(t.attrib['rank']),
-                                          playcount = int(t.findtext('playcount')),
-                                          ),
-                            url = t.findtext('url'),
-                            )
-                      for t in data.findall('track')
-                     ]
-           )
-        
+        return _WEEKLY_TRACK_CHART_SCHEMA.extract(data, api, subject)
+
 class WeeklyTagChart(TagChart, WeeklyChart):
     """A class for representing the weekly tag charts"""
     @staticmethod
@@ -579,4 +461,79 @@ from lastfm.artist import Artist
 from lastfm.error import InvalidParametersError, LastfmError
 from lastfm.stats import Stats
 from lastfm.track import Track
+
+def _count(text):
+    # the weights of the artist charts can be decimal
+    return int(float(text)) if text else None
+
+def _playcount_stats(subject, items):
+    return Stats(subject = subject,
+        playcount = sum([int(i.findtext('playcount')) for i in items]))
+
+def _count_stats(subject, artists):
+    count_attribute = artists and artists[0].findtext('playcount') and 'playcount' or 'weight'
+    return Stats(subject = subject,
+        **{count_attribute: sum([_count(a.findtext(count_attribute)) for a in artists])})
+
+_WEEKLY_CHART_SCHEMA = Schema(WeeklyChart, {
+    'subject': Arg('subject'),
+    'start':   Timestamp('@from'),
+    'end':     Timestamp('@to'),
+    }, params = ('api', 'subject'), args = ())
+
+_ITEM_STATS_SCHEMA = Schema(Stats, {
+    'subject':   'name',
+    'rank':      Int('@rank'),
+    'playcount': Int('playcount'),
+    }, args = ())
+
+_WEEKLY_ALBUM_CHART_SCHEMA = _WEEKLY_CHART_SCHEMA.extend({
+    '_chart': Entity(_WEEKLY_CHART_SCHEMA),
+    'stats':  Compute(_playcount_stats, Arg('subject'), Elements('album')),
+    'albums': EntityList(Schema(Album, {
+                  'subject': Arg('subject'),
+                  'name':    'name',
+                  'mbid':    'mbid',
+                  'artist':  Entity(Schema(Artist, {
+                                 'subject': Arg('subject'),
+                                 'name':    'artist',
+                                 'mbid':    'artist@mbid',
+                                 }, params = ('api', 'subject'))),
+                  'stats':   Entity(_ITEM_STATS_SCHEMA),
+                  'url':     'url',
+                  }, params = ('api', 'subject')), 'album', subject = Ref('_chart')),
+    }, factory = WeeklyAlbumChart)
+
+_WEEKLY_ARTIST_CHART_SCHEMA = _WEEKLY_CHART_SCHEMA.extend({
+    '_chart':  Entity(_WEEKLY_CHART_SCHEMA),
+    'stats':   Compute(_count_stats, Arg('subject'), Elements('artist')),
+    'artists': EntityList(Schema(Artist, {
+                   'subject': Arg('subject'),
+                   'name':    'name',
+                   'mbid':    'mbid',
+                   'stats':   Entity(Schema(Stats, {
+                                  'subject':   'name',
+                                  'rank':      Int('@rank'),
+                                  'playcount': Compute(_count, 'playcount'),
+                                  'weight':    Compute(_count, 'weight'),
+                                  }, args = ())),
+                   'url':     'url',
+                   }, params = ('api', 'subject')), 'artist', subject = Ref('_chart')),
+    }, factory = WeeklyArtistChart)
+
+_WEEKLY_TRACK_CHART_SCHEMA = _WEEKLY_CHART_SCHEMA.extend({
+    '_chart': Entity(_WEEKLY_CHART_SCHEMA),
+    'stats':  Compute(_playcount_stats, Arg('subject'), Elements('track')),
+    'tracks': EntityList(Schema(Track, {
+                  'subject': Arg('subject'),
+                  'name':    'name',
+                  'mbid':    'mbid',
+                  'artist':  Entity(Schema(Artist, {
+                                 'name': 'artist',
+                                 'mbid': 'artist@mbid',
+                                 })),
+                  'stats':   Entity(_ITEM_STATS_SCHEMA),
+                  'url':     'url',
+                  }, params = ('api', 'subject')), 'track', subject = Ref('_chart')),
+    }, factory = WeeklyTrackChart)
 from lastfm.tag import Tag
\ No newline at end of file
@@ -145,6 +145,11 @@ def async_callback(func, *args, **kwargs):
     If the callback function is not given then the original function is called
     synchronously (it blocks the caller function) and its return value is returned.
     
+    The asynchronous calls are run on the process wide L{ThreadPool}, whose size
+    can be set with L{ThreadPool.set_default_size}. They return a L{Future}, which
+    can be used to wait for the result, or to cancel the call if it has not
+    started yet.
+    
     All the functions on which this decorator is applied get the signature: 
     C{func(self, *args, **kwargs)}. Refer to the documentation or source code of 
     the original function for the correct function signature.
@@ -156,7 +161,7 @@ def async_callback(func, *args, **kwargs):
                     original synchronous (blocking) function
     @rtype:         C{function}
     """
-    from threading import Thread
+    from lastfm.util import ThreadPool
     callback = None
     for a in args:
         if hasattr(a, '__call__'):
@@ -170,16 +175,17 @@ def async_callback(func, *args, **kwargs):
         del kwargs['callback']
     
     if callback is not None and hasattr(callback, '__call__'):
-        def async_call():
-            result = None
-            try:
-                result = func(*args, **kwargs)
-            except Exception, e:
-                result = e
-            callback(result)
-        thread = Thread(target = async_call)
-        thread.start()
-        return
+        def async_call(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                callback(error)
+            else:
+                callback(future.result())
+        future = ThreadPool.get_default().submit(func, *args, **kwargs)
+        future.add_done_callback(async_call)
+        return future
     return func(*args, **kwargs)
 
 import copy
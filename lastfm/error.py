@@ -99,6 +99,17 @@ class TokenExpiredError(LastfmError):#15
     """Token expired - This token has expired"""
     pass
 
+class TemporaryError(LastfmError):#16
+    """
+    Temporary error - There was a temporary error processing your request.
+    Please try again.
+    """
+    pass
+
+class RateLimitExceededError(LastfmError):#29
+    """Rate limit exceeded - Your IP has made too many requests in a short period"""
+    pass
+
 error_map = {
             1: LastfmError,
             2: InvalidServiceError,
@@ -115,5 +126,13 @@ error_map = {
             13: InvalidMethodSignatureError,
             14: TokenNotAuthorizedError,
             15: TokenExpiredError,
+            16: TemporaryError,
+            29: RateLimitExceededError,
 }
 """Map of error codes to the error types"""
+
+transient_errors = set([8, 11, 16, 29])
+"""Codes of the errors which may not occur if the request is tried again later"""
+
+negative_cacheable_errors = set([2, 3, 5, 6, 7])
+"""Codes of the errors which occur every time the request is tried, like a missing resource"""
@@ -8,6 +8,8 @@ __package__ = "lastfm"
 
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
+from lastfm.util.dates import parse_date
+from lastfm.util.schema import Schema, Compute, Entity, EntityList, Images, Int, Text
 
 @mixin("crawlable", "shoutable", "sharable",
     "cacheable", "property_adder")
@@ -22,6 +24,7 @@ class Event(LastfmBase):
             "headliner", "venue", "start_date",
             "description", "image", "url",
             "stats", "tag"]
+        key_properties = ["id"]
 
     def init(self, api, **kwargs):
         """
@@ -57,11 +60,15 @@ class Event(LastfmBase):
         
         self._api = api
         super(Event, self).init(**kwargs)
-        self._stats = hasattr(self, "_stats") and Stats(
-            subject = self,
-            attendance = self._stats.attendance,
-            reviews = self._stats.reviews
-        ) or None
+        self._stats = hasattr(self, "_stats") and self._own_stats(self._stats) or None
+
+    def _own_stats(self, stats):
+        # a copy of the stats, with this object as their subject
+        return Stats(
+                     subject = self,
+                     attendance = stats.attendance,
+                     reviews = stats.reviews
+                     )
 
     def attend(self, status = STATUS_ATTENDING):
         """
@@ -94,10 +101,13 @@ class Event(LastfmBase):
         
         @note: Use the L{Api.get_event} method instead of using this method directly.        
         """
-        params = {'method': 'event.getInfo', 'event': event}
-        data = api._fetch_data(params).find('event')
+        data = api._fetch_data(Event._info_params(event)).find('event')
         return Event.create_from_data(api, data)
 
+    @staticmethod
+    def _info_params(event):
+        return {'method': 'event.getInfo', 'event': event}
+
     @staticmethod
     def create_from_data(api, data):
         """
@@ -113,76 +123,7 @@ class Event(LastfmBase):
         
         @note: Use the L{Api.get_event} method instead of using this method directly.
         """
-        start_date = None
-
-        if data.findtext('startTime') is not None:
-            start_date = datetime(*(
-                time.strptime(
-                    "%s %s" % (
-                        data.findtext('startDate').strip(),
-                        data.findtext('startTime').strip()
-                    ),
-                    '%a, %d %b %Y %H:%M'
-                )[0:6])
-            )
-        else:
-            try:
-                start_date = datetime(*(
-                    time.strptime(
-                        data.findtext('startDate').strip(),
-                        '%a, %d %b %Y %H:%M:%S'
-                    )[0:6])
-                )
-            except ValueError:
-                try:
-                    start_date = datetime(*(
-                        time.strptime(
-                            data.findtext('startDate').strip(),
-                            '%a, %d %b %Y'
-                        )[0:6])
-                    )
-                except ValueError:
-                    pass
-
-        latitude = data.findtext('venue/location/{%s}point/{%s}lat' % ((Location.XMLNS,)*2))
-        longitude = data.findtext('venue/location/{%s}point/{%s}long' % ((Location.XMLNS,)*2))
-        
-        return Event(
-                     api,
-                     id = int(data.findtext('id')),
-                     title = data.findtext('title'),
-                     artists = [Artist(api, name = a.text) for a in data.findall('artists/artist')],
-                     headliner = Artist(api, name = data.findtext('artists/headliner')),
-                     venue = Venue(
-                                   api,
-                                   id = int((data.findtext('venue/url').split('/')[-1]).split('+')[0]),
-                                   name = data.findtext('venue/name'),
-                                   location = Location(
-                                       api,
-                                       city = data.findtext('venue/location/city'),
-                                       country = Country(
-                                            api,
-                                            name = data.findtext('venue/location/country')
-                                            ),
-                                       street = data.findtext('venue/location/street'),
-                                       postal_code = data.findtext('venue/location/postalcode'),
-                                       latitude = (latitude.strip()!= '') and float(latitude) or None,
-                                       longitude = (longitude.strip()!= '') and float(longitude) or None,
-                                       #timezone = data.findtext('venue/location/timezone')
-                                       ),
-                                   url = data.findtext('venue/url')
-                                   ),
-                     start_date = start_date,
-                     description = data.findtext('description'),
-                     image = dict([(i.get('size'), i.text) for i in data.findall('image')]),
-                     url = data.findtext('url'),
-                     stats = Stats(
-                                   subject = int(data.findtext('id')),
-                                   attendance = int(data.findtext('attendance')),
-                                   reviews = int(data.findtext('reviews')),
-                                   ),
-                     tag = data.findtext('tag')
-                    )
+        return _SCHEMA.extract(data, api)
 
     @staticmethod
     def _get_all(seed_event):
@@ -220,12 +161,43 @@ class Event(LastfmBase):
     def __repr__(self):
         return "<lastfm.Event: %s at %s on %s>" % (self.title, self.venue.name, self.start_date.strftime("%x"))
 
-from datetime import datetime
-import time
-
 from lastfm.api import Api
 from lastfm.artist import Artist
 from lastfm.error import InvalidParametersError
-from lastfm.geo import Location, Country
+from lastfm.geo import _LOCATION_SCHEMA
 from lastfm.stats import Stats
 from lastfm.venue import Venue
+
+def _start_date(start_date, start_time):
+    if start_time is not None:
+        return parse_date("%s %s" % (start_date.strip(), start_time.strip()),
+            ('%a, %d %b %Y %H:%M',))
+    return parse_date(start_date, ('%a, %d %b %Y %H:%M:%S', '%a, %d %b %Y'))
+
+def _venue_id(url):
+    return int((url.split('/')[-1]).split('+')[0])
+
+_ARTIST_SCHEMA = Schema(Artist, {'name': Text('')})
+
+_SCHEMA = Schema(Event, {
+    'id':          Int('id'),
+    'title':       'title',
+    'artists':     EntityList(_ARTIST_SCHEMA, 'artists/artist'),
+    'headliner':   Entity(_ARTIST_SCHEMA, 'artists/headliner'),
+    'venue':       Entity(Schema(Venue, {
+                       'id':       Compute(_venue_id, 'url'),
+                       'name':     'name',
+                       'location': Entity(_LOCATION_SCHEMA, 'location'),
+                       'url':      'url',
+                       }), 'venue'),
+    'start_date':  Compute(_start_date, 'startDate', 'startTime'),
+    'description': 'description',
+    'image':       Images(),
+    'url':         'url',
+    'stats':       Entity(Schema(Stats, {
+                       'subject':    Int('id'),
+                       'attendance': Int('attendance'),
+                       'reviews':    Int('reviews'),
+                       }, args = ())),
+    'tag':         'tag',
+    })
@@ -10,6 +10,7 @@ from functools import reduce
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.decorators import cached_property, top_property, depaginate
+from lastfm.util.schema import Schema, Entity, Float
 
 class Geo(object):
     """A class representing an geographic location"""
@@ -615,6 +616,16 @@ class Country(LastfmBase):
     def __repr__(self):
         return "<lastfm.geo.Country: %s>" % self.name
 
+# used by the venues and the events, so defined before the imports below
+_LOCATION_SCHEMA = Schema(Location, {
+    'city':        'city',
+    'country':     Entity(Schema(Country, {'name': 'country'})),
+    'street':      'street',
+    'postal_code': 'postalcode',
+    'latitude':    Float('{%s}point/{%s}lat' % ((Location.XMLNS,)*2)),
+    'longitude':   Float('{%s}point/{%s}long' % ((Location.XMLNS,)*2)),
+    })
+
 from lastfm.api import Api
 from lastfm.artist import Artist
 from lastfm.error import InvalidParametersError
@@ -46,10 +46,10 @@ class Group(LastfmBase):
         params = self._default_params({'method': 'group.getMembers'})
         if page is not None:
             params.update({'page': page})
-        data = self._api._fetch_data(params).find('members')
+        data, users = self._api._fetch_items(params, 'members', 'user')
         total_pages = int(data.attrib['totalPages'])
         yield total_pages
-        for u in data.findall('user'):
+        for u in users:
             yield User(
                 self._api,
                 name = u.findtext('name'),
@@ -9,13 +9,14 @@ def property_adder(cls):
     for p in cls.Meta.properties:
         if not hasattr(cls, p):
             def wrapper():
-                q = p
+                q = "_{0}".format(p)
                 @property
                 def get(self):
-                    try:
-                        return getattr(self, "_{0}".format(q))
-                    except AttributeError:
-                        return None
+                    attrval = getattr(self, q, None)
+                    if attrval is None and self._source is not None:
+                        self._hydrate()
+                        attrval = getattr(self, q, None)
+                    return attrval
                 return get
             setattr(cls, p, wrapper())
             
@@ -23,21 +24,37 @@ def property_adder(cls):
         for p in cls.Meta.fillable_properties:
             if not hasattr(cls, p):
                 def wrapper():
-                    q = p
+                    q = "_{0}".format(p)
                     @property
                     def get(self):
-                        fill = False
-                        try:
-                            attrval = getattr(self, "_{0}".format(q))
-                            if attrval is None:
-                                fill = True
-                            else:
-                                return attrval
-                        except AttributeError:
-                            fill = True
-                        if fill:
+                        attrval = getattr(self, q, None)
+                        if attrval is None and self._source is not None:
+                            self._hydrate()
+                            attrval = getattr(self, q, None)
+                        if attrval is None:
                             self._fill_info()
-                            return getattr(self, "_{0}".format(q))
+                            attrval = getattr(self, q)
+                        return attrval
                     return get
                 setattr(cls, p, wrapper())
-    return cls
\ No newline at end of file
+
+    if not hasattr(cls, '_hydrate'):
+        setattr(cls, '_hydrate', _hydrate)
+    if not hasattr(cls, '_source'):
+        # set on the objects created lazily only
+        setattr(cls, '_source', None)
+    return cls
+
+def _hydrate(self):
+    """
+    Set the properties of an object created lazily, with only its keys, from the
+    values recorded when it was created. See L{lastfm.util.schema.Schema}.
+
+    @return:  True if the object was created lazily and has been read now
+    @rtype:   L{bool}
+    """
+    source = self.__dict__.pop('_source', None)
+    if source is None:
+        return False
+    source[0].fill(self, source)
+    return True
@@ -16,7 +16,27 @@ def searchable(cls):
                limit = None,
                page = None,
                **kwds):
-        from lastfm.api import Api
+        total_pages, matches = cls._search_page(api, search_item, limit, page, **kwds)
+        yield total_pages
+        for a in matches:
+            yield cls._search_yield_func(api, a)
+
+    @classmethod
+    def _search_page(cls,
+                     api,
+                     search_item,
+                     limit = None,
+                     page = None,
+                     **kwds):
+        data = api._fetch_data(cls._search_params(search_item, limit, page, **kwds))
+        return cls._search_matches(data)
+
+    @classmethod
+    def _search_params(cls,
+                       search_item,
+                       limit = None,
+                       page = None,
+                       **kwds):
         cls_name = cls.__name__.lower()
         params = {
                   'method': '%s.search'%cls_name,
@@ -30,19 +50,25 @@ def searchable(cls):
             params.update({'limit': limit})
         if page is not None:
             params.update({'page': page})
-        
-        data = api._fetch_data(params).find('results')
+        return params
+
+    @classmethod
+    def _search_matches(cls, data):
+        from lastfm.api import Api
+        cls_name = cls.__name__.lower()
+        data = data.find('results')
         total_pages = int(data.findtext("{%s}totalResults" % Api.SEARCH_XMLNS))/ \
                             int(data.findtext("{%s}itemsPerPage" % Api.SEARCH_XMLNS)) + 1
-        yield total_pages
-        for a in data.findall('%smatches/%s'%(cls_name, cls_name)):
-            yield cls._search_yield_func(api, a)
+        return (total_pages, data.findall('%smatches/%s'%(cls_name, cls_name)))
 
     @staticmethod
     def _search_yield_func(api, search_term):
         raise NotImplementedError("the subclass should implement this method")
     
     cls.search = search
+    cls._search_page = _search_page
+    cls._search_params = _search_params
+    cls._search_matches = _search_matches
     if not hasattr(cls, '_search_yield_func'):
         cls._search_yield_func = _search_yield_func
         
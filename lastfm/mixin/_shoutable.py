@@ -19,8 +19,7 @@ def shoutable(cls):
                 Shout(
                       body = s.findtext('body'),
                       author = User(self._api, name = s.findtext('author')),
-                      date = s.findtext('date') and s.findtext('date').strip() and \
-                            datetime(*(time.strptime(s.findtext('date').strip(), '%a, %d %b %Y %H:%M:%S')[0:6]))
+                      date = parse_date(s.findtext('date'), ('%a, %d %b %Y %H:%M:%S',))
                       )
                 for s in data.findall('shout')
                 ]
@@ -47,5 +46,4 @@ def shoutable(cls):
     
     return cls
 
-from datetime import datetime
-import time
\ No newline at end of file
+from lastfm.util.dates import parse_date
\ No newline at end of file
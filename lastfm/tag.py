@@ -8,6 +8,7 @@ __package__ = "lastfm"
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin, chartable
 from lastfm.decorators import cached_property, top_property
+from lastfm.util.schema import Schema, Entity, Int
 
 @chartable("artist")
 @mixin("crawlable", "searchable", "cacheable", "property_adder")
@@ -15,6 +16,7 @@ class Tag(LastfmBase):
     """A class representing a tag."""
     class Meta(object):
         properties = ["name", "url", "streamable", "stats"]
+        key_properties = ["name"]
         
     def init(self, api, **kwargs):
         if not isinstance(api, Api):
@@ -22,11 +24,15 @@ class Tag(LastfmBase):
         
         self._api = api
         super(Tag, self).init(**kwargs)
-        self._stats = hasattr(self, '_stats') and Stats(
-                             subject = self,
-                             count = self._stats.count,
-                             rank = self._stats.rank
-                             ) or None
+        self._stats = hasattr(self, '_stats') and self._own_stats(self._stats) or None
+
+    def _own_stats(self, stats):
+        # a copy of the stats, with this object as their subject
+        return Stats(
+                     subject = self,
+                     count = stats.count,
+                     rank = stats.rank
+                     )
 
     @cached_property
     def similar(self):
@@ -154,7 +160,11 @@ class Tag(LastfmBase):
     @staticmethod
     def get_top_tags(api):
         params = {'method': 'tag.getTopTags'}
-        data = api._fetch_data(params).find('toptags')
+        return Tag._create_top_tags(api, api._fetch_data(params))
+
+    @staticmethod
+    def _create_top_tags(api, data):
+        data = data.find('toptags')
         return [
                 Tag(
                     api,
@@ -181,18 +191,6 @@ class Tag(LastfmBase):
             params.update(extra_params)
         return params
 
-    @staticmethod
-    def _search_yield_func(api, tag):
-        return Tag(
-                   api,
-                   name = tag.findtext('name'),
-                   url = tag.findtext('url'),
-                   stats = Stats(
-                                 subject = tag.findtext('name'),
-                                 count = int(tag.findtext('count')),
-                                 )
-                    )
-
     @staticmethod
     def _hash_func(*args, **kwds):
         try:
@@ -218,4 +216,15 @@ from lastfm.artist import Artist
 from lastfm.error import InvalidParametersError
 from lastfm.playlist import Playlist
 from lastfm.stats import Stats
-from lastfm.track import Track
\ No newline at end of file
+from lastfm.track import Track
+
+_SEARCH_SCHEMA = Schema(Tag, {
+    'name':  'name',
+    'url':   'url',
+    'stats': Entity(Schema(Stats, {
+                 'subject': 'name',
+                 'count':   Int('count'),
+                 }, args = ())),
+    }, element_last = True)
+
+Tag._search_yield_func = staticmethod(_SEARCH_SCHEMA.extract)
\ No newline at end of file
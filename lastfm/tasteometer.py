@@ -35,6 +35,13 @@ class Tasteometer(object):
                 type1, type2,
                 value1, value2,
                 limit = None):
+        data = api._fetch_data(Tasteometer._compare_params(type1, type2, value1, value2, limit))
+        return Tasteometer._create_from_data(api, data)
+
+    @staticmethod
+    def _compare_params(type1, type2,
+                        value1, value2,
+                        limit = None):
         params = {
                   'method': 'tasteometer.compare',
                   'type1': type1,
@@ -44,7 +51,11 @@ class Tasteometer(object):
                   }
         if limit is not None:
             params.update({'limit': limit})
-        data = api._fetch_data(params).find('comparison/result')
+        return params
+
+    @staticmethod
+    def _create_from_data(api, data):
+        data = data.find('comparison/result')
         return Tasteometer(
                            score = float(data.findtext('score')),
                            matches = int(data.find('artists').attrib['matches']),
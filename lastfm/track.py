@@ -8,6 +8,7 @@ __package__ = "lastfm"
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.decorators import cached_property, top_property
+from lastfm.util.schema import Schema, Arg, Date, Entity, Flag, Images, Int, Ref
 
 @mixin("crawlable", "sharable", "taggable",
     "searchable", "cacheable", "property_adder")
@@ -19,31 +20,38 @@ class Track(LastfmBase):
             "subject"]
         fillable_properties = ["streamable", "full_track",
             "album", "position", "wiki"]
+        key_properties = ["name", "artist"]
         
     def init(self, api, **kwargs):
         if not isinstance(api, Api):
             raise InvalidParametersError("api reference must be supplied as an argument")
         self._api = api
         super(Track, self).init(**kwargs)
-        self._stats = hasattr(self, "_stats") and Stats(
-                             subject = self,
-                             match = self._stats.match,
-                             playcount = self._stats.playcount,
-                             rank = self._stats.rank,
-                             listeners = self._stats.listeners,
-                            ) or None
+        self._stats = hasattr(self, "_stats") and self._own_stats(self._stats) or None
         self._wiki = hasattr(self, "_wiki") and Wiki(
                          subject = self,
                          published = self._wiki.published,
                          summary = self._wiki.summary,
                          content = self._wiki.content
                         ) or None
+
+    def _own_stats(self, stats):
+        # a copy of the stats, with this object as their subject
+        return Stats(
+                     subject = self,
+                     match = stats.match,
+                     playcount = stats.playcount,
+                     rank = stats.rank,
+                     listeners = stats.listeners,
+                     )
     
     @property
     def wiki(self):
         """wiki of the track"""
         if self._wiki == "na":
             return None
+        if self._wiki is None:
+            self._hydrate()
         if self._wiki is None:
             self._fill_info()
         return self._wiki
@@ -160,16 +168,20 @@ class Track(LastfmBase):
                 track = None,
                 mbid = None):
         data = Track._fetch_data(api, artist, track, mbid)
-        t = Track(
-                  api,
-                  name = data.findtext('name'),
-                  artist = Artist(
-                                  api,
-                                  name = data.findtext('artist/name'),
-                                  ),
-                  )
+        t = Track._create_from_info(api, data)
         t._fill_info()
         return t
+
+    @staticmethod
+    def _create_from_info(api, data):
+        return Track(
+                     api,
+                     name = data.findtext('name'),
+                     artist = Artist(
+                                     api,
+                                     name = data.findtext('artist/name'),
+                                     ),
+                     )
     
     @staticmethod
     def _get_all(seed_track):
@@ -188,25 +200,6 @@ class Track(LastfmBase):
             params.update(extra_params)
         return params
 
-    @staticmethod
-    def _search_yield_func(api, track):
-        return Track(
-                     api,
-                     name = track.findtext('name'),
-                     artist = Artist(
-                                     api,
-                                     name=track.findtext('artist')
-                                     ),
-                    url = track.findtext('url'),
-                    stats = Stats(
-                                  subject=track.findtext('name'),
-                                  listeners=int(track.findtext('listeners'))
-                                  ),
-                    streamable = (track.findtext('streamable') == '1'),
-                    full_track = (track.find('streamable').attrib['fulltrack'] == '1'),
-                    image = dict([(i.get('size'), i.text) for i in track.findall('image')]),
-                    )
-
     @staticmethod
     def _fetch_data(api,
                 artist = None,
@@ -215,50 +208,13 @@ class Track(LastfmBase):
         params = Track._check_params({'method': 'track.getInfo'}, artist, track, mbid)
         return api._fetch_data(params).find('track')
 
-    def _fill_info(self):
-        data = Track._fetch_data(self._api, self.artist.name, self.name)
-        self._id = int(data.findtext('id'))
-        self._mbid = data.findtext('mbid')
-        self._url = data.findtext('url')
-        self._duration = int(data.findtext('duration'))
-        self._streamable = (data.findtext('streamable') == '1')
-        self._full_track = (data.find('streamable').attrib['fulltrack'] == '1')
-
-        self._image = dict([(i.get('size'), i.text) for i in data.findall('image')])
-        self._stats = Stats(
-                       subject = self,
-                       listeners = int(data.findtext('listeners')),
-                       playcount = int(data.findtext('playcount')),
-                       )
-        self._artist = Artist(
-                        self._api,
-                        name = data.findtext('artist/name'),
-                        mbid = data.findtext('artist/mbid'),
-                        url = data.findtext('artist/url')
-                        )
-        if data.find('album') is not None:
-            self._album = Album(
-                                 self._api,
-                                 artist = self._artist,
-                                 name = data.findtext('album/title'),
-                                 mbid = data.findtext('album/mbid'),
-                                 url = data.findtext('album/url'),
-                                 image = dict([(i.get('size'), i.text) for i in data.findall('album/image')])
-                                 )
-            self._position = data.find('album').attrib['position'].strip() \
-                and int(data.find('album').attrib['position'])
-        if data.find('wiki') is not None:
-            self._wiki = Wiki(
-                         self,
-                         published = datetime(*(time.strptime(
-                                                              data.findtext('wiki/published').strip(),
-                                                              '%a, %d %b %Y %H:%M:%S +0000'
-                                                              )[0:6])),
-                         summary = data.findtext('wiki/summary'),
-                         content = data.findtext('wiki/content')
-                         )
-        else:
-            self._wiki = 'na'
+    def _fill_info(self, data = None):
+        if data is None:
+            data = Track._fetch_data(self._api, self.artist.name, self.name)
+        info = _INFO_SCHEMA.extract(data, self._api, self)
+        if info['album'] is None:
+            del info['album'], info['position']
+        super(Track, self).init(**info)
 
     @staticmethod
     def _check_params(params,
@@ -299,9 +255,6 @@ class Track(LastfmBase):
     def __repr__(self):
         return "<lastfm.Track: '%s' by %s>" % (self.name, self.artist.name)
 
-import time
-from datetime import datetime
-
 from lastfm.api import Api
 from lastfm.artist import Artist
 from lastfm.album import Album
@@ -310,3 +263,52 @@ from lastfm.stats import Stats
 from lastfm.tag import Tag
 from lastfm.user import User
 from lastfm.wiki import Wiki
+
+_SEARCH_SCHEMA = Schema(Track, {
+    'name':       'name',
+    'artist':     Entity(Schema(Artist, {'name': 'artist'})),
+    'url':        'url',
+    'stats':      Entity(Schema(Stats, {
+                      'subject':   'name',
+                      'listeners': Int('listeners'),
+                      }, args = ())),
+    'streamable': Flag('streamable'),
+    'full_track': Flag('streamable@fulltrack'),
+    'image':      Images(),
+    }, element_last = True)
+
+Track._search_yield_func = staticmethod(_SEARCH_SCHEMA.extract)
+
+_INFO_SCHEMA = Schema(dict, {
+    'id':         Int('id'),
+    'mbid':       'mbid',
+    'url':        'url',
+    'duration':   Int('duration'),
+    'streamable': Flag('streamable'),
+    'full_track': Flag('streamable@fulltrack'),
+    'image':      Images(),
+    'stats':      Entity(Schema(Stats, {
+                      'subject':   Arg('subject'),
+                      'listeners': Int('listeners'),
+                      'playcount': Int('playcount'),
+                      }, params = ('subject',), args = ())),
+    'artist':     Entity(Schema(Artist, {
+                      'name': 'name',
+                      'mbid': 'mbid',
+                      'url':  'url',
+                      }), 'artist'),
+    'album':      Entity(Schema(Album, {
+                      'artist': Arg('artist'),
+                      'name':   'title',
+                      'mbid':   'mbid',
+                      'url':    'url',
+                      'image':  Images(),
+                      }, params = ('api', 'artist')), 'album', artist = Ref('artist')),
+    'position':   Int('album@position'),
+    'wiki':       Entity(Schema(Wiki, {
+                      'subject':   Arg('subject'),
+                      'published': Date('published', '%a, %d %b %Y %H:%M:%S +0000'),
+                      'summary':   'summary',
+                      'content':   'content',
+                      }, params = ('subject',), args = ()), 'wiki', default = 'na'),
+    }, params = ('api', 'subject'), args = ())
@@ -10,6 +10,8 @@ from lastfm.mixin import chartable, mixin
 import lastfm.playlist
 from lastfm.decorators import (
     cached_property, top_property, authentication_required, depaginate)
+from lastfm.util.dates import parse_date, parse_element_date
+from lastfm.util.schema import Schema, Arg, Compute, Entity, Flag, Images, Int
 
 @chartable('album', 'artist', 'track', 'tag')
 @mixin("crawlable", "shoutable", "cacheable", "property_adder")
@@ -184,12 +186,7 @@ class User(LastfmBase):
                               self._api,
                               id = int(p.findtext('id')),
                               title = p.findtext('title'),
-                              date = datetime(*(
-                                                time.strptime(
-                                                              p.findtext('date').strip(),
-                                                              '%Y-%m-%dT%H:%M:%S'
-                                                              )[0:6])
-                              ),
+                              date = parse_date(p.findtext('date'), ('%Y-%m-%dT%H:%M:%S',)),
                               size = int(p.findtext('size')),
                               creator = self
                               )
@@ -223,12 +220,7 @@ class User(LastfmBase):
                     ),
                     mbid = t.findtext('mbid'),
                     image = dict([(i.get('size'), i.text) for i in t.findall('image')]),
-                    loved_on = datetime(*(
-                        time.strptime(
-                            t.findtext('date').strip(),
-                            '%d %b %Y, %H:%M'
-                            )[0:6])
-                        )
+                    loved_on = parse_element_date(t.find('date'), ('%d %b %Y, %H:%M',))
                     )
                 for t in data.findall('track')
                 ]
@@ -244,10 +236,10 @@ class User(LastfmBase):
             params.update({'to' : timeto})
         if page is not None:
             params.update({'page': page})
-        data = self._api._fetch_data(params, no_cache = True).find('recenttracks')
+        data, tracks = self._api._fetch_items(params, 'recenttracks', 'track')
         total_pages = int(data.attrib['totalPages'])
         yield total_pages
-        for t in data.findall('track'):
+        for t in tracks:
             track = Track(
                       self._api,
                       subject = self,
@@ -274,12 +266,8 @@ class User(LastfmBase):
                       streamable = (t.findtext('streamable') == '1'),
                       url = t.findtext('url'),
                       image = dict([(i.get('size'), i.text) for i in t.findall('image')]),
-                      played_on = datetime(*(
-                                           time.strptime(
-                                                         t.findtext('date').strip(),
-                                                         '%d %b %Y, %H:%M'
-                                                         )[0:6])
-                                           ) if t.findtext('date') else datetime(*datetime.now().timetuple()[0:6]),
+                      played_on = parse_element_date(t.find('date'), ('%d %b %Y, %H:%M',)) or \
+                                  datetime(*datetime.now().timetuple()[0:6]),
                       bypass_registry=True
                       )
             if 'nowplaying' in t.attrib and t.attrib['nowplaying'] == 'true':
@@ -484,6 +472,10 @@ class User(LastfmBase):
     @staticmethod
     def get_info(api, name):
         data = api._fetch_data({'method' : 'user.getInfo', 'user' : name}).find('user')
+        return User._create_from_info(api, data)
+
+    @staticmethod
+    def _create_from_info(api, data):
         user = User(
                 api,
                 name = data.findtext('name'),
@@ -505,6 +497,10 @@ class User(LastfmBase):
     @staticmethod
     def get_authenticated_user(api):
         data = api._fetch_data({'method': 'user.getInfo'}, sign = True, session = True).find('user')
+        return User._create_authenticated(api, data)
+
+    @staticmethod
+    def _create_authenticated(api, data):
         user = User(
                 api,
                 name = data.findtext('name'),
@@ -619,30 +615,12 @@ class User(LastfmBase):
                 params.update({'page': page})
 
             try:
-                data = self._api._fetch_data(params).find('albums')            
+                data, albums = self._api._fetch_items(params, 'albums', 'album')
                 total_pages = int(data.attrib['totalPages'])
                 yield total_pages
     
-                for a in data.findall('album'):
-                    yield Album(
-                                self._api,
-                                subject = self,
-                                name = a.findtext('name'),
-                                artist = Artist(
-                                                self._api,
-                                                subject = self,
-                                                name = a.findtext('artist/name'),
-                                                mbid = a.findtext('artist/mbid'),
-                                                url = a.findtext('artist/url'),
-                                                ),
-                                mbid = a.findtext('mbid'),
-                                url = a.findtext('url'),
-                                image = dict([(i.get('size'), i.text) for i in a.findall('image')]),
-                                stats = Stats(
-                                              subject = a.findtext('name'),
-                                              playcount = int(a.findtext('playcount')),
-                                              )
-                                )
+                for a in albums:
+                    yield _LIBRARY_ALBUM_SCHEMA.extract(a, self._api, self)
             except LastfmError:
                 yield None
 
@@ -682,20 +660,7 @@ class User(LastfmBase):
                 yield total_pages
                 
                 for a in data.findall('artist'):
-                    yield Artist(
-                                 self._api,
-                                 subject = self,
-                                 name = a.findtext('name'),
-                                 mbid = a.findtext('mbid'),
-                                 stats = Stats(
-                                               subject = a.findtext('name'),
-                                               playcount = a.findtext('playcount') and int(a.findtext('playcount')) or None,
-                                               tagcount = a.findtext('tagcount') and int(a.findtext('tagcount')) or None
-                                               ),
-                                 url = a.findtext('url'),
-                                 streamable = (a.findtext('streamable') == "1"),
-                                 image = dict([(i.get('size'), i.text) for i in a.findall('image')]),
-                                 )
+                    yield _LIBRARY_ARTIST_SCHEMA.extract(a, self._api, self)
             except LastfmError:
                 yield None
 
@@ -722,32 +687,12 @@ class User(LastfmBase):
                 params.update({'page': page})
             
             try:
-                data = self._api._fetch_data(params).find('tracks')
+                data, tracks = self._api._fetch_items(params, 'tracks', 'track')
                 total_pages = int(data.attrib['totalPages'])
                 yield total_pages
                 
-                for t in data.findall('track'):
-                    yield Track(
-                                self._api,
-                                subject = self,
-                                name = t.findtext('name'),
-                                artist = Artist(
-                                                self._api,
-                                                subject = self,
-                                                name = t.findtext('artist/name'),
-                                                mbid = t.findtext('artist/mbid'),
-                                                url = t.findtext('artist/url'),
-                                                ),
-                                mbid = t.findtext('mbid'),
-                                stats = Stats(
-                                              subject = t.findtext('name'),
-                                              playcount = t.findtext('playcount') and int(t.findtext('playcount')) or None,
-                                              tagcount = t.findtext('tagcount') and int(t.findtext('tagcount')) or None
-                                              ),
-                                streamable = (t.findtext('streamable') == '1'),
-                                full_track = (t.find('streamable').attrib['fulltrack'] == '1'),
-                                image = dict([(i.get('size'), i.text) for i in t.findall('image')]),
-                                )
+                for t in tracks:
+                    yield _LIBRARY_TRACK_SCHEMA.extract(t, self._api, self)
             except LastfmError:
                 yield None
 
@@ -794,7 +739,6 @@ class User(LastfmBase):
             return "<lastfm.User.Library: for user '%s'>" % self.user.name
 
 from datetime import datetime
-import time
 
 from lastfm.api import Api
 from lastfm.artist import Artist
@@ -806,3 +750,55 @@ from lastfm.stats import Stats
 from lastfm.tag import Tag
 from lastfm.tasteometer import Tasteometer
 from lastfm.track import Track
+
+def _count(text):
+    # the counts of the libraries are None when they are zero
+    return text and int(text) or None
+
+_LIBRARY_STATS_SCHEMA = Schema(Stats, {
+    'subject':   'name',
+    'playcount': Compute(_count, 'playcount'),
+    'tagcount':  Compute(_count, 'tagcount'),
+    }, params = (), args = ())
+
+_LIBRARY_ARTIST_SCHEMA = Schema(Artist, {
+    'subject':    Arg('subject'),
+    'name':       'name',
+    'mbid':       'mbid',
+    'url':        'url',
+    'stats':      Entity(_LIBRARY_STATS_SCHEMA),
+    'streamable': Flag('streamable'),
+    'image':      Images(),
+    }, params = ('api', 'subject'))
+
+# the artists of the albums and the tracks of the libraries
+_ITEM_ARTIST_SCHEMA = Schema(Artist, {
+    'subject': Arg('subject'),
+    'name':    'artist/name',
+    'mbid':    'artist/mbid',
+    'url':     'artist/url',
+    }, params = ('api', 'subject'))
+
+_LIBRARY_ALBUM_SCHEMA = Schema(Album, {
+    'subject': Arg('subject'),
+    'name':    'name',
+    'artist':  Entity(_ITEM_ARTIST_SCHEMA),
+    'mbid':    'mbid',
+    'url':     'url',
+    'image':   Images(),
+    'stats':   Entity(Schema(Stats, {
+                   'subject':   'name',
+                   'playcount': Int('playcount'),
+                   }, params = (), args = ())),
+    }, params = ('api', 'subject'))
+
+_LIBRARY_TRACK_SCHEMA = Schema(Track, {
+    'subject':    Arg('subject'),
+    'name':       'name',
+    'artist':     Entity(_ITEM_ARTIST_SCHEMA),
+    'mbid':       'mbid',
+    'stats':      Entity(_LIBRARY_STATS_SCHEMA),
+    'streamable': Flag('streamable'),
+    'full_track': Flag('streamable@fulltrack'),
+    'image':      Images(),
+    }, params = ('api', 'subject'))
@@ -6,8 +6,26 @@ __package__ = "lastfm.util"
 from lastfm.util.wormhole import Wormhole
 from lastfm.util._lazylist import lazylist
 from lastfm.util.safelist import SafeList
+from lastfm.util.compression import ZlibCodec
 from lastfm.util.filecache import FileCache
+from lastfm.util.memorycache import MemoryCache
+from lastfm.util.sqlitecache import SqliteCache
+from lastfm.util.cacheserver import CacheServer, CacheClient
+from lastfm.util.snapshot import SnapshotWriter, SnapshotReader, export_snapshot, import_snapshot
+from lastfm.util.parsedcache import ParsedCache
+from lastfm.util.jsontree import JsonElement
+from lastfm.util.schema import Schema
 from lastfm.util.objectcache import ObjectCache
+from lastfm.util.ratelimiter import RateLimiter
+from lastfm.util.transport import UrllibTransport, PooledTransport
+from lastfm.util.threadpool import ThreadPool, Future, CancelledError
+from lastfm.util.singleflight import SingleFlight
+from lastfm.util.metrics import Metrics, Histogram
 
 __all__ = ['Wormhole', 'lazylist', 'SafeList',
-           'FileCache', 'ObjectCache']
\ No newline at end of file
+           'ZlibCodec', 'FileCache', 'MemoryCache', 'SqliteCache', 'ParsedCache',
+           'CacheServer', 'CacheClient', 'SnapshotWriter', 'SnapshotReader',
+           'export_snapshot', 'import_snapshot',
+           'ObjectCache', 'JsonElement', 'Schema', 'RateLimiter',
+           'UrllibTransport', 'PooledTransport', 'ThreadPool', 'Future',
+           'CancelledError', 'SingleFlight', 'Metrics', 'Histogram']
\ No newline at end of file
@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+"""Module for the single threaded event loop and the non-blocking HTTP client"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import asyncore
+import bisect
+import fcntl
+import itertools
+import os
+import socket
+import sys
+import time
+import urlparse
+from threading import Lock
+
+from lastfm.util.threadpool import ThreadPool
+from lastfm.util.transport import Response
+
+class EventLoop(object):
+    """
+    An asyncore based event loop, with support for timed calls. All the
+    callbacks are called in the thread running the loop.
+
+    The host names are resolved on the default L{ThreadPool}, so a slow lookup
+    does not hold up the loop, and the addresses are remembered for
+    L{RESOLVE_TTL} seconds. The HTTP connections are kept alive, and reused by
+    the later requests to the same host.
+    """
+    RESOLVE_TTL = 300
+    """Time, in seconds, for which a resolved address is used"""
+
+    KEEP_ALIVE_TIMEOUT = 15
+    """Time, in seconds, after which an idle connection is not reused"""
+
+    MAX_IDLE_CONNECTIONS = 8
+    """Maximum number of idle connections kept for a host"""
+
+    def __init__(self):
+        self._map = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        self._lock = Lock()
+        self._threadsafe_calls = []
+        self._waker = None
+        self._busy = 0
+        self._addresses = {}
+        self._resolving = {}
+        self._idle = {}
+
+    @property
+    def socket_map(self):
+        """
+        the asyncore socket map of the loop
+        @rtype: L{dict}
+        """
+        return self._map
+
+    def call_later(self, delay, func, *args):
+        """
+        Schedule a function to be called after some time.
+
+        @param delay:  the time, in seconds, after which the function is called
+        @type delay:   L{float}
+        @param func:   the function to call
+        @type func:    C{function}
+
+        @return:       the scheduled call, which can be given to L{cancel}
+        @rtype:        L{tuple}
+        """
+        timer = (time.time() + delay, self._sequence.next(), func, args)
+        bisect.insort(self._timers, timer)
+        return timer
+
+    def cancel(self, timer):
+        """
+        Cancel a scheduled call, if it has not been made yet.
+
+        @param timer:  the scheduled call returned by L{call_later}
+        @type timer:   L{tuple}
+        """
+        i = bisect.bisect_left(self._timers, timer)
+        if i < len(self._timers) and self._timers[i] is timer:
+            del self._timers[i]
+
+    def call_soon(self, func, *args):
+        """
+        Schedule a function to be called in the next iteration of the loop.
+
+        @param func:   the function to call
+        @type func:    C{function}
+        """
+        self.call_later(0, func, *args)
+
+    def call_soon_threadsafe(self, func, *args):
+        """
+        Schedule a function to be called in the next iteration of the loop,
+        from another thread. The loop is woken up if it is waiting.
+
+        @param func:   the function to call
+        @type func:    C{function}
+        """
+        with self._lock:
+            self._threadsafe_calls.append((func, args))
+            waker = self._waker
+        if waker is not None:
+            waker.wake()
+
+    def pending(self):
+        """
+        Is there any scheduled call or request in progress?
+        @rtype: L{bool}
+        """
+        return bool(self._timers or self._busy or self._threadsafe_calls)
+
+    def run(self, timeout = None):
+        """
+        Run the loop till there is no more work to do.
+
+        @param timeout:  maximum time, in seconds, to run the loop for (optional)
+        @type timeout:   L{float}
+        """
+        end = timeout is not None and time.time() + timeout or None
+        while self.pending():
+            now = time.time()
+            if end is not None and now >= end:
+                break
+            with self._lock:
+                calls, self._threadsafe_calls = self._threadsafe_calls, []
+            for (func, args) in calls:
+                func(*args)
+            while self._timers and self._timers[0][0] <= now:
+                (due, seq, func, args) = self._timers.pop(0)
+                func(*args)
+            if not self.pending():
+                break
+            wait = 1.0
+            if self._timers:
+                wait = max(0, self._timers[0][0] - time.time())
+            if end is not None:
+                wait = min(wait, max(0, end - time.time()))
+            if self._threadsafe_calls:
+                wait = 0
+            if self._map:
+                asyncore.loop(wait, True, self._map, 1)
+            else:
+                time.sleep(wait)
+
+    def close(self):
+        """Close the idle connections, and the other sockets of the loop."""
+        self._idle = {}
+        for dispatcher in self._map.values():
+            dispatcher.close()
+        with self._lock:
+            self._waker = None
+
+    def resolve(self, host, port, callback):
+        """
+        Resolve the address of a host, without blocking the loop. The callback
+        function is called on the loop with the address, or with the exception
+        raised by the lookup.
+
+        @param host:      the host name
+        @type host:       L{str}
+        @param port:      the port
+        @type port:       L{int}
+        @param callback:  callback function
+        @type callback:   C{function}
+        """
+        key = (host, port)
+        cached = self._addresses.get(key)
+        if cached is not None and cached[0] > time.time():
+            self.call_soon(callback, cached[1])
+            return
+        try:
+            # a numeric address needs no lookup
+            self.call_soon(callback, _getaddrinfo(host, port, socket.AI_NUMERICHOST))
+            return
+        except socket.gaierror:
+            pass
+        if key in self._resolving:
+            self._resolving[key].append(callback)
+            return
+        self._resolving[key] = [callback]
+        self._start_waker()
+        def lookup():
+            try:
+                result = _getaddrinfo(host, port)
+            except Exception, e:
+                result = e
+            self.call_soon_threadsafe(self._resolved, key, result)
+        ThreadPool.get_default().submit(lookup)
+
+    def _resolved(self, key, result):
+        if not isinstance(result, Exception):
+            self._addresses[key] = (time.time() + EventLoop.RESOLVE_TTL, result)
+        for callback in self._resolving.pop(key, []):
+            callback(result)
+
+    def _start_waker(self):
+        with self._lock:
+            if self._waker is None:
+                self._waker = _Waker(self._map)
+
+    def _acquire(self, key):
+        pool = self._idle.get(key, [])
+        now = time.time()
+        while pool:
+            (connection, last_used) = pool.pop()
+            if now - last_used < EventLoop.KEEP_ALIVE_TIMEOUT and connection.connected:
+                return connection
+            connection.close()
+        return None
+
+    def _release(self, connection):
+        pool = self._idle.setdefault(connection.key, [])
+        if len(pool) < EventLoop.MAX_IDLE_CONNECTIONS:
+            pool.append((connection, time.time()))
+        else:
+            connection.close()
+
+    def _forget(self, connection):
+        pool = self._idle.get(connection.key, [])
+        for (i, (c, last_used)) in enumerate(pool):
+            if c is connection:
+                del pool[i]
+                break
+
+def _getaddrinfo(host, port, flags = 0):
+    return socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM, 0, flags)[0][4]
+
+class _Waker(asyncore.file_dispatcher):
+    """The read end of a pipe, written to for waking the loop up from another thread."""
+    def __init__(self, map):
+        (read_fd, self._write_fd) = os.pipe()
+        asyncore.file_dispatcher.__init__(self, read_fd, map)
+        os.close(read_fd)
+        flags = fcntl.fcntl(self._write_fd, fcntl.F_GETFL, 0)
+        fcntl.fcntl(self._write_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    def wake(self):
+        try:
+            os.write(self._write_fd, 'x')
+        except OSError:
+            # the pipe is full, the loop has been woken up already
+            pass
+
+    def writable(self):
+        return False
+
+    def handle_read(self):
+        self.recv(4096)
+
+    def close(self):
+        asyncore.file_dispatcher.close(self)
+        try:
+            os.close(self._write_fd)
+        except OSError:
+            pass
+
+class HttpRequest(object):
+    """
+    A non-blocking HTTP/1.1 request. It is sent on an idle connection to the
+    host, if the loop has one, or else on a new connection, which is kept
+    alive for the later requests.
+    """
+    def __init__(self, loop, url, data = None, headers = None, callback = None,
+                 timeout = None):
+        """
+        Create a request and start sending it.
+
+        @param loop:       the event loop to run the request on
+        @type loop:        L{EventLoop}
+        @param url:        the URL to request
+        @type url:         L{str}
+        @param data:       urlencoded data to post (optional)
+        @type data:        L{str}
+        @param headers:    HTTP headers to send (optional)
+        @type headers:     L{dict}
+        @param callback:   function called with the L{Response}, or with the
+                           exception if the request fails
+        @type callback:    C{function}
+        @param timeout:    time, in seconds, after which the request fails with
+                           C{socket.timeout} if it has not completed (optional)
+        @type timeout:     L{float}
+        """
+        (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(url)
+        selector = urlparse.urlunparse(('', '', path or '/', params, query, ''))
+        host, port = netloc, 80
+        if ':' in netloc:
+            host, port = netloc.split(':', 1)
+            port = int(port)
+        headers = dict(headers or {})
+        headers['Host'] = netloc
+        if data is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Content-Length'] = str(len(data))
+        lines = ["%s %s HTTP/1.1" % (data is None and 'GET' or 'POST', selector)]
+        lines.extend(["%s: %s" % (k, v) for (k, v) in headers.items()])
+        self.message = "\r\n".join(lines) + "\r\n\r\n" + (data or '')
+        self._key = (host, port)
+        self._callback = callback
+        self._finished = False
+        self._retried = False
+        self._connection = None
+        self._loop = loop
+        self._loop._busy += 1
+        self._deadline = timeout is not None and loop.call_later(timeout, self._expire) or None
+        connection = loop._acquire(self._key)
+        if connection is not None:
+            connection.start(self, True)
+        else:
+            self._connect()
+
+    def _connect(self):
+        self._loop.resolve(self._key[0], self._key[1], self._resolved)
+
+    def _resolved(self, address):
+        if self._finished:
+            return
+        if isinstance(address, Exception):
+            self._finish(address)
+            return
+        connection = _HttpConnection(self._loop, self._key)
+        connection.start(self, False)
+        try:
+            connection.connect(address)
+        except socket.error, e:
+            connection.close()
+            self._finish(e)
+
+    def _retry(self):
+        # the server closed the kept-alive connection before answering, which
+        # is not an error, try once more on a new connection
+        self._retried = True
+        self._connection = None
+        self._connect()
+
+    def _expire(self):
+        self._deadline = None
+        connection = self._connection
+        if connection is not None:
+            connection.close()
+        self._finish(socket.timeout("the request timed out"))
+
+    def _finish(self, result):
+        if self._finished:
+            return
+        self._finished = True
+        self._connection = None
+        self._loop._busy -= 1
+        if self._deadline is not None:
+            self._loop.cancel(self._deadline)
+        if self._callback is not None:
+            self._callback(result)
+
+class _HttpConnection(asyncore.dispatcher):
+    """A connection to an HTTP server, which sends one request at a time."""
+    def __init__(self, loop, key):
+        asyncore.dispatcher.__init__(self, map = loop.socket_map)
+        self.key = key
+        self._loop = loop
+        self._request = None
+        self._reused = False
+        self._out = ''
+        self._in = ''
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    def start(self, request, reused):
+        self._request = request
+        self._reused = reused
+        self._out = request.message
+        self._in = ''
+        request._connection = self
+        if reused:
+            self._loop._forget(self)
+
+    def writable(self):
+        return bool(self._out) or not self.connected
+
+    def handle_connect(self):
+        pass
+
+    def handle_write(self):
+        sent = self.send(self._out)
+        self._out = self._out[sent:]
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if not data or self._request is None:
+            # the closed connections are handled by handle_close
+            return
+        self._in += data
+        try:
+            parsed = _parse(self._in, False)
+        except ValueError, e:
+            self._fail(e)
+            return
+        if parsed is not None:
+            self._complete(*parsed)
+
+    def handle_close(self):
+        request = self._request
+        try:
+            error = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except socket.error:
+            error = 0
+        self.close()
+        if request is None:
+            return
+        if not self._in:
+            if self._reused and not request._retried:
+                request._retry()
+                return
+            if error:
+                request._finish(socket.error(error, os.strerror(error)))
+                return
+        try:
+            parsed = _parse(self._in, True)
+            if parsed is None:
+                raise ValueError("incomplete HTTP response")
+        except ValueError, e:
+            request._finish(e)
+            return
+        request._finish(parsed[0])
+
+    def handle_error(self):
+        request = self._request
+        self.close()
+        if request is not None:
+            request._finish(sys.exc_info()[1])
+
+    def close(self):
+        self._request = None
+        self._loop._forget(self)
+        asyncore.dispatcher.close(self)
+
+    def _fail(self, error):
+        request = self._request
+        self.close()
+        request._finish(error)
+
+    def _complete(self, response, keep_alive):
+        request = self._request
+        self._request = None
+        if keep_alive:
+            self._loop._release(self)
+        else:
+            self.close()
+        request._finish(response)
+
+def _parse(raw, closed):
+    """
+    Parse a response, received so far on a connection.
+
+    @return:  None if the response is not complete yet, or else the L{Response}
+              and whether the connection can be reused
+    @rtype:   L{tuple}
+    """
+    head, sep, body = raw.partition("\r\n\r\n")
+    if not sep:
+        if closed:
+            raise ValueError("incomplete HTTP response")
+        return None
+    lines = head.split("\r\n")
+    (version, status) = lines[0].split(None, 2)[:2]
+    status = int(status)
+    headers = {}
+    for line in lines[1:]:
+        name, value = line.split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = version == 'HTTP/1.1' and \
+        headers.get('connection', '').lower() != 'close'
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = _dechunk(body)
+        if body is None:
+            return None
+    elif 'content-length' in headers:
+        length = int(headers['content-length'])
+        if len(body) < length:
+            return None
+        body = body[:length]
+    elif not closed:
+        # the body ends when the server closes the connection
+        return None
+    else:
+        keep_alive = False
+    return (Response(status, headers, body), keep_alive)
+
+def _dechunk(body):
+    chunks = []
+    while True:
+        size, sep, rest = body.partition("\r\n")
+        if not sep:
+            return None
+        size = int(size.split(';')[0], 16)
+        if size == 0:
+            # the trailers end with an empty line
+            if rest.startswith("\r\n") or "\r\n\r\n" in rest:
+                return ''.join(chunks)
+            return None
+        if len(rest) < size + 2:
+            return None
+        chunks.append(rest[:size])
+        body = rest[size+2:]
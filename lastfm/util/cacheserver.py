@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+"""
+Module for sharing one response cache between the processes of a host, through a
+local cache server listening on a Unix domain socket.
+
+Run the server as::
+    python -m lastfm.util.cacheserver --socket /tmp/lastfm.sock --persist /var/cache/lastfm
+and install a L{CacheClient} in the L{Api} of every worker process::
+    api.set_cache(CacheClient('/tmp/lastfm.sock'))
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Event, Lock, Thread, local
+import os
+import socket
+import SocketServer
+import stat
+import tempfile
+import time
+
+from lastfm.util.compression import ZlibCodec
+from lastfm.util.filecache import FileCache, _get_username
+from lastfm.util.memorycache import MemoryCache
+from lastfm.util.sqlitecache import SqliteCache, _encode_validators, _decode_validators
+
+class CacheServer(object):
+    """
+    A cache server, keeping the responses in a L{MemoryCache} (which can write
+    through to a L{FileCache} or a L{SqliteCache} for persistence) and serving them
+    to the L{CacheClient}s connected to its Unix domain socket. Since only the server
+    writes to the persistent cache, the processes sharing it do not race each other.
+
+    The server also hands out fetch leases, so that of all the processes of the host
+    missing the same response, only one fetches it while the others wait for it to be
+    cached. A lease is given up when its holder releases it, disconnects, or holds it
+    for longer than C{lease_timeout} seconds.
+    """
+    DEFAULT_LEASE_TIMEOUT = 60
+
+    def __init__(self, path = None, cache = None, lease_timeout = None):
+        """
+        Create a cache server. It starts serving on L{serve_forever} or L{start}.
+
+        @param path:            path of the socket. By default it is created in the
+                                temporary directory (optional)
+        @type path:             L{str}
+        @param cache:           the cache to keep the responses in (optional)
+        @type cache:            L{MemoryCache}
+        @param lease_timeout:   time, in seconds, after which an unreleased fetch lease
+                                is given up (optional)
+        @type lease_timeout:    L{float}
+
+        @raise socket.error:    if another server is listening on the socket already
+        @raise NotImplementedError: if the platform has no Unix domain sockets
+        """
+        if _UnixServer is None:
+            raise NotImplementedError("CacheServer requires Unix domain sockets")
+        self._path = os.path.abspath(path or _get_default_path())
+        self._cache = cache is not None and cache or MemoryCache()
+        self._lease_timeout = lease_timeout or CacheServer.DEFAULT_LEASE_TIMEOUT
+        self._leases = {}
+        self._connections = set()
+        self._lock = Lock()
+        self._thread = None
+        _remove_stale_socket(self._path)
+        self._server = _UnixServer(self._path, _RequestHandler)
+        self._server.cache_server = self
+        os.chmod(self._path, 0600)
+
+    @property
+    def path(self):
+        """
+        path of the socket
+        @rtype: L{str}
+        """
+        return self._path
+
+    @property
+    def cache(self):
+        """
+        the cache keeping the responses
+        @rtype: L{MemoryCache}
+        """
+        return self._cache
+
+    def serve_forever(self):
+        """Serve the clients till L{shutdown} is called."""
+        self._server.serve_forever()
+
+    def start(self):
+        """Serve the clients in a background thread."""
+        self._thread = Thread(target = self.serve_forever, name = 'lastfm-cache-server')
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop serving, close the connections of the clients, and remove the socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        if hasattr(self._cache, 'Flush'):
+            self._cache.Flush()
+
+    def _dispatch(self, owner, fields):
+        handler = fields and getattr(self, '_do_' + fields[0].lower(), None)
+        if handler is None:
+            raise ValueError("unknown command: %r" % (fields and fields[0]))
+        return handler(owner, *fields[1:])
+
+    def _do_get(self, owner, key):
+        return [self._cache.Get(key)]
+
+    def _do_set(self, owner, key, data):
+        self._cache.Set(key, data)
+        return []
+
+    def _do_remove(self, owner, key):
+        self._cache.Remove(key)
+        return []
+
+    def _do_time(self, owner, key):
+        cached_time = self._cache.GetCachedTime(key)
+        return [cached_time is not None and repr(cached_time) or None]
+
+    def _do_validators(self, owner, key):
+        if not hasattr(self._cache, 'GetValidators'):
+            return ['']
+        return [_encode_validators(self._cache.GetValidators(key))]
+
+    def _do_setvalidators(self, owner, key, validators):
+        if hasattr(self._cache, 'SetValidators'):
+            self._cache.SetValidators(key, _decode_validators(validators))
+        return []
+
+    def _do_touch(self, owner, key):
+        if hasattr(self._cache, 'Touch'):
+            self._cache.Touch(key)
+        return []
+
+    def _do_clear(self, owner):
+        if hasattr(self._cache, 'Clear'):
+            self._cache.Clear()
+        return []
+
+    def _do_acquire(self, owner, key, wait):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or lease[1] <= time.time():
+                if lease is not None:
+                    lease[2].set()
+                self._leases[key] = (owner, time.time() + self._lease_timeout, Event())
+                return ['1']
+        lease[2].wait(max(0, min(float(wait), lease[1] - time.time())))
+        return ['0']
+
+    def _do_release(self, owner, key):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] is owner:
+                del self._leases[key]
+                lease[2].set()
+        return []
+
+    def _release_all(self, owner):
+        with self._lock:
+            for (key, lease) in self._leases.items():
+                if lease[0] is owner:
+                    del self._leases[key]
+                    lease[2].set()
+
+    def __repr__(self):
+        return "<lastfm.util.CacheServer: %s>" % self._path
+
+class CacheClient(object):
+    """
+    A client of a L{CacheServer}. It supports the same API as the L{FileCache} and can
+    be installed with L{Api.set_cache}. Each thread uses its own connection to the
+    server, and a broken connection is reopened once before the call fails with a
+    C{socket.error}.
+
+    The L{Api} uses the L{Acquire} and L{Release} methods to fetch each response at
+    most once for all the processes sharing the server.
+    """
+    DEFAULT_TIMEOUT = 90
+
+    def __init__(self, path = None, timeout = None):
+        """
+        Create a cache client.
+
+        @param path:      path of the socket of the server. By default it is the
+                          default path of the L{CacheServer} (optional)
+        @type path:       L{str}
+        @param timeout:   time, in seconds, after which a call to the server fails
+                          (optional)
+        @type timeout:    L{float}
+
+        @raise NotImplementedError: if the platform has no Unix domain sockets
+        """
+        if _UnixServer is None:
+            raise NotImplementedError("CacheClient requires Unix domain sockets")
+        self._path = os.path.abspath(path or _get_default_path())
+        self._timeout = timeout or CacheClient.DEFAULT_TIMEOUT
+        self._local = local()
+
+    @property
+    def path(self):
+        """
+        path of the socket of the server
+        @rtype: L{str}
+        """
+        return self._path
+
+    def Get(self, key):
+        return self._call('GET', key)[0]
+
+    def Set(self, key, data):
+        self._call('SET', key, data)
+
+    def Remove(self, key):
+        self._call('REMOVE', key)
+
+    def GetCachedTime(self, key):
+        cached_time = self._call('TIME', key)[0]
+        return cached_time is not None and float(cached_time) or None
+
+    def GetValidators(self, key):
+        return _decode_validators(self._call('VALIDATORS', key)[0])
+
+    def SetValidators(self, key, validators):
+        self._call('SETVALIDATORS', key, _encode_validators(validators))
+
+    def Touch(self, key):
+        self._call('TOUCH', key)
+
+    def Clear(self):
+        """Drop all the entries kept by the server."""
+        self._call('CLEAR')
+
+    def Acquire(self, key, wait):
+        """
+        Acquire the fetch lease of a response. If another process holds it, wait till
+        it is released, for at most C{wait} seconds.
+
+        @param key:     the key of the response
+        @type key:      L{str}
+        @param wait:    maximum time, in seconds, to wait for the lease
+        @type wait:     L{float}
+
+        @return:        True if the lease is acquired, and the caller has to fetch the
+                        response and L{Release} the lease. False if another process
+                        held it, and the response may be in the cache now
+        @rtype:         L{bool}
+        """
+        return self._call('ACQUIRE', key, repr(float(wait)))[0] == '1'
+
+    def Release(self, key):
+        """
+        Release the fetch lease of a response.
+
+        @param key:     the key of the response
+        @type key:      L{str}
+        """
+        self._call('RELEASE', key)
+
+    def Close(self):
+        """Close the connection of this thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            try:
+                conn[1].close()
+            except socket.error:
+                pass
+            conn[0].close()
+
+    def _call(self, *fields):
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                _write_message(conn[1], fields)
+                reply = _read_message(conn[1])
+                break
+            except (socket.error, EOFError), e:
+                self.Close()
+                if attempt:
+                    if isinstance(e, EOFError):
+                        raise socket.error("connection closed by the cache server")
+                    raise
+        if reply[0] != 'OK':
+            raise IOError("cache server error: %s" % reply[1])
+        return reply[1:]
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self._timeout)
+            sock.connect(self._path)
+            conn = self._local.conn = (sock, sock.makefile('rwb'))
+        return conn
+
+    def __repr__(self):
+        return "<lastfm.util.CacheClient: %s>" % self._path
+
+if hasattr(socket, 'AF_UNIX'):
+    class _UnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+        daemon_threads = True
+else:
+    # like on Windows, where the rest of the package works without the cache server
+    _UnixServer = None
+
+class _RequestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        server = self.server.cache_server
+        with server._lock:
+            server._connections.add(self.request)
+        try:
+            while True:
+                try:
+                    fields = _read_message(self.rfile)
+                except (EOFError, socket.error, ValueError):
+                    # closed, or out of step with a client sending malformed lengths
+                    break
+                try:
+                    reply = ['OK'] + server._dispatch(self, fields)
+                except Exception, e:
+                    reply = ['ERR', "%s: %s" % (e.__class__.__name__, e)]
+                _write_message(self.wfile, reply)
+        finally:
+            server._release_all(self)
+            with server._lock:
+                server._connections.discard(self.request)
+
+# A message is the number of its fields on a line, followed by each field as its
+# length on a line and its bytes. A None field has the length -1.
+
+def _write_message(f, fields):
+    parts = ["%d\n" % len(fields)]
+    for field in fields:
+        if field is None:
+            parts.append("-1\n")
+        else:
+            parts.append("%d\n" % len(field))
+            parts.append(field)
+    f.write(''.join(parts))
+    f.flush()
+
+def _read_message(f):
+    line = f.readline()
+    if not line:
+        raise EOFError
+    fields = []
+    for i in xrange(int(line)):
+        length = int(f.readline())
+        if length < 0:
+            fields.append(None)
+            continue
+        field = f.read(length)
+        if len(field) != length:
+            raise EOFError
+        fields.append(field)
+    return fields
+
+def _remove_stale_socket(path):
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise socket.error("%s exists and is not a socket" % path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error:
+            os.remove(path)
+            return
+    finally:
+        sock.close()
+    raise socket.error("a cache server is listening on %s already" % path)
+
+def _get_default_path():
+    return os.path.join(tempfile.gettempdir(), 'python.cache_%s.sock' % _get_username())
+
+def main(argv = None):
+    from optparse import OptionParser
+    parser = OptionParser(usage = "%prog [options]",
+        description = "Serve a response cache shared by the processes of this host.")
+    parser.add_option("-S", "--socket", help = "path of the socket")
+    parser.add_option("-m", "--max-bytes", type = "int",
+        help = "maximum total size, in bytes, of the responses kept in memory")
+    parser.add_option("-p", "--persist", help = "directory of a file cache to write through to")
+    parser.add_option("-s", "--sqlite", help = "path of a SQLite cache to write through to")
+    parser.add_option("-l", "--lease-timeout", type = "float",
+        help = "time, in seconds, after which an unreleased fetch lease is given up")
+    (options, args) = parser.parse_args(argv)
+    if args:
+        parser.error("no arguments are expected")
+
+    backend = None
+    if options.sqlite:
+        backend = SqliteCache(options.sqlite, codec = ZlibCodec())
+    elif options.persist:
+        backend = FileCache(options.persist, codec = ZlibCodec())
+    server = CacheServer(options.socket,
+        MemoryCache(options.max_bytes, backend = backend), options.lease_timeout)
+    print "serving the cache on %s" % server.path
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Module for compressing the cached responses"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import zlib
+
+class ZlibCodec(object):
+    """
+    Compresses the data stored by a cache with zlib. The compressed data starts with
+    a format header, so the data stored without compression (like the entries cached
+    before the codec was installed) is still read correctly.
+    """
+    MAGIC = '\x00lfz1'
+    """The header of the compressed data. An XML response never starts with it."""
+
+    def __init__(self, level = 6, threshold = 1024):
+        """
+        Create a codec.
+
+        @param level:       the zlib compression level, from 1 (fastest) to 9 (smallest)
+                            (optional)
+        @type level:        L{int}
+        @param threshold:   size, in bytes, below which the data is stored uncompressed
+                            (optional)
+        @type threshold:    L{int}
+        """
+        if not 0 <= level <= 9:
+            raise ValueError("level must be between 0 and 9")
+        self._level = level
+        self._threshold = threshold
+
+    @property
+    def level(self):
+        """
+        the zlib compression level
+        @rtype: L{int}
+        """
+        return self._level
+
+    @property
+    def threshold(self):
+        """
+        size, in bytes, below which the data is stored uncompressed
+        @rtype: L{int}
+        """
+        return self._threshold
+
+    def encode(self, data):
+        """
+        Compress the data, if it is large enough and compression makes it smaller.
+
+        @param data:   the data to compress
+        @type data:    L{str}
+
+        @return:       the data to store
+        @rtype:        L{str}
+        """
+        if len(data) < self._threshold:
+            return data
+        compressed = ZlibCodec.MAGIC + zlib.compress(data, self._level)
+        if len(compressed) >= len(data):
+            return data
+        return compressed
+
+    @staticmethod
+    def decode(data):
+        """
+        Decompress the stored data, if it is compressed.
+
+        @param data:   the stored data
+        @type data:    L{str}
+
+        @return:       the original data
+        @rtype:        L{str}
+        """
+        if data is not None and data.startswith(ZlibCodec.MAGIC):
+            return zlib.decompress(data[len(ZlibCodec.MAGIC):])
+        return data
+
+    def __repr__(self):
+        return "<lastfm.util.ZlibCodec: level=%s, threshold=%s>" % (self._level, self._threshold)
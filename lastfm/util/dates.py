@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""Module for parsing the dates of the responses"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import re
+import time
+from datetime import datetime
+
+MAX_MEMO_ENTRIES = 4096
+"""Maximum number of parsed dates remembered by L{parse_date}."""
+
+_MONTHS = dict([(m, i + 1) for (i, m) in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])])
+
+# the values of the fields of one or two digits, looked up faster than converted
+_NUMBERS = dict([('%d' % i, i) for i in xrange(100)] + [('%02d' % i, i) for i in xrange(10)])
+
+# the directives of the formats parsed without time.strptime, with the regexps of
+# their values, the arguments of datetime they give and how
+_DIRECTIVES = {
+    'Y': (r'(\d{4})', 0, 'int(%s)'),
+    'm': (r'(\d{1,2})', 1, '_NUMBERS[%s]'),
+    'b': (r'([A-Za-z]{3})', 1, '_MONTHS[%s.lower()]'),
+    'd': (r'(\d{1,2})', 2, '_NUMBERS[%s]'),
+    'H': (r'(\d{1,2})', 3, '_NUMBERS[%s]'),
+    'M': (r'(\d{1,2})', 4, '_NUMBERS[%s]'),
+    'S': (r'(\d{1,2})', 5, '_NUMBERS[%s]'),
+    'a': (r'[A-Za-z]{3}', None, None),
+    }
+_DIRECTIVE_RE = re.compile(r'%(.)|(\s+)|([^%\s]+)')
+
+_parsers = {}
+_memo = {}
+
+def _compile(format):
+    """
+    Compile a format into a function parsing the dates of the format, or return None
+    if it has a directive parsed only by C{time.strptime}.
+    """
+    pattern, args = [], ['1900', '1', '1', '0', '0', '0']
+    for (directive, space, literal) in _DIRECTIVE_RE.findall(format):
+        if directive:
+            if directive not in _DIRECTIVES:
+                return None
+            (regexp, arg, expr) = _DIRECTIVES[directive]
+            pattern.append(regexp)
+            if arg is not None:
+                args[arg] = expr % ('g[%d]' % (len([p for p in pattern if '(' in p]) - 1))
+        elif space:
+            pattern.append(r'\s+')
+        else:
+            pattern.append(re.escape(literal))
+    source = """def parse(text):
+    m = match(text)
+    if m is None:
+        raise ValueError("%%r does not match the format %%r" %% (text, format))
+    g = m.groups()
+    try:
+        return datetime(%s)
+    except KeyError:
+        raise ValueError("%%r has no month of the format %%r" %% (text, format))
+""" % ", ".join(args)
+    namespace = {'match': re.compile("".join(pattern) + '$').match, 'format': format,
+                 'datetime': datetime, '_MONTHS': _MONTHS, '_NUMBERS': _NUMBERS}
+    exec compile(source, "<date format %r>" % format, 'exec') in namespace
+    return namespace['parse']
+
+def _parse(text, format):
+    try:
+        parse = _parsers[format]
+    except KeyError:
+        parse = _parsers[format] = _compile(format)
+    if parse is None:
+        return datetime(*time.strptime(text, format)[0:6])
+    return parse(text)
+
+def parse_date(text, formats, uts = None):
+    """
+    Parse a date with the first of the formats matching it, or from its UNIX
+    timestamp if it is given, like in the C{uts} attribute of the dates of the
+    scrobbles. The common formats of the responses are parsed by regexps instead
+    of C{time.strptime}, and the parsed dates are remembered.
+
+    @param text:     the date
+    @type text:      L{str}
+    @param formats:  the C{time.strptime} formats to try
+    @type formats:   L{tuple}
+    @param uts:      the UNIX timestamp of the date (optional)
+    @type uts:       L{str}
+
+    @return:         the date, or None if it is blank or no format matches
+    @rtype:          C{datetime.datetime}
+    """
+    if uts:
+        return parse_timestamp(uts)
+    if text is None:
+        return None
+    key = (text, formats)
+    date = _memo.get(key, _memo)
+    if date is not _memo:
+        return date
+    date = None
+    stripped = text.strip()
+    if stripped:
+        for format in formats:
+            try:
+                date = _parse(stripped, format)
+                break
+            except ValueError:
+                pass
+    if len(_memo) >= MAX_MEMO_ENTRIES:
+        _memo.clear()
+    _memo[key] = date
+    return date
+
+def parse_timestamp(uts):
+    """
+    Convert a UNIX timestamp to a UTC date.
+
+    @param uts:      the timestamp
+    @type uts:       L{str}
+
+    @return:         the date, or None if the timestamp is blank
+    @rtype:          C{datetime.datetime}
+    """
+    if not uts:
+        return None
+    return datetime.utcfromtimestamp(int(uts))
+
+def parse_element_date(elem, formats):
+    """
+    Parse the date of an element, from its C{uts} attribute if it has one, else
+    from its text.
+
+    @param elem:     the element, or None
+    @type elem:      C{xml.etree.ElementTree.Element}
+    @param formats:  the C{time.strptime} formats to try on the text
+    @type formats:   L{tuple}
+
+    @return:         the date, or None
+    @rtype:          C{datetime.datetime}
+    """
+    if elem is None:
+        return None
+    return parse_date(elem.text, formats, elem.get('uts'))
@@ -16,65 +16,450 @@ else:
     def md5hash(string):
         return md5(string).hexdigest()
     
+import errno
 import os
 import tempfile
+import time
+from threading import Lock, Thread, Event
+
+from lastfm.util.compression import ZlibCodec
+
+def _missing(error):
+    # the file was removed meanwhile, by an eviction, a collection or another process
+    return getattr(error, 'errno', None) == errno.ENOENT
+
+def _get_username():
+    '''Attempt to find the username in a cross-platform fashion.'''
+    try:
+        login = os.getlogin()
+    except (AttributeError, OSError):
+        # no controlling terminal, or not supported by the platform
+        login = None
+    return os.getenv('USER') or \
+        os.getenv('LOGNAME') or \
+        os.getenv('USERNAME') or \
+        login or \
+        'nobody'
 
 class _FileCacheError(Exception):
     """Base exception class for FileCache related errors"""
 
 class FileCache(object):
+    """
+    A cache of the responses, stored as one file per response under a root directory.
+
+    The cache can be bounded by the total size of the files and/or by the number of
+    entries. When a write takes it over a bound, entries are evicted till it is back
+    under L{LOW_WATER} of the bound: first the expired ones (older than C{max_age}),
+    then the least recently used ones. The footprint is found by walking the directory
+    tree once, and is then tracked as the entries are written and removed.
+
+    The expired entries can also be removed by L{Collect}, either directly, from a
+    background thread started by L{StartCollector}, or from the command line::
+        python -m lastfm.util.filecache --max-age 3600 --max-size 100000000 /tmp/cache
+
+    The HTTP validators of a response are kept in a small file next to it. The
+    responses can be stored compressed, by giving a L{ZlibCodec}.
+    """
     DEPTH = 3
+    LOW_WATER = 0.9
+    VALIDATORS_SUFFIX = '.validators'
+
+    def __init__(self, root_directory = None, max_size = None, max_entries = None,
+                 max_age = None, codec = None):
+        """
+        Create a file cache.
 
-    def __init__(self,root_directory=None):
+        @param root_directory:   the directory to keep the files in (optional)
+        @type root_directory:    L{str}
+        @param max_size:         maximum total size, in bytes, of the files (optional)
+        @type max_size:          L{int}
+        @param max_entries:      maximum number of entries (optional)
+        @type max_entries:       L{int}
+        @param max_age:          age, in seconds, after which the entries are expired,
+                                 usually the cache timeout of the L{Api} (optional)
+        @type max_age:           L{int}
+        @param codec:            the codec to compress the stored responses with. The
+                                 compressed responses are read correctly even without
+                                 it (optional)
+        @type codec:             L{ZlibCodec}
+        """
         self._InitializeRootDirectory(root_directory)
+        self._codec = codec
+        self._max_size = max_size
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._index = None
+        self._size = 0
+        self._lock = Lock()
+        self._gc_queue = []
+        self._collector = None
+        self._collector_stop = None
+
+    @property
+    def size(self):
+        """
+        total size, in bytes, of the files in the cache
+        @rtype: L{int}
+        """
+        self._GetIndex()
+        return self._size
+
+    @property
+    def entries(self):
+        """
+        number of entries in the cache
+        @rtype: L{int}
+        """
+        return len(self._GetIndex())
 
     def Get(self,key):
         path = self._GetPath(key)
-        if os.path.exists(path):
-            return open(path).read()
-        else:
+        try:
+            data = open(path, 'rb').read()
+        except (IOError, OSError), e:
+            if not _missing(e):
+                raise
+            self._Forget(path)
             return None
+        if self._index is not None:
+            with self._lock:
+                entry = self._index.get(path)
+                if entry is not None:
+                    entry[1] = time.time()
+        return ZlibCodec.decode(data)
 
     def Set(self,key,data):
         path = self._GetPath(key)
+        if self._codec is not None:
+            data = self._codec.encode(data)
+        self._WriteFile(path, data)
+        self._RemoveFile(path + FileCache.VALIDATORS_SUFFIX)
+        now = time.time()
+        self._Track(path, len(data), now, now)
+
+    def Remove(self,key):
+        path = self._GetPath(key)
+        if not path.startswith(self._root_directory):
+            raise _FileCacheError('%s does not appear to live under %s' %
+                                  (path, self._root_directory ))
+        self._RemoveFile(path)
+        self._RemoveFile(path + FileCache.VALIDATORS_SUFFIX)
+        self._Forget(path)
+
+    def GetCachedTime(self,key):
+        path = self._GetPath(key)
+        try:
+            return os.path.getmtime(path)
+        except OSError, e:
+            if not _missing(e):
+                raise
+            self._Forget(path)
+            return None
+
+    def GetValidators(self, key):
+        """
+        Get the HTTP validators (like the C{etag} and C{last-modified} headers)
+        of a cached response.
+
+        @param key:    the key of the response
+        @type key:     L{str}
+
+        @return:       the validators, with lowercased header names
+        @rtype:        L{dict}
+        """
+        return self._ReadValidators(self._GetPath(key))
+
+    def SetValidators(self, key, validators):
+        """
+        Store the HTTP validators of a cached response.
+
+        @param key:          the key of the response
+        @type key:           L{str}
+        @param validators:   the validators, with lowercased header names
+        @type validators:    L{dict}
+        """
+        path = self._GetPath(key)
+        if not os.path.exists(path):
+            return
+        self._WriteFile(path + FileCache.VALIDATORS_SUFFIX,
+            ''.join(["%s: %s\n" % (k, v) for (k, v) in validators.items()]))
+
+    def Touch(self, key):
+        """
+        Mark a cached response as fetched just now, without rewriting it.
+
+        @param key:    the key of the response
+        @type key:     L{str}
+        """
+        path = self._GetPath(key)
+        try:
+            os.utime(path, None)
+        except OSError, e:
+            if not _missing(e):
+                raise
+            self._Forget(path)
+            return
+        if self._index is not None:
+            now = time.time()
+            with self._lock:
+                entry = self._index.get(path)
+                if entry is not None:
+                    entry[1] = entry[2] = now
+
+    def Entries(self):
+        """
+        Iterate over the entries of the cache, in no particular order. The entries are
+        identified by their hashed keys, as the keys themselves are not stored.
+
+        @return:   the hashed key, the cached time, the data and the validators of
+                   each entry
+        @rtype:    iterator of L{tuple}
+        """
+        for (directory, dirs, files) in os.walk(self._root_directory):
+            for name in files:
+                if len(name) != 32 or name.endswith(FileCache.VALIDATORS_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    cached_time = os.path.getmtime(path)
+                    data = ZlibCodec.decode(open(path, 'rb').read())
+                except (OSError, IOError):
+                    continue
+                yield (name, cached_time, data, self._ReadValidators(path))
+
+    def SetEntry(self, hashed_key, data, cached_time, validators = None):
+        """
+        Store an entry with the cached time it had in another cache, as read by the
+        L{Entries} of that cache. A copy of the entry cached later is kept instead.
+
+        @param hashed_key:   the hashed key of the entry
+        @type hashed_key:    L{str}
+        @param data:         the data of the entry
+        @type data:          L{str}
+        @param cached_time:  the time at which the entry was cached
+        @type cached_time:   L{float}
+        @param validators:   the validators of the entry (optional)
+        @type validators:    L{dict}
+
+        @return:             True if the entry is stored, False if it is kept
+        @rtype:              L{bool}
+        """
+        path = self._GetHashedPath(hashed_key)
+        # the modification times of the files may be less precise than the cached time
+        try:
+            if os.path.getmtime(path) >= cached_time - 0.001:
+                return False
+        except OSError, e:
+            if not _missing(e):
+                raise
+        if self._codec is not None:
+            data = self._codec.encode(data)
+        self._WriteFile(path, data)
+        os.utime(path, (cached_time, cached_time))
+        if validators:
+            self._WriteFile(path + FileCache.VALIDATORS_SUFFIX,
+                ''.join(["%s: %s\n" % (k, v) for (k, v) in validators.items()]))
+        else:
+            self._RemoveFile(path + FileCache.VALIDATORS_SUFFIX)
+        self._Track(path, len(data), time.time(), cached_time)
+        return True
+
+    def Collect(self, limit = None):
+        """
+        Remove the expired entries and evict entries till the cache is within its
+        bounds. The pass can be done incrementally: if a limit is given, only that
+        many entries are checked for expiry, and the next call carries on from there.
+
+        @param limit:    maximum number of entries to check (optional)
+        @type limit:     L{int}
+
+        @return:         the number of entries removed
+        @rtype:          L{int}
+        """
+        index = self._GetIndex()
+        removed = 0
+        if self._max_age is not None:
+            with self._lock:
+                if not self._gc_queue:
+                    self._gc_queue = index.keys()
+                if limit is None:
+                    paths, self._gc_queue = self._gc_queue, []
+                else:
+                    paths, self._gc_queue = self._gc_queue[:limit], self._gc_queue[limit:]
+                expiry = time.time() - self._max_age
+                expired = [p for p in paths if p in index and index[p][2] < expiry]
+            for path in expired:
+                removed += self._RemovePath(path)
+        if self._OverBounds():
+            removed += self._Evict()
+        return removed
+
+    def StartCollector(self, interval = 60, limit = 1000):
+        """
+        Start a background thread which calls L{Collect} periodically.
+
+        @param interval:  time, in seconds, between the passes (optional)
+        @type interval:   L{float}
+        @param limit:     maximum number of entries checked per pass (optional)
+        @type limit:      L{int}
+        """
+        if self._collector is not None:
+            return
+        stop = self._collector_stop = Event()
+        def run():
+            while not stop.isSet():
+                try:
+                    self.Collect(limit)
+                except (OSError, IOError):
+                    pass
+                stop.wait(interval)
+        self._collector = Thread(target = run, name = 'FileCache collector')
+        self._collector.setDaemon(True)
+        self._collector.start()
+
+    def StopCollector(self):
+        """Stop the background thread started by L{StartCollector}."""
+        if self._collector is None:
+            return
+        self._collector_stop.set()
+        self._collector.join()
+        self._collector = None
+
+    def Rescan(self):
+        """Walk the directory tree again to find the footprint of the cache."""
+        with self._lock:
+            self._index = None
+        self._GetIndex()
+
+    def _GetIndex(self):
+        if self._index is not None:
+            return self._index
+        index = {}
+        size = 0
+        for (directory, dirs, files) in os.walk(self._root_directory):
+            for name in files:
+                if name.endswith(FileCache.VALIDATORS_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                index[path] = [stat.st_size, max(stat.st_atime, stat.st_mtime), stat.st_mtime]
+                size += stat.st_size
+        with self._lock:
+            if self._index is None:
+                self._index = index
+                self._size = size
+            return self._index
+
+    def _Track(self, path, size, used, cached_time):
+        if self._max_size is not None or self._max_entries is not None:
+            self._GetIndex()
+        if self._index is None:
+            return
+        with self._lock:
+            entry = self._index.pop(path, None)
+            if entry is not None:
+                self._size -= entry[0]
+            self._index[path] = [size, used, cached_time]
+            self._size += size
+        if self._OverBounds():
+            self._Evict()
+
+    def _ReadValidators(self, path):
+        try:
+            lines = open(path + FileCache.VALIDATORS_SUFFIX).read().splitlines()
+        except (IOError, OSError), e:
+            if not _missing(e):
+                raise
+            return {}
+        validators = {}
+        for line in lines:
+            name, sep, value = line.partition(':')
+            if sep:
+                validators[name.strip()] = value.strip()
+        return validators
+
+    def _OverBounds(self):
+        return (self._max_size is not None and self._size > self._max_size) or \
+            (self._max_entries is not None and len(self._index) > self._max_entries)
+
+    def _Evict(self):
+        with self._lock:
+            target_size = self._max_size is not None and \
+                int(self._max_size * FileCache.LOW_WATER) or None
+            target_entries = self._max_entries is not None and \
+                int(self._max_entries * FileCache.LOW_WATER) or None
+            expiry = self._max_age is not None and time.time() - self._max_age or None
+            # expired entries first, then the least recently used ones
+            candidates = sorted(self._index.items(),
+                key = lambda (p, (s, used, cached)):
+                    (expiry is None or cached >= expiry, used))
+            size = self._size
+            entries = len(self._index)
+            victims = []
+            for (path, (s, used, cached)) in candidates:
+                if (target_size is None or size <= target_size) and \
+                   (target_entries is None or entries <= target_entries):
+                    break
+                victims.append(path)
+                size -= s
+                entries -= 1
+        removed = 0
+        for path in victims:
+            removed += self._RemovePath(path)
+        return removed
+
+    def _RemovePath(self, path):
+        for p in (path, path + FileCache.VALIDATORS_SUFFIX):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        return self._Forget(path)
+
+    def _RemoveFile(self, path):
+        try:
+            os.remove(path)
+        except OSError, e:
+            if not _missing(e):
+                raise
+
+    def _WriteFile(self, path, data):
         directory = os.path.dirname(path)
         if not os.path.exists(directory):
-            os.makedirs(directory)
+            try:
+                os.makedirs(directory)
+            except OSError, e:
+                # made meanwhile by another writer
+                if e.errno != errno.EEXIST:
+                    raise
         if not os.path.isdir(directory):
             raise _FileCacheError('%s exists but is not a directory' % directory)
         temp_fd, temp_path = tempfile.mkstemp()
-        temp_fp = os.fdopen(temp_fd, 'w')
+        temp_fp = os.fdopen(temp_fd, 'wb')
         temp_fp.write(data)
         temp_fp.close()
         if not path.startswith(self._root_directory):
             raise _FileCacheError('%s does not appear to live under %s' %
                                   (path, self._root_directory))
-        if os.path.exists(path):
-            os.remove(path)
+        self._RemoveFile(path)
         os.rename(temp_path, path)
 
-    def Remove(self,key):
-        path = self._GetPath(key)
-        if not path.startswith(self._root_directory):
-            raise _FileCacheError('%s does not appear to live under %s' %
-                                  (path, self._root_directory ))
-        if os.path.exists(path):
-            os.remove(path)
-
-    def GetCachedTime(self,key):
-        path = self._GetPath(key)
-        if os.path.exists(path):
-            return os.path.getmtime(path)
-        else:
-            return None
+    def _Forget(self, path):
+        if self._index is None:
+            return 0
+        with self._lock:
+            entry = self._index.pop(path, None)
+            if entry is None:
+                return 0
+            self._size -= entry[0]
+            return 1
 
     def _GetUsername(self):
-        '''Attempt to find the username in a cross-platform fashion.'''
-        return os.getenv('USER') or \
-            os.getenv('LOGNAME') or \
-            os.getenv('USERNAME') or \
-            os.getlogin() or \
-            'nobody'
+        return _get_username()
 
     def _GetTmpCachePath(self):
         username = self._GetUsername()
@@ -93,10 +478,35 @@ class FileCache(object):
         self._root_directory = root_directory
 
     def _GetPath(self,key):
-        hashed_key = md5hash(key)
+        return self._GetHashedPath(md5hash(key))
+
+    def _GetHashedPath(self, hashed_key):
         return os.path.join(self._root_directory,
                             self._GetPrefix(hashed_key),
                             hashed_key)
 
     def _GetPrefix(self,hashed_key):
         return os.path.sep.join(hashed_key[0:FileCache.DEPTH])
+
+def main(argv = None):
+    from optparse import OptionParser
+    parser = OptionParser(usage = "%prog [options] [cache directory]",
+        description = "Remove the expired entries from a FileCache and "
+                      "evict entries till it is within the given bounds.")
+    parser.add_option("-a", "--max-age", type = "int",
+        help = "age, in seconds, after which the entries are expired")
+    parser.add_option("-s", "--max-size", type = "int",
+        help = "maximum total size, in bytes, of the cache")
+    parser.add_option("-n", "--max-entries", type = "int",
+        help = "maximum number of entries in the cache")
+    (options, args) = parser.parse_args(argv)
+    if len(args) > 1:
+        parser.error("only one cache directory can be given")
+    cache = FileCache(args and args[0] or None, max_size = options.max_size,
+        max_entries = options.max_entries, max_age = options.max_age)
+    removed = cache.Collect()
+    print "removed %d entries, %d entries (%d bytes) left in %s" % \
+        (removed, cache.entries, cache.size, cache._root_directory)
+
+if __name__ == '__main__':
+    main()
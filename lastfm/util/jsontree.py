@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""Module for reading the JSON responses of the web service like the XML ones"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import re
+
+try:
+    import json
+except ImportError:
+    try:
+        import simplejson as json
+    except ImportError:
+        json = None
+
+NAMESPACES = {
+    'http://www.w3.org/2003/01/geo/wgs84_pos#': 'geo',
+    'http://a9.com/-/spec/opensearch/1.1/': 'opensearch',
+}
+"""
+The prefixes of the XML namespaces, as they appear in the keys of the JSON responses.
+The elements of the other namespaces appear by their local names.
+"""
+
+# the namespaces of the steps of a path have slashes in them
+_STEP_RE = re.compile(r'(?:\{[^}]*\})?[^/]+')
+
+class JsonElement(object):
+    """
+    A read only view of a value decoded from a JSON response of the web service, with
+    the part of the C{ElementTree} element API used to create the objects from the
+    responses: L{find}, L{findall}, L{findtext}, L{get}, L{attrib}, L{text} and L{tag}.
+
+    The JSON responses follow the XML ones: the child elements become keys, the
+    repeated ones become lists, the text of an element having attributes becomes
+    the C{#text} key, and the attributes become either keys next to it or the keys
+    of an C{@attr} object. Both kinds of keys are looked up as attributes. The
+    namespaced elements, like C{{http://www.w3.org/2003/01/geo/wgs84_pos#}lat}, are
+    looked up by their prefixed names, like C{geo:lat}.
+
+    The schemas (see L{lastfm.util.Schema}) do not go through the view: given one,
+    they read the decoded value with the functions of this module.
+    """
+    __slots__ = ('tag', '_value')
+
+    def __init__(self, tag, value):
+        """
+        @param tag:      name of the element
+        @type tag:       L{str}
+        @param value:    the decoded JSON value of the element
+        @type value:     L{dict} or L{unicode}
+        """
+        self.tag = tag
+        self._value = value
+
+    @property
+    def text(self):
+        """
+        text of the element, or None
+        @rtype: L{unicode}
+        """
+        return text(self._value)
+
+    @property
+    def attrib(self):
+        """
+        attributes of the element
+        @rtype: L{dict}
+        """
+        value = self._value
+        if value.__class__ is not dict:
+            return {}
+        attrib = dict([(k, _scalar(v)) for (k, v) in value.iteritems()
+                       if k != '#text' and not isinstance(v, (dict, list))])
+        attrib.update([(k, _scalar(v)) for (k, v) in value.get('@attr', {}).iteritems()])
+        return attrib
+
+    def get(self, key, default = None):
+        value = attribute(self._value, key)
+        if value is None:
+            return default
+        return value
+
+    def keys(self):
+        return self.attrib.keys()
+
+    def items(self):
+        return self.attrib.items()
+
+    def find(self, path):
+        if '/' in path:
+            elements = self._select(path)
+            if not elements:
+                return None
+            return elements[0]
+        value = child(self._value, json_key(path))
+        if value is None:
+            return None
+        return JsonElement(path, value)
+
+    def findall(self, path):
+        return self._select(path)
+
+    def findtext(self, path, default = None):
+        if '/' in path:
+            element = self.find(path)
+            if element is None:
+                return default
+            return element.text or ''
+        # the usual lookup of the text of a child, without a view of it
+        value = self._value
+        if value.__class__ is not dict:
+            return default
+        value = value.get(path[:1] == '{' and json_key(path) or path)
+        if value is None:
+            return default
+        if value.__class__ is unicode:
+            return value
+        return found_text(value)
+
+    def getchildren(self):
+        return self._children('*')
+
+    def __iter__(self):
+        return iter(self._children('*'))
+
+    def __len__(self):
+        return len(self._children('*'))
+
+    def __nonzero__(self):
+        # an element with no children is false, as in ElementTree
+        return len(self) != 0
+
+    def _select(self, path):
+        if '/' not in path and '{' not in path:
+            return self._children(path)
+        elements = [self]
+        for tag in _STEP_RE.findall(path):
+            elements = [c for e in elements for c in e._children(tag)]
+        return elements
+
+    def _children(self, tag):
+        value = self._value
+        if value.__class__ is not dict:
+            return []
+        if tag == '*':
+            return [JsonElement(k, c) for (k, v) in value.iteritems()
+                    if k not in ('#text', '@attr') for c in children(v)]
+        key = json_key(tag)
+        return [JsonElement(tag, c) for c in children(value.get(key))]
+
+    def __repr__(self):
+        return "<lastfm.util.JsonElement: %s>" % self.tag
+
+def json_key(tag):
+    """
+    Return the key of the JSON responses standing for a tag of the XML responses.
+
+    @param tag:      the tag, which can be namespaced
+    @type tag:       L{str}
+
+    @return:         the key
+    @rtype:          L{str}
+    """
+    if tag[:1] != '{':
+        return tag
+    namespace, tag = tag[1:].split('}', 1)
+    if namespace in NAMESPACES:
+        return '%s:%s' % (NAMESPACES[namespace], tag)
+    return tag
+
+# The functions below read the decoded values like the methods of JsonElement, and are
+# called by the compiled schemas. A value is a dict, a unicode string, or None.
+
+def child(value, key):
+    """Return the value of the first child element of a value, by its key, or None."""
+    if value.__class__ is not dict:
+        return None
+    value = value.get(key)
+    if value.__class__ is list:
+        return value[0] if value else None
+    return value
+
+def children(value):
+    """Return the values of the elements of a key, which can be repeated, as a list."""
+    if value is None:
+        return []
+    if value.__class__ is list:
+        return value
+    return [value]
+
+def text(value):
+    """Return the text of the element of a value, or None, like its C{text}."""
+    if value.__class__ is dict:
+        value = value.get('#text')
+    if value == '':
+        # as in ElementTree, an empty element has no text
+        return None
+    return _scalar(value)
+
+def found_text(value):
+    """Return the text of the element of a value, or C{''}, like C{findtext} does."""
+    if value is None:
+        return None
+    if value.__class__ is list:
+        value = value and value[0]
+    return text(value) or ''
+
+def attribute(value, name):
+    """Return an attribute of the element of a value, or None."""
+    if value.__class__ is not dict:
+        return None
+    attrs = value.get('@attr')
+    if attrs is not None and name in attrs:
+        return _scalar(attrs[name])
+    value = value.get(name)
+    if value.__class__ is dict or value.__class__ is list:
+        return None
+    return _scalar(value)
+
+def element(tag, value):
+    """Return a L{JsonElement} of a value, or None."""
+    if value is None:
+        return None
+    return JsonElement(tag, value)
+
+def elements(tag, values):
+    """Return the L{JsonElement}s of a list of values."""
+    return [JsonElement(tag, v) for v in values]
+
+def images(values):
+    """Return the URLs of the values of C{image} elements, by their sizes."""
+    return dict([(attribute(i, 'size'), text(i)) for i in values])
+
+def image_record(values):
+    """Return the sizes and the URLs of the values of C{image} elements, in a flat tuple."""
+    return tuple([v for i in values for v in (attribute(i, 'size'), text(i))])
+
+def _scalar(value):
+    if value.__class__ is unicode or value.__class__ is str or value is None:
+        return value
+    if isinstance(value, bool):
+        return value and u'1' or u'0'
+    if isinstance(value, (dict, list)):
+        return None
+    return unicode(value)
+
+def fromstring(text):
+    """
+    Decode a JSON response of the web service. The returned root element looks like
+    the C{lfm} root element of the XML responses, with a C{status} attribute and, for
+    the error responses, an C{error} element with a C{code} attribute.
+
+    @param text:     the JSON response
+    @type text:      L{str}
+
+    @return:         the root element
+    @rtype:          L{JsonElement}
+
+    @raise ValueError: if the response is not valid JSON
+    """
+    if json is None:
+        raise ImportError("Install the simplejson package for using the JSON format")
+    value = json.loads(text)
+    if value.__class__ is not dict:
+        raise ValueError("the response is not a JSON object")
+    if 'error' in value and not isinstance(value['error'], (dict, list)):
+        return JsonElement('lfm', {'@attr': {'status': 'failed'},
+            'error': {'#text': value.get('message'), 'code': value['error']}})
+    value['@attr'] = {'status': 'ok'}
+    return JsonElement('lfm', value)
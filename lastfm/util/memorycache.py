@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""Module for caching the responses in memory"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Lock
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = None
+
+class MemoryCache(object):
+    """
+    A least recently used cache of the responses, bounded by the total size of the
+    data kept. It supports the same API as the L{FileCache}, and can sit in front of
+    a L{FileCache} (or any other object supporting its API), in which case all the
+    writes go to both, and the data read from the backend is kept in memory too.
+
+    The cached time of an entry is kept along with it, so the cache timeout of the
+    L{Api} applies in the same way, and a lookup of a hot entry does not touch the
+    backend at all.
+    """
+    DEFAULT_MAX_BYTES = 8*1024*1024
+
+    def __init__(self, max_bytes = None, backend = None):
+        """
+        Create a memory cache.
+
+        @param max_bytes:    maximum total size, in bytes, of the data kept in memory
+                             (optional)
+        @type max_bytes:     L{int}
+        @param backend:      the cache to read from on misses and to write through to
+                             (optional)
+        @type backend:       L{FileCache}
+        """
+        if max_bytes is None:
+            max_bytes = MemoryCache.DEFAULT_MAX_BYTES
+        self._max_bytes = max_bytes
+        self._backend = backend
+        self._entries = OrderedDict is not None and OrderedDict() or _OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    @property
+    def backend(self):
+        """
+        the cache behind the memory cache
+        @rtype: L{FileCache}
+        """
+        return self._backend
+
+    @property
+    def max_bytes(self):
+        """
+        maximum total size, in bytes, of the data kept in memory
+        @rtype: L{int}
+        """
+        return self._max_bytes
+
+    @property
+    def size(self):
+        """
+        total size, in bytes, of the data kept in memory
+        @rtype: L{int}
+        """
+        return self._size
+
+    def Get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                return entry[0]
+        if self._backend is None:
+            return None
+        data = self._backend.Get(key)
+        if data is not None:
+            cached_time = self._backend.GetCachedTime(key)
+            if cached_time is not None:
+                self._store(key, data, cached_time)
+        return data
+
+    def Set(self, key, data):
+        if self._backend is not None:
+            self._backend.Set(key, data)
+        self._store(key, data, time.time())
+
+    def Remove(self, key):
+        with self._lock:
+            self._discard(key)
+        if self._backend is not None:
+            self._backend.Remove(key)
+
+    def GetCachedTime(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[1]
+        if self._backend is None:
+            return None
+        return self._backend.GetCachedTime(key)
+
+    def GetValidators(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None:
+                return entry[2]
+        if hasattr(self._backend, 'GetValidators'):
+            return self._backend.GetValidators(key)
+        return {}
+
+    def SetValidators(self, key, validators):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] = dict(validators)
+        if hasattr(self._backend, 'SetValidators'):
+            self._backend.SetValidators(key, validators)
+
+    def Touch(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.time()
+        if hasattr(self._backend, 'Touch'):
+            self._backend.Touch(key)
+
+    def Clear(self):
+        """Drop all the entries kept in memory. The backend is not touched."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store(self, key, data, cached_time):
+        size = len(key) + len(data)
+        with self._lock:
+            self._discard(key)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = [data, cached_time, None]
+            self._size += size
+            while self._size > self._max_bytes:
+                (k, entry) = self._entries.popitem(last = False)
+                self._size -= len(k) + len(entry[0])
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(key) + len(entry[0])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "<lastfm.util.MemoryCache: %d entries, %d/%d bytes>" % \
+            (len(self._entries), self._size, self._max_bytes)
+
+class _OrderedDict(dict):
+    """The minimal ordered dict needed by the L{MemoryCache}, for python < 2.7"""
+    def __init__(self):
+        super(_OrderedDict, self).__init__()
+        self._order = []
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._order.append(key)
+        super(_OrderedDict, self).__setitem__(key, value)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._order.remove(key)
+        return super(_OrderedDict, self).pop(key, *default)
+
+    def popitem(self, last = True):
+        key = last and self._order.pop() or self._order.pop(0)
+        return (key, super(_OrderedDict, self).pop(key))
+
+    def clear(self):
+        del self._order[:]
+        super(_OrderedDict, self).clear()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""Module for the counters and histograms of the web service calls"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Lock
+import bisect
+
+class Histogram(object):
+    """
+    A histogram of the recorded values, with fixed bucket bounds. It keeps the
+    count, the sum, the minimum and the maximum of the values too.
+    """
+    DEFAULT_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                      1, 2.5, 5, 10, 30, 60, 300, 900, 3600, 86400)
+    """Default upper bounds of the buckets, suitable for times in seconds"""
+
+    def __init__(self, bounds = None):
+        """
+        Create a histogram.
+
+        @param bounds:   the upper bounds of the buckets, in increasing order. Values
+                         above the last bound are counted in an extra bucket (optional)
+        @type bounds:    L{tuple} of L{float}
+        """
+        self._bounds = tuple(bounds or Histogram.DEFAULT_BOUNDS)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+
+    def record(self, value):
+        """
+        Record a value.
+
+        @param value:  the value to record
+        @type value:   L{float}
+        """
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def merge(self, other):
+        """
+        Add the values recorded by another histogram with the same bounds.
+
+        @param other:  the other histogram
+        @type other:   L{Histogram}
+        """
+        for (i, c) in enumerate(other._counts):
+            self._counts[i] += c
+        self._count += other._count
+        self._sum += other._sum
+        for v in (other._min, other._max):
+            if v is not None:
+                if self._min is None or v < self._min:
+                    self._min = v
+                if self._max is None or v > self._max:
+                    self._max = v
+
+    def snapshot(self):
+        """
+        The state of the histogram.
+
+        @return:   the count, sum, min, max and mean of the values, and the buckets
+                   as a list of (upper bound, count) pairs, the last bound being None
+        @rtype:    L{dict}
+        """
+        return {
+            'count': self._count,
+            'sum': self._sum,
+            'min': self._min,
+            'max': self._max,
+            'mean': self._count and self._sum / self._count or None,
+            'buckets': zip(self._bounds + (None,), self._counts),
+        }
+
+class Metrics(object):
+    """
+    The counters and histograms of the web service calls, kept per web service method.
+    """
+    COUNTERS = ('hits', 'parsed_hits', 'misses', 'stale', 'errors', 'bytes_read',
+                'bytes_written', 'requests', 'bytes_downloaded')
+    """Names of the counters"""
+
+    HISTOGRAMS = ('age', 'upstream_latency', 'parse_latency', 'rate_limit_wait')
+    """Names of the histograms"""
+
+    def __init__(self):
+        self._methods = {}
+        self._lock = Lock()
+
+    def incr(self, method, name, value = 1):
+        """
+        Increment a counter.
+
+        @param method:  the web service method
+        @type method:   L{str}
+        @param name:    name of the counter, one of L{COUNTERS}
+        @type name:     L{str}
+        @param value:   the increment (optional)
+        @type value:    L{int}
+        """
+        with self._lock:
+            self._get(method)[0][name] += value
+
+    def observe(self, method, name, value):
+        """
+        Record a value in a histogram.
+
+        @param method:  the web service method
+        @type method:   L{str}
+        @param name:    name of the histogram, one of L{HISTOGRAMS}
+        @type name:     L{str}
+        @param value:   the value
+        @type value:    L{float}
+        """
+        with self._lock:
+            self._get(method)[1][name].record(value)
+
+    def reset(self):
+        """Reset all the counters and histograms."""
+        with self._lock:
+            self._methods = {}
+
+    def snapshot(self):
+        """
+        The state of the counters and histograms.
+
+        @return:   a dict with the counters and histogram snapshots of each method
+                   under C{'methods'}, and of all the methods together under C{'total'}
+        @rtype:    L{dict}
+        """
+        with self._lock:
+            total = self._create()
+            methods = {}
+            for (method, (counters, histograms)) in self._methods.items():
+                methods[method] = self._snapshot(counters, histograms)
+                for name in Metrics.COUNTERS:
+                    total[0][name] += counters[name]
+                for name in Metrics.HISTOGRAMS:
+                    total[1][name].merge(histograms[name])
+            return {'methods': methods, 'total': self._snapshot(*total)}
+
+    def _get(self, method):
+        if method not in self._methods:
+            self._methods[method] = self._create()
+        return self._methods[method]
+
+    def _create(self):
+        return (dict((name, 0) for name in Metrics.COUNTERS),
+                dict((name, Histogram()) for name in Metrics.HISTOGRAMS))
+
+    def _snapshot(self, counters, histograms):
+        snapshot = dict(counters)
+        for (name, histogram) in histograms.items():
+            snapshot[name] = histogram.snapshot()
+        # the hits on the parsed cache do not look up the response cache
+        hits = counters['hits'] + counters['parsed_hits'] + counters['stale']
+        lookups = hits + counters['misses']
+        snapshot['hit_ratio'] = lookups and float(hits) / lookups or None
+        return snapshot
+
+    def __repr__(self):
+        return "<lastfm.util.Metrics: %d methods>" % len(self._methods)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Module for caching the parsed responses in memory"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Lock
+import time
+
+from lastfm.util.memorycache import OrderedDict, _OrderedDict
+
+class ParsedCache(object):
+    """
+    A least recently used cache of the parsed and checked responses, bounded by the
+    number of entries. It is keyed like the response cache, and each entry keeps the
+    cached time of the response it was parsed from, so that it expires along with it.
+
+    The cached elements are shared by all the readers, so they must not be modified.
+    """
+    DEFAULT_MAX_ENTRIES = 512
+
+    def __init__(self, max_entries = None):
+        """
+        Create a parsed response cache.
+
+        @param max_entries:  maximum number of parsed responses kept (optional)
+        @type max_entries:   L{int}
+        """
+        self._max_entries = max_entries or ParsedCache.DEFAULT_MAX_ENTRIES
+        self._entries = OrderedDict is not None and OrderedDict() or _OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def max_entries(self):
+        """
+        maximum number of parsed responses kept
+        @rtype: L{int}
+        """
+        return self._max_entries
+
+    @property
+    def hits(self):
+        """
+        number of lookups answered from the cache
+        @rtype: L{int}
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        number of lookups not answered from the cache
+        @rtype: L{int}
+        """
+        return self._misses
+
+    def Get(self, key, max_age):
+        """
+        Get a parsed response, if it is fresh enough.
+
+        @param key:       the key of the response
+        @type key:        L{str}
+        @param max_age:   maximum age, in seconds, of the response
+        @type max_age:    L{float}
+
+        @return:          the parsed response, or None
+        @rtype:           C{Element}
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or time.time() >= entry[0] + max_age:
+                self._misses += 1
+                return None
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[1]
+
+    def Set(self, key, element, cached_time):
+        """
+        Store a parsed response.
+
+        @param key:           the key of the response
+        @type key:            L{str}
+        @param element:       the parsed response
+        @type element:        C{Element}
+        @param cached_time:   the time at which the response was cached
+        @type cached_time:    L{float}
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (cached_time, element)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last = False)
+
+    def Remove(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def Clear(self):
+        """Drop all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "<lastfm.util.ParsedCache: %d/%d entries>" % \
+            (len(self._entries), self._max_entries)
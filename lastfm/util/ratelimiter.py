@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Module for limiting the rate of the requests to the web service"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Lock
+import time
+
+class RateLimiter(object):
+    """
+    A token bucket rate limiter. The bucket holds at most C{burst} tokens and
+    is refilled at C{rate} tokens per second. Every request takes one token.
+
+    The lock is held only while a send slot is reserved, the waiting (if any)
+    is done outside it, so several threads can have their requests in flight
+    at the same time while the overall rate is still honoured.
+    """
+    def __init__(self, rate = None, burst = 1):
+        """
+        Create a rate limiter.
+
+        @param rate:    number of requests allowed per second. If None then the
+                        requests are not limited at all (optional)
+        @type rate:     L{float}
+        @param burst:   maximum number of requests which can be sent back to
+                        back, without waiting (optional)
+        @type burst:    L{int}
+        """
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self._rate = rate and float(rate) or None
+        self._burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.time()
+        self._lock = Lock()
+
+    @property
+    def rate(self):
+        """
+        number of requests allowed per second
+        @rtype: L{float}
+        """
+        return self._rate
+
+    @property
+    def burst(self):
+        """
+        maximum number of requests which can be sent back to back
+        @rtype: L{int}
+        """
+        return self._burst
+
+    def reserve(self):
+        """
+        Reserve a send slot.
+
+        @return:    the time, in seconds, the caller has to wait before sending
+                    the request
+        @rtype:     L{float}
+        """
+        if self._rate is None:
+            return 0.0
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self._burst,
+                self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def wait(self):
+        """
+        Reserve a send slot and block till it is due.
+
+        @return:    the time, in seconds, spent waiting
+        @rtype:     L{float}
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def __repr__(self):
+        return "<lastfm.util.RateLimiter: rate=%s, burst=%s>" % (self._rate, self._burst)
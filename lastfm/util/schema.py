@@ -0,0 +1,757 @@
+#!/usr/bin/env python
+"""
+Module for declaring how the objects are created from the elements of the responses.
+
+A L{Schema} maps the keyword arguments of a factory, usually an entity class, to
+fields like L{Text}, L{Int} or L{EntityList}, each reading a path of the element::
+
+    ARTIST = Schema(Artist, {
+        'name':       'name',
+        'mbid':       'mbid',
+        'streamable': Flag('streamable'),
+        'image':      Images(),
+        'stats':      Entity(Schema(Stats, {'subject': 'name',
+                                            'listeners': Int('stats/listeners')},
+                                    args = ())),
+        })
+    artist = ARTIST(element, api)
+
+When it is created, a schema is compiled into a single function, with the nested
+schemas inlined: every element on the paths of the fields is looked up once, the
+converters are bound to the function, and the values read by several fields, of the
+schema or of the nested schemas, are read only once.
+
+A path is a list of steps separated by slashes, optionally ending with the name
+of an attribute after an C{@}, like C{'album/artist'}, C{'streamable@fulltrack'} or
+C{'@rank'}. The steps can be namespaced, like C{'{http://...}point'}.
+
+A schema is compiled a second time, on its first call with a L{JsonElement}, into a
+function reading the values decoded from a JSON response, with the keys, the C{#text}
+and the C{@attr} of the JSON responses standing for the paths. It creates the same
+objects as the function reading the elements of the XML response.
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import re
+
+from lastfm.util import jsontree
+from lastfm.util.dates import parse_date, parse_timestamp
+from lastfm.util.jsontree import JsonElement, json_key
+
+class Field(object):
+    """The base class of the fields of a schema."""
+    def _compile(self, scope):
+        """Return the expression of the value of the field, for the compiled function."""
+        raise NotImplementedError("The subclass must override this method")
+
+    def _key(self):
+        # the fields with equal keys have equal values, and are read only once
+        return (self.__class__.__name__,) + tuple(sorted(self.__dict__.items()))
+
+    def _recorded(self):
+        # if the value, not the texts it is computed from, is recorded for the
+        # entities created lazily, see Schema.fill
+        return False
+
+    def _record(self, scope):
+        """Return the expression of the record of the field, if it is L{_recorded}."""
+        return scope.value(self)
+
+    def _restore(self, record):
+        """Return the expression of the value of the field, from its record."""
+        return record
+
+class Text(Field):
+    """
+    Text of the element at a path, or the value of an attribute. The empty path is
+    the element itself.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _compile(self, scope):
+        return scope.text(self.path)
+
+class _Converted(Field):
+    _converter = None
+    def __init__(self, path):
+        self.path = path
+
+    def _compile(self, scope):
+        return "%s(%s)" % (scope.bind(self.__class__._converter), scope.text(self.path))
+
+class _Number(Field):
+    _type = None
+    def __init__(self, path):
+        self.path = path
+
+    def _compile(self, scope):
+        # inlined, as called for each number of the responses
+        text = scope.text(self.path)
+        return "(%s(%s) if %s and not %s.isspace() else None)" % (
+            self._type, text, text, text)
+
+class Int(_Number):
+    """The text at a path as an L{int}, or None if it is missing or blank."""
+    _type = 'int'
+
+class Float(_Number):
+    """The text at a path as a L{float}, or None if it is missing or blank."""
+    _type = 'float'
+
+class Timestamp(_Converted):
+    """The text at a path, a UNIX timestamp, as a UTC L{datetime}."""
+    _converter = staticmethod(parse_timestamp)
+
+class Flag(Field):
+    """If the text at a path is equal to a value, C{'1'} by default."""
+    def __init__(self, path, value = '1'):
+        self.path = path
+        self.value = value
+
+    def _compile(self, scope):
+        return "(%s == %r)" % (scope.text(self.path), self.value)
+
+class Date(Field):
+    """
+    The text at a path as a L{datetime}, parsed with the first of the formats matching
+    it, or None if it is blank or no format matches. The C{uts} attribute of the
+    element, if it has one, is used instead of the text.
+    """
+    def __init__(self, path, *formats):
+        self.path = path
+        self.formats = formats
+
+    def _compile(self, scope):
+        if '@' in self.path:
+            uts = 'None'
+        else:
+            uts = scope.text(self.path + '@uts')
+        return "%s(%s, %r, %s)" % (scope.bind(parse_date), scope.text(self.path),
+            self.formats, uts)
+
+class Images(Field):
+    """The images at a path, as a L{dict} of the image URLs by their sizes."""
+    def __init__(self, path = 'image'):
+        self.path = path
+
+    def _compile(self, scope):
+        if scope.compiler.json:
+            return "%s(%s)" % (scope.bind(jsontree.images), scope.elements(self.path))
+        return "dict([(i.get('size'), i.text) for i in %s])" % scope.elements(self.path)
+
+    def _recorded(self):
+        return True
+
+    def _record(self, scope):
+        # the sizes and the URLs in a flat tuple, smaller than a dict
+        if scope.compiler.json:
+            return "%s(%s)" % (scope.bind(jsontree.image_record), scope.elements(self.path))
+        return "tuple([v for i in %s for v in (i.get('size'), i.text)])" % \
+            scope.elements(self.path)
+
+    def _restore(self, record):
+        return "dict(zip(%s[::2], %s[1::2]))" % (record, record)
+
+class Element(Field):
+    """The element at a path, or None."""
+    def __init__(self, path):
+        self.path = path
+
+    def _compile(self, scope):
+        return scope.view(self.path)
+
+    def _recorded(self):
+        return True
+
+class Elements(Field):
+    """The list of the elements at a path."""
+    def __init__(self, path):
+        self.path = path
+
+    def _compile(self, scope):
+        return scope.views(self.path)
+
+    def _recorded(self):
+        return True
+
+class Arg(Field):
+    """An argument of the call of the schema, like C{api} or C{subject}."""
+    def __init__(self, name):
+        self.name = name
+
+    def _compile(self, scope):
+        return scope.param(self.name)
+
+class Ref(Field):
+    """The value of another field of the same schema."""
+    def __init__(self, name):
+        self.name = name
+
+    def _compile(self, scope):
+        return scope.field(self.name)
+
+class Const(Field):
+    """A constant value."""
+    def __init__(self, value):
+        self.value = value
+
+    def _key(self):
+        return ('Const', id(self.value))
+
+    def _compile(self, scope):
+        return scope.bind(self.value)
+
+class Compute(Field):
+    """The value of a function, called with the values of some fields."""
+    def __init__(self, func, *fields):
+        self.func = func
+        self.fields = fields
+
+    def _key(self):
+        return ('Compute', self.func) + tuple([_field(f)._key() for f in self.fields])
+
+    def _compile(self, scope):
+        return "%s(%s)" % (scope.bind(self.func),
+            ", ".join([scope.value(f) for f in self.fields]))
+
+class Entity(Field):
+    """
+    The object created by another schema from the element at a path, or from the
+    same element if no path is given, or a default value if there is no element at
+    the path. The params of the other schema are the given fields, or else the params
+    of the same names of the enclosing schema.
+    """
+    def __init__(self, schema, path = None, default = None, **args):
+        self.schema = schema
+        self.path = path
+        self.default = default
+        self.args = args
+
+    def _key(self):
+        return ('Entity', id(self))
+
+    def _recorded(self):
+        # the entities at other paths, or created lazily, are created with the entity
+        return self.path is not None or self.schema.keys is not None
+
+    def _compile(self, scope):
+        params = scope.params_of(self.schema, self.args)
+        if self.path is None:
+            return scope.inline(self.schema, scope.elem, params)
+        element = scope.element(self.path)
+        compiler = scope.compiler
+        result = compiler.var()
+        compiler.open("if %s is not None:" % element)
+        compiler.emit("%s = %s" % (result, scope.inline(self.schema, element, params)))
+        compiler.close()
+        compiler.open("else:")
+        compiler.emit("%s = %s" % (result, scope.bind(self.default)))
+        compiler.close()
+        return result
+
+class EntityList(Entity):
+    """The list of the objects created by another schema from the elements at a path."""
+    def __init__(self, schema, path, **args):
+        super(EntityList, self).__init__(schema, path, **args)
+
+    def _recorded(self):
+        return True
+
+    def _compile(self, scope):
+        params = scope.params_of(self.schema, self.args)
+        elements = scope.elements(self.path)
+        compiler = scope.compiler
+        result, element = compiler.var(), compiler.var()
+        compiler.emit("%s = []" % result)
+        compiler.open("for %s in %s:" % (element, elements))
+        compiler.emit("%s.append(%s)" % (result, scope.inline(self.schema, element, params)))
+        compiler.close()
+        return result
+
+def _field(spec):
+    if isinstance(spec, basestring):
+        return Text(spec)
+    return spec
+
+_STEP_RE = re.compile(r'(?:\{[^}]*\})?[^/]+')
+_NAME_RE = re.compile(r'^\w+$')
+
+# the names of the functions reading the values decoded from the JSON responses
+_JSON_NAMESPACE = {
+    '_dict': dict,
+    '_unicode': unicode,
+    '_child': jsontree.child,
+    '_children': jsontree.children,
+    '_text': jsontree.text,
+    '_found_text': jsontree.found_text,
+    '_attribute': jsontree.attribute,
+}
+
+class _Compiler(object):
+    """The lines of a function being compiled, and the values computed in them."""
+    def __init__(self, lazy = False, slots = None, json = False):
+        # if the entities are created lazily
+        self.lazy = lazy
+        # if the function reads the values decoded from a JSON response
+        self.json = json
+        # the values recorded for the fill of a schema, see Schema.fill, and the
+        # position of the first of them in the source
+        self.slots = slots
+        self.offset = 0
+        self.namespace = json and dict(_JSON_NAMESPACE) or {}
+        self.lines = []
+        self.count = 0
+        self.blocks = [0]
+        self.block_count = 0
+        self.values = {}
+        self.nullable = set()
+
+    def var(self):
+        self.count += 1
+        return '_v%d' % self.count
+
+    def bind(self, value):
+        if value is None:
+            return 'None'
+        name = '_c%d' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def emit(self, line):
+        self.lines.append("    " * len(self.blocks) + line)
+
+    def open(self, line):
+        self.emit(line)
+        self.block_count += 1
+        self.blocks.append(self.block_count)
+
+    def close(self):
+        self.blocks.pop()
+
+    def lookup(self, key):
+        # a value computed in a block is only known in it
+        if key in self.values:
+            (var, block) = self.values[key]
+            if block in self.blocks:
+                return var
+        return None
+
+    def assign(self, key, expr, nullable = False):
+        var = self.lookup(key)
+        if var is None:
+            if _NAME_RE.match(expr):
+                # already a variable, a param or a constant
+                var = expr
+            else:
+                var = self.var()
+                self.emit("%s = %s" % (var, expr))
+                if nullable:
+                    self.nullable.add(var)
+            self.values[key] = (var, self.blocks[-1])
+        return var
+
+class _Scope(object):
+    """A schema being compiled, inlined for an element of the function."""
+    def __init__(self, compiler, schema, elem, params):
+        self.compiler = compiler
+        self.schema = schema
+        self.elem = elem
+        self.params = params
+        self.fields = {}
+        self.pending = set()
+        # the values of the fields depend on the element and on the params
+        self.key = (elem, tuple(sorted(params.items())))
+
+    def bind(self, value):
+        return self.compiler.bind(value)
+
+    def param(self, name):
+        if name not in self.params:
+            raise ValueError("%s is not a param of %r" % (name, self.schema))
+        return self.params[name]
+
+    def _slot(self, value):
+        slots = self.compiler.slots
+        if value not in slots:
+            slots.append(value)
+        return "_s[%d]" % (self.compiler.offset + slots.index(value))
+
+    def _record(self, value):
+        # the expression of a value recorded for the fill of the schema
+        (kind, what) = value
+        if kind == 'text':
+            return self.text(what)
+        if kind == 'element':
+            return self.view(what)
+        if kind == 'elements':
+            return self.views(what)
+        return what._record(self)
+
+    def _nullable(self, var):
+        # the element of a scope is never None in it
+        return var != self.elem and var in self.compiler.nullable
+
+    def _element(self, steps):
+        if not steps:
+            return self.elem
+        parent = self._element(steps[:-1])
+        if self.compiler.json:
+            # the JSON values are all read with functions taking None
+            expr = "_child(%s, %r)" % (parent, json_key(steps[-1]))
+        elif self._nullable(parent):
+            expr = "%s.find(%r) if %s is not None else None" % (parent, steps[-1], parent)
+        else:
+            expr = "%s.find(%r)" % (parent, steps[-1])
+        return self.compiler.assign((self.elem, 'element', steps), expr, True)
+
+    def element(self, path):
+        if self.compiler.slots is not None:
+            return self.compiler.assign((self.elem, 'element', path),
+                self._slot(('element', path)))
+        return self._element(tuple(_STEP_RE.findall(path)))
+
+    def view(self, path):
+        # the element at a path, as it is given to the fields reading it themselves
+        element = self.element(path)
+        if not self.compiler.json:
+            return element
+        return self.compiler.assign((self.elem, 'view', path), "%s(%r, %s)" % (
+            self.bind(jsontree.element), _STEP_RE.findall(path)[-1], element))
+
+    def _json_text(self, steps, attribute):
+        if attribute is not None:
+            return "_attribute(%s, %r)" % (self._element(steps), attribute)
+        if not steps:
+            return "_text(%s)" % self.elem
+        # inlined for the usual text of a child of an object
+        parent = self._element(steps[:-1])
+        value = self.compiler.assign((self.elem, 'value', steps),
+            "%s.get(%r) if %s.__class__ is _dict else None" % (
+                parent, json_key(steps[-1]), parent))
+        return "%s if %s.__class__ is _unicode else _found_text(%s)" % (value, value, value)
+
+    def text(self, path):
+        if self.compiler.slots is not None:
+            return self.compiler.assign((self.elem, 'text', path), self._slot(('text', path)))
+        # the attribute is after the last @, outside of the namespaces
+        at = path.rfind('@')
+        if at > path.rfind('}'):
+            steps, attribute = tuple(_STEP_RE.findall(path[:at])), path[at + 1:]
+            parent, expr = self._element(steps), "%%s.get(%r)" % attribute
+        else:
+            steps, attribute = tuple(_STEP_RE.findall(path)), None
+            if steps:
+                parent, expr = self._element(steps[:-1]), "%%s.findtext(%r)" % steps[-1]
+            else:
+                parent, expr = self.elem, "%s.text"
+        if self.compiler.json:
+            expr = self._json_text(steps, attribute)
+        elif self._nullable(parent):
+            expr = "%s if %s is not None else None" % (expr % parent, parent)
+        else:
+            expr = expr % parent
+        return self.compiler.assign((self.elem, 'text', steps, attribute), expr)
+
+    def elements(self, path):
+        if self.compiler.slots is not None:
+            return self.compiler.assign((self.elem, 'elements', path),
+                self._slot(('elements', path)))
+        steps = tuple(_STEP_RE.findall(path))
+        parent = self._element(steps[:-1])
+        if self.compiler.json:
+            expr = "_children(%s.get(%r)) if %s.__class__ is _dict else []" % (
+                parent, json_key(steps[-1]), parent)
+        elif self._nullable(parent):
+            expr = "%s.findall(%r) if %s is not None else []" % (parent, steps[-1], parent)
+        else:
+            expr = "%s.findall(%r)" % (parent, steps[-1])
+        return self.compiler.assign((self.elem, 'elements', steps), expr)
+
+    def views(self, path):
+        # the elements at a path, as they are given to the fields reading them themselves
+        elements = self.elements(path)
+        if not self.compiler.json:
+            return elements
+        return self.compiler.assign((self.elem, 'views', path), "%s(%r, %s)" % (
+            self.bind(jsontree.elements), _STEP_RE.findall(path)[-1], elements))
+
+    def value(self, spec):
+        field = _field(spec)
+        key = (self.key, field._key())
+        var = self.compiler.lookup(key)
+        if var is None:
+            if self.compiler.slots is not None and field._recorded():
+                expr = field._restore(self._slot(('field', field)))
+            else:
+                expr = field._compile(self)
+            var = self.compiler.assign(key, expr)
+        return var
+
+    def field(self, name):
+        if name in self.fields:
+            return self.fields[name]
+        if name in self.pending:
+            raise ValueError("the field %s refers to itself" % name)
+        if name not in self.schema.fields:
+            raise ValueError("%s is not a field of %r" % (name, self.schema))
+        self.pending.add(name)
+        self.fields[name] = self.value(self.schema.fields[name])
+        return self.fields[name]
+
+    def params_of(self, schema, args):
+        params = {}
+        for name in schema.params:
+            if name in args:
+                params[name] = self.value(args[name])
+            else:
+                params[name] = self.params.get(name, 'None')
+        return params
+
+    def inline(self, schema, elem, params):
+        return _Scope(self.compiler, schema, elem, params).call()
+
+    def _values(self, names):
+        for name in names:
+            self.field(name)
+        return ([self.value(a) for a in self.schema.args],
+                [name for name in names if not name.startswith('_')])
+
+    def call(self):
+        schema = self.schema
+        lazy = self.compiler.lazy and schema.keys is not None
+        (args, names) = self._values(sorted(lazy and schema.keys or schema.fields.keys()))
+        args += ["%s=%s" % (name, self.fields[name]) for name in names]
+        if lazy:
+            # the other fields are read by the entity on its first use of them, from
+            # the params and the values recorded from the element, which is not kept
+            values = [self.params[p] for p in schema.params] + \
+                     [self._record(value) for value in schema.slots]
+            args.append("_source=(%s, %s)" % (self.bind(schema),
+                "".join(["%s, " % v for v in values])))
+        return "%s(%s)" % (self.bind(schema.factory), ", ".join(args))
+
+    def fill(self):
+        # the keys were given to the entity when it was created lazily, and the other
+        # properties are set like LastfmBase.init does, unless they have been set since
+        keys = self.schema.keys or ()
+        (args, names) = self._values(sorted([name for name in self.schema.fields
+                                             if name not in keys]))
+        factory = self.schema.factory
+        properties = factory.Meta.properties + getattr(factory.Meta, 'fillable_properties', [])
+        compiler = self.compiler
+        compiler.emit("_d = _o.__dict__")
+        for name in names:
+            if name not in properties:
+                continue
+            value = self.fields[name]
+            if name == 'stats' and hasattr(factory, '_own_stats'):
+                # the stats of the entity refer to it, like its init makes them
+                value = "_o._own_stats(%s) if %s is not None else None" % (value, value)
+            compiler.open("if _d.get('_%s') is None:" % name)
+            compiler.emit("_d['_%s'] = %s" % (name, value))
+            compiler.close()
+
+def _compile(schema, lazy = False, json = False):
+    compiler = _Compiler(lazy, json = json)
+    params = "".join([", %s" % p for p in schema.params])
+    if not lazy and not json:
+        # the function reading the JSON values is bound to _json on its compilation
+        compiler.namespace['_json'] = schema.json_extract
+        # the elements of cElementTree have no __class__
+        compiler.namespace['_type'] = type
+        compiler.open("if _type(elem) is %s:" % compiler.bind(JsonElement))
+        compiler.emit("return _json(elem._value%s)" % params)
+        compiler.close()
+    if not lazy and schema.lazy and 'api' in schema.params:
+        lazy_extract = json and schema._lazy_json_extract or schema.lazy_extract
+        compiler.open("if api is not None and api._lazy:")
+        compiler.emit("return %s(elem%s)" % (compiler.bind(lazy_extract), params))
+        compiler.close()
+    scope = _Scope(compiler, schema, 'elem', dict([(p, p) for p in schema.params]))
+    compiler.emit("return %s" % scope.call())
+    if schema.element_last and not lazy and not json:
+        signature = "%selem" % "".join(["%s, " % p for p in schema.params])
+    else:
+        signature = "elem%s" % "".join([", %s=None" % p for p in schema.params])
+    source = "def extract(%s):\n%s\n" % (signature, "\n".join(compiler.lines))
+    exec compile(source, "<%r%s>" % (schema, json and " json" or ""), 'exec') in \
+        compiler.namespace
+    return source, compiler.namespace['extract']
+
+def _compile_fill(schema):
+    # the source is the schema, the params and then the recorded values
+    compiler = _Compiler(True, [])
+    compiler.offset = 1 + len(schema.params)
+    scope = _Scope(compiler, schema, '_e', dict([(p, "_s[%d]" % (i + 1))
+                                                 for (i, p) in enumerate(schema.params)]))
+    scope.fill()
+    source = "def fill(_o, _s):\n%s\n" % "\n".join(compiler.lines)
+    exec compile(source, "<%r>" % schema, 'exec') in compiler.namespace
+    return compiler.slots, compiler.namespace['fill']
+
+# the arguments of the entities deciding under which key they are registered
+_REGISTRY_ARGS = ('subject', 'bypass_registry')
+
+class Schema(object):
+    """
+    A declaration of how a factory is called with the values read from an element.
+
+    The schema is compiled when it is created: C{extract(elem, *params)}, or
+    C{extract(*params + (elem,))} if the element is last, also called by calling the
+    schema, is the compiled function, and C{source} is its source.
+
+    If the factory is an entity class declaring its C{key_properties}, the entities can
+    be created lazily, when the L{Api} is in the lazy mode: only the keys are read and
+    passed, along with a C{_source} argument, which the entity keeps and gives back to
+    L{fill} to read the other fields on their first use. The source is a flat tuple of
+    the texts the other fields are computed from, not the element, so that the
+    response can be freed. C{lazy} tells if the schema or one of its nested schemas
+    creates such entities.
+
+    Given a L{JsonElement}, C{extract} calls L{json_extract}, which reads the values
+    decoded from the JSON response instead of the elements.
+    """
+    def __init__(self, factory, fields, params = ('api',), args = ('api',),
+                 element_last = False):
+        """
+        Create a schema.
+
+        @param factory:   the class or the function to call with the values
+        @type factory:    C{callable}
+        @param fields:    the fields giving the keyword arguments of the factory, by
+                          their names, either L{Field}s or paths (read as L{Text}).
+                          The fields whose names start with an underscore are computed,
+                          and can be referred to by L{Ref}, but are not passed.
+        @type fields:     L{dict}
+        @param params:    the names of the arguments of the calls of the schema,
+                          after the element (optional)
+        @type params:     L{tuple}
+        @param args:      the positional arguments of the factory, either L{Field}s
+                          or names of the params (optional)
+        @type args:       L{tuple}
+        @param element_last: if C{extract} takes the element after the params, to be
+                          used as the C{_search_yield_func} of an entity (optional)
+        @type element_last: L{bool}
+
+        @raise ValueError: if a field refers to an unknown field or param
+        """
+        self.factory = factory
+        self.fields = dict(fields)
+        self.params = tuple(params)
+        self.args = tuple([isinstance(a, basestring) and Arg(a) or a for a in args])
+        self.element_last = element_last
+        self.keys = self._keys()
+        self.lazy = self.keys is not None or bool([f for f in self.fields.itervalues()
+                                                   if isinstance(f, Entity) and f.schema.lazy])
+        self._lazy_extract = self._fill = self._slots = None
+        self._json_extract = self._lazy_json = None
+        self.source, self.extract = _compile(self)
+
+    def _keys(self):
+        meta = getattr(self.factory, 'Meta', None)
+        keys = getattr(meta, 'key_properties', None)
+        if keys is None or [k for k in keys if k not in self.fields]:
+            return None
+        return tuple(keys) + tuple([a for a in _REGISTRY_ARGS if a in self.fields])
+
+    def lazy_extract(self, elem, *args, **kwargs):
+        """
+        Call the factory like the schema, but creating the entities lazily: with
+        only their keys read from the element, and the source of their other fields.
+
+        @param elem:     the element
+        @type elem:      C{xml.etree.ElementTree.Element}
+        @param args:     the params of the schema, after the element
+
+        @return:         the value returned by the factory
+        """
+        if self._lazy_extract is None:
+            self._lazy_extract = _compile(self, lazy = True)[1]
+        return self._lazy_extract(elem, *args, **kwargs)
+
+    def json_extract(self, value, *args, **kwargs):
+        """
+        Call the factory like the schema, with the values read from the value of an
+        element decoded from a JSON response. The function is compiled on the first
+        call, and then called by C{extract} directly.
+
+        @param value:    the value of the element, the C{_value} of a L{JsonElement}
+        @type value:     L{dict} or L{unicode}
+        @param args:     the params of the schema, after the value
+
+        @return:         the value returned by the factory
+        """
+        if self._json_extract is None:
+            self._json_extract = _compile(self, json = True)[1]
+            self.extract.func_globals['_json'] = self._json_extract
+        return self._json_extract(value, *args, **kwargs)
+
+    def _lazy_json_extract(self, value, *args, **kwargs):
+        if self._lazy_json is None:
+            self._lazy_json = _compile(self, lazy = True, json = True)[1]
+        return self._lazy_json(value, *args, **kwargs)
+
+    @property
+    def slots(self):
+        """
+        What is recorded from the element for the fields, but for the L{keys}, of an
+        entity created lazily: the texts at some paths, and the values of the fields
+        which are not computed from texts, like the nested entities.
+        @rtype: L{list}
+        """
+        if self._fill is None:
+            (self._slots, self._fill) = _compile_fill(self)
+        return self._slots
+
+    def fill(self, entity, source):
+        """
+        Set the properties, but for the L{keys}, of an entity created lazily, which
+        have not been set since, from the C{_source} it was created with.
+
+        @param entity:   the entity
+        @type entity:    L{lastfm.base.LastfmBase}
+        @param source:   the schema, the params and the recorded values
+        @type source:    L{tuple}
+        """
+        if self._fill is None:
+            (self._slots, self._fill) = _compile_fill(self)
+        self._fill(entity, source)
+
+    def extend(self, fields = None, factory = None, params = None, args = None,
+               element_last = False):
+        """
+        Create a schema with more fields, or another factory, params, args or order
+        of the arguments.
+
+        @param fields:    the fields to add or to replace (optional)
+        @type fields:     L{dict}
+        @param factory:   the factory of the new schema (optional)
+        @type factory:    C{callable}
+        @param params:    the params of the new schema (optional)
+        @type params:     L{tuple}
+        @param args:      the positional arguments of the factory (optional)
+        @type args:       L{tuple}
+        @param element_last: if the new schema takes the element last, not inherited
+                          (optional)
+        @type element_last: L{bool}
+
+        @return:          the new schema
+        @rtype:           L{Schema}
+        """
+        new_fields = dict(self.fields)
+        new_fields.update(fields or {})
+        return Schema(factory or self.factory, new_fields,
+            self.params if params is None else params,
+            self.args if args is None else args,
+            element_last)
+
+    def __call__(self, *args, **kwargs):
+        return self.extract(*args, **kwargs)
+
+    def __repr__(self):
+        return "<lastfm.util.Schema: %s>" % getattr(self.factory, '__name__', self.factory)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Module for coalescing identical calls running at the same time"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Lock, Event
+
+class _Call(object):
+    def __init__(self):
+        self.done = Event()
+        self.finished = False
+        self.result = None
+        self.error = None
+
+class SingleFlight(object):
+    """
+    Coalesces identical calls made from several threads at the same time. The first
+    caller for a key runs the function, the others wait for it to finish and get
+    the same result (or the same exception raised).
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+        self._executed = 0
+        self._coalesced = 0
+
+    @property
+    def executed(self):
+        """
+        number of calls which actually ran the function
+        @rtype: L{int}
+        """
+        return self._executed
+
+    @property
+    def coalesced(self):
+        """
+        number of calls which waited for another identical call instead of
+        running the function
+        @rtype: L{int}
+        """
+        return self._coalesced
+
+    def in_flight(self):
+        """
+        Number of keys currently being fetched.
+        @rtype: L{int}
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run the function, unless an identical call is already running, in which
+        case wait for it and return its result.
+
+        @param key:     the key identifying the call
+        @type key:      L{str}
+        @param func:    the function to run, it is passed the arguments given after it
+        @type func:     C{function}
+
+        @return:        the result of the function
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if not call.finished:
+                # the leader was interrupted, try again
+                return self.do(key, func, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            try:
+                call.result = func(*args, **kwargs)
+                call.finished = True
+            except Exception, e:
+                call.error = e
+                call.finished = True
+                raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def __repr__(self):
+        return "<lastfm.util.SingleFlight: executed=%s, coalesced=%s>" % \
+            (self._executed, self._coalesced)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+Module for exporting the entries of a response cache to a snapshot file, and for
+loading them into the cache of another machine.
+
+A snapshot starts with L{MAGIC}, followed by one record per entry, an index of the
+records sorted by the hashed keys of the entries, and a trailer giving the offset of
+the index and the number of records. Each record is the hashed key, the cached time,
+the validators and the zlib-compressed data of an entry, so that the loaded entries
+expire as they would have in the exported cache.
+
+Run as::
+    python -m lastfm.util.snapshot export --cache-dir /tmp/cache cache.snapshot
+    python -m lastfm.util.snapshot import --sqlite /var/cache/lastfm.sqlite cache.snapshot
+    python -m lastfm.util.snapshot info cache.snapshot
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import binascii
+import os
+import struct
+import time
+import zlib
+
+from lastfm.util.compression import ZlibCodec
+from lastfm.util.filecache import FileCache, md5hash
+from lastfm.util.sqlitecache import SqliteCache, _encode_validators, _decode_validators
+
+MAGIC = 'LFMSNAP1'
+"""The header and the last bytes of a snapshot file"""
+
+_RECORD = struct.Struct('>16sdII')
+_INDEX_ENTRY = struct.Struct('>16sQ')
+_TRAILER = struct.Struct('>QQ8s')
+_BUFFER_SIZE = 1024*1024
+
+class SnapshotWriter(object):
+    """
+    Writes a snapshot file. The file is written under a temporary name, and takes
+    its name on L{Close}, so a partly written snapshot is never loaded.
+    """
+    def __init__(self, path, level = 6):
+        """
+        Create a snapshot writer.
+
+        @param path:    path of the snapshot file
+        @type path:     L{str}
+        @param level:   the zlib compression level of the records, from 1 (fastest)
+                        to 9 (smallest) (optional)
+        @type level:    L{int}
+        """
+        self._path = path
+        self._level = level
+        self._file = open(path + '.tmp', 'wb', _BUFFER_SIZE)
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._index = []
+
+    def Add(self, hashed_key, cached_time, data, validators = None):
+        """
+        Add an entry to the snapshot.
+
+        @param hashed_key:   the hashed key of the entry
+        @type hashed_key:    L{str}
+        @param cached_time:  the time at which the entry was cached
+        @type cached_time:   L{float}
+        @param data:         the data of the entry
+        @type data:          L{str}
+        @param validators:   the validators of the entry (optional)
+        @type validators:    L{dict}
+        """
+        key = binascii.unhexlify(hashed_key)
+        validators = validators and _encode_validators(validators) or ''
+        data = zlib.compress(data, self._level)
+        self._file.write(_RECORD.pack(key, cached_time, len(validators), len(data)))
+        self._file.write(validators)
+        self._file.write(data)
+        # packed with the key first, the index entries sort by key
+        self._index.append(_INDEX_ENTRY.pack(key, self._offset))
+        self._offset += _RECORD.size + len(validators) + len(data)
+
+    def Close(self):
+        """Write the index and the trailer, and give the snapshot its name."""
+        self._index.sort()
+        self._file.write(''.join(self._index))
+        self._file.write(_TRAILER.pack(self._offset, len(self._index), MAGIC))
+        self._file.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        os.rename(self._path + '.tmp', self._path)
+
+    def Abort(self):
+        """Close and remove the snapshot being written."""
+        self._file.close()
+        os.remove(self._path + '.tmp')
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return "<lastfm.util.SnapshotWriter: %s>" % self._path
+
+class SnapshotReader(object):
+    """
+    Reads a snapshot file. Iterating over it streams the entries from the disk in the
+    order they were exported, and L{Get} looks up a single entry through the index.
+    """
+    def __init__(self, path):
+        """
+        Open a snapshot file.
+
+        @param path:    path of the snapshot file
+        @type path:     L{str}
+
+        @raise ValueError: if the file is not a complete snapshot
+        """
+        self._path = path
+        self._file = open(path, 'rb')
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if size < len(MAGIC) + _TRAILER.size:
+            raise ValueError("%s is not a snapshot" % path)
+        self._file.seek(0)
+        header = self._file.read(len(MAGIC))
+        self._file.seek(size - _TRAILER.size)
+        (self._index_offset, self._count, trailer) = \
+            _TRAILER.unpack(self._file.read(_TRAILER.size))
+        if header != MAGIC or trailer != MAGIC or \
+                self._index_offset + self._count * _INDEX_ENTRY.size + _TRAILER.size != size:
+            raise ValueError("%s is not a complete snapshot" % path)
+
+    @property
+    def path(self):
+        """
+        path of the snapshot file
+        @rtype: L{str}
+        """
+        return self._path
+
+    def Get(self, key):
+        """
+        Look up an entry of the snapshot.
+
+        @param key:    the key of the entry
+        @type key:     L{str}
+
+        @return:       the cached time, the data and the validators of the entry,
+                       or None
+        @rtype:        L{tuple}
+        """
+        hashed_key = binascii.unhexlify(md5hash(key))
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            self._file.seek(self._index_offset + middle * _INDEX_ENTRY.size)
+            (entry_key, offset) = _INDEX_ENTRY.unpack(self._file.read(_INDEX_ENTRY.size))
+            if entry_key < hashed_key:
+                low = middle + 1
+            elif entry_key > hashed_key:
+                high = middle
+            else:
+                self._file.seek(offset)
+                return self._read_record(self._file)[1:]
+        return None
+
+    def Close(self):
+        """Close the snapshot file."""
+        self._file.close()
+
+    def __iter__(self):
+        f = open(self._path, 'rb', _BUFFER_SIZE)
+        try:
+            f.seek(len(MAGIC))
+            for i in xrange(self._count):
+                yield self._read_record(f)
+        finally:
+            f.close()
+
+    def _read_record(self, f):
+        header = f.read(_RECORD.size)
+        if len(header) != _RECORD.size:
+            raise ValueError("%s is truncated" % self._path)
+        (key, cached_time, validators_size, data_size) = _RECORD.unpack(header)
+        validators = f.read(validators_size)
+        data = f.read(data_size)
+        if len(data) != data_size:
+            raise ValueError("%s is truncated" % self._path)
+        return (binascii.hexlify(key), cached_time, zlib.decompress(data),
+            _decode_validators(validators))
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return "<lastfm.util.SnapshotReader: %s, %d entries>" % (self._path, self._count)
+
+def export_snapshot(cache, path, level = 6, max_age = None):
+    """
+    Export the entries of a cache to a snapshot file.
+
+    @param cache:     the cache to export, supporting the L{FileCache.Entries} method
+    @type cache:      L{FileCache} or L{SqliteCache}
+    @param path:      path of the snapshot file
+    @type path:       L{str}
+    @param level:     the zlib compression level of the records (optional)
+    @type level:      L{int}
+    @param max_age:   age, in seconds, of the oldest entries to export (optional)
+    @type max_age:    L{float}
+
+    @return:          the number of entries exported
+    @rtype:           L{int}
+    """
+    oldest = max_age is not None and time.time() - max_age or None
+    writer = SnapshotWriter(path, level)
+    try:
+        for (hashed_key, cached_time, data, validators) in cache.Entries():
+            if oldest is None or cached_time >= oldest:
+                writer.Add(hashed_key, cached_time, data, validators)
+    except:
+        writer.Abort()
+        raise
+    writer.Close()
+    return len(writer)
+
+def import_snapshot(path, cache, max_age = None):
+    """
+    Load the entries of a snapshot file into a cache, keeping their cached times.
+    The entries the cache has a later copy of are skipped.
+
+    @param path:      path of the snapshot file
+    @type path:       L{str}
+    @param cache:     the cache to load, supporting the L{FileCache.SetEntry} method
+    @type cache:      L{FileCache} or L{SqliteCache}
+    @param max_age:   age, in seconds, of the oldest entries to load (optional)
+    @type max_age:    L{float}
+
+    @return:          the number of entries loaded and the number skipped
+    @rtype:           L{tuple}
+    """
+    oldest = max_age is not None and time.time() - max_age or None
+    reader = SnapshotReader(path)
+    loaded = skipped = 0
+    try:
+        for (hashed_key, cached_time, data, validators) in reader:
+            if (oldest is None or cached_time >= oldest) and \
+                    cache.SetEntry(hashed_key, data, cached_time, validators):
+                loaded += 1
+            else:
+                skipped += 1
+    finally:
+        reader.Close()
+        if hasattr(cache, 'Flush'):
+            cache.Flush()
+    return (loaded, skipped)
+
+def main(argv = None):
+    from optparse import OptionParser
+    parser = OptionParser(usage = "%prog export|import|info [options] snapshot",
+        description = "Export the entries of a cache to a snapshot file, load them "
+                      "into a cache, or show the contents of a snapshot file.")
+    parser.add_option("-d", "--cache-dir", help = "directory of the file cache")
+    parser.add_option("-s", "--sqlite", help = "path of the SQLite cache")
+    parser.add_option("-a", "--max-age", type = "float",
+        help = "age, in seconds, of the oldest entries to export or import")
+    parser.add_option("-l", "--level", type = "int", default = 6,
+        help = "zlib compression level of the exported entries [default: %default]")
+    (options, args) = parser.parse_args(argv)
+    if len(args) != 2 or args[0] not in ('export', 'import', 'info'):
+        parser.error("a command and a snapshot file have to be given")
+    command, path = args
+
+    if command == 'info':
+        reader = SnapshotReader(path)
+        times = [cached_time for (k, cached_time, d, v) in reader]
+        print "%s: %d entries, %d bytes" % (path, len(reader), os.path.getsize(path))
+        if times:
+            print "cached from %s to %s" % (time.ctime(min(times)), time.ctime(max(times)))
+        reader.Close()
+        return
+
+    if options.sqlite:
+        cache = SqliteCache(options.sqlite, codec = ZlibCodec())
+    elif options.cache_dir:
+        cache = FileCache(options.cache_dir, codec = ZlibCodec())
+    else:
+        parser.error("a cache directory or a SQLite cache has to be given")
+    start = time.time()
+    if command == 'export':
+        count = export_snapshot(cache, path, options.level, options.max_age)
+        print "exported %d entries to %s in %.1fs" % (count, path, time.time() - start)
+    else:
+        loaded, skipped = import_snapshot(path, cache, options.max_age)
+        print "loaded %d entries from %s in %.1fs, skipped %d" % \
+            (loaded, path, time.time() - start, skipped)
+
+if __name__ == '__main__':
+    main()
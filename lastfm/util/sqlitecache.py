@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""Module for caching the responses in a SQLite database"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Event, Lock, Thread, currentThread, local
+import atexit
+import os
+import tempfile
+import time
+import weakref
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from lastfm.util.compression import ZlibCodec
+from lastfm.util.filecache import md5hash, _get_username
+
+class SqliteCache(object):
+    """
+    A cache of the responses, stored in a single SQLite database file. It supports
+    the same API as the L{FileCache} and can be installed with L{Api.set_cache}.
+
+    The database is used in the WAL mode, so the readers do not block the writer,
+    and it can be shared by several threads (each using its own connection) and
+    several processes. The writes are batched: they are kept in memory, and are
+    visible to the L{Get} and L{GetCachedTime} of the same object right away, and
+    till they are committed, in a single transaction once C{batch_size} of them are
+    pending, and at the latest C{flush_interval} seconds after they are made, by a
+    flusher thread if no other write comes in the meantime. The writes to the
+    database are done one at a time, so the batches are committed in order.
+    """
+    DEFAULT_BATCH_SIZE = 32
+    DEFAULT_FLUSH_INTERVAL = 1.0
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, path = None, batch_size = None, flush_interval = None, codec = None):
+        """
+        Create a SQLite cache.
+
+        @param path:             path of the database file. By default it is created
+                                 in the temporary directory (optional)
+        @type path:              L{str}
+        @param batch_size:       number of pending writes which triggers a commit
+                                 (optional)
+        @type batch_size:        L{int}
+        @param flush_interval:   maximum time, in seconds, for which the writes are
+                                 kept pending (optional)
+        @type flush_interval:    L{float}
+        @param codec:            the codec to compress the stored responses with. The
+                                 compressed responses are read correctly even without
+                                 it (optional)
+        @type codec:             L{ZlibCodec}
+        """
+        if sqlite3 is None:
+            raise ImportError("SqliteCache requires the sqlite3 module")
+        if not path:
+            path = os.path.join(tempfile.gettempdir(),
+                'python.cache_%s.sqlite' % _get_username())
+        self._path = os.path.abspath(path)
+        self._batch_size = batch_size or SqliteCache.DEFAULT_BATCH_SIZE
+        if flush_interval is None:
+            flush_interval = SqliteCache.DEFAULT_FLUSH_INTERVAL
+        self._flush_interval = flush_interval
+        self._codec = codec
+        self._pending = {}
+        # the batch being committed, still visible to the lookups
+        self._flushing = {}
+        self._last_flush = time.time()
+        self._flusher = None
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._local = local()
+        self._create_schema()
+        ref = weakref.ref(self)
+        atexit.register(lambda: ref() is not None and ref()._flush_at_exit())
+
+    @property
+    def path(self):
+        """
+        path of the database file
+        @rtype: L{str}
+        """
+        return self._path
+
+    def Get(self, key):
+        row = self._lookup(key, 'data')
+        return row is not None and ZlibCodec.decode(str(row[0])) or None
+
+    def Set(self, key, data):
+        with self._lock:
+            self._pending[md5hash(key)] = [time.time(),
+                self._codec is not None and self._codec.encode(data) or data, None]
+            due = self._due()
+        if due:
+            self.Flush()
+
+    def Remove(self, key):
+        hashed_key = md5hash(key)
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(hashed_key, None)
+            self._execute("DELETE FROM cache WHERE key = ?", (hashed_key,))
+
+    def GetCachedTime(self, key):
+        row = self._lookup(key, 'cached_time')
+        return row is not None and row[0] or None
+
+    def GetValidators(self, key):
+        row = self._lookup(key, 'validators')
+        return _decode_validators(row is not None and row[0] or None)
+
+    def SetValidators(self, key, validators):
+        value = _encode_validators(validators)
+        hashed_key = md5hash(key)
+        with self._write_lock:
+            with self._lock:
+                pending = self._pending.get(hashed_key)
+                if pending is not None:
+                    pending[2] = value
+                    return
+            self._execute("UPDATE cache SET validators = ? WHERE key = ?",
+                (value, hashed_key))
+
+    def Touch(self, key):
+        hashed_key = md5hash(key)
+        with self._write_lock:
+            with self._lock:
+                pending = self._pending.get(hashed_key)
+                if pending is not None:
+                    pending[0] = time.time()
+                    return
+            self._execute("UPDATE cache SET cached_time = ? WHERE key = ?",
+                (time.time(), hashed_key))
+
+    def Entries(self):
+        """
+        Iterate over the entries of the cache, in no particular order. The entries are
+        identified by their hashed keys, as the keys themselves are not stored.
+
+        @return:   the hashed key, the cached time, the data and the validators of
+                   each entry
+        @rtype:    iterator of L{tuple}
+        """
+        self.Flush()
+        cursor = self._connection().execute(
+            "SELECT key, cached_time, data, validators FROM cache")
+        for (hashed_key, cached_time, data, validators) in cursor:
+            yield (str(hashed_key), cached_time, ZlibCodec.decode(str(data)),
+                _decode_validators(validators))
+
+    def SetEntry(self, hashed_key, data, cached_time, validators = None):
+        """
+        Store an entry with the cached time it had in another cache, as read by the
+        L{Entries} of that cache. A copy of the entry cached later is kept instead.
+
+        @param hashed_key:   the hashed key of the entry
+        @type hashed_key:    L{str}
+        @param data:         the data of the entry
+        @type data:          L{str}
+        @param cached_time:  the time at which the entry was cached
+        @type cached_time:   L{float}
+        @param validators:   the validators of the entry (optional)
+        @type validators:    L{dict}
+
+        @return:             True if the entry is stored, False if it is kept
+        @rtype:              L{bool}
+        """
+        row = self._lookup_hashed(hashed_key, 'cached_time')
+        if row is not None and row[0] >= cached_time:
+            return False
+        with self._lock:
+            self._pending[hashed_key] = [cached_time,
+                self._codec is not None and self._codec.encode(data) or data,
+                validators and _encode_validators(validators) or None]
+            due = self._due()
+        if due:
+            self.Flush()
+        return True
+
+    def Flush(self):
+        """Commit the pending writes."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+                self._last_flush = time.time()
+            if not pending:
+                return
+            try:
+                self._executemany(
+                    "INSERT OR REPLACE INTO cache (key, cached_time, data, validators) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(k, t, sqlite3.Binary(d), v) for (k, (t, d, v)) in pending.iteritems()])
+            except:
+                # kept for the next flush, unless written again meanwhile
+                with self._lock:
+                    for (k, entry) in pending.iteritems():
+                        self._pending.setdefault(k, entry)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def Expire(self, max_age):
+        """
+        Delete the entries cached more than C{max_age} seconds ago.
+
+        @param max_age:  maximum age, in seconds, of the entries to keep
+        @type max_age:   L{float}
+
+        @return:         the number of entries deleted
+        @rtype:          L{int}
+        """
+        self.Flush()
+        with self._write_lock:
+            return self._execute("DELETE FROM cache WHERE cached_time < ?",
+                (time.time() - max_age,)).rowcount
+
+    def Close(self):
+        """
+        Commit the pending writes, stop the flusher thread and close the connection
+        of this thread.
+        """
+        self._stop_flusher()
+        self.Flush()
+        self._close_connection()
+
+    def _flush_at_exit(self):
+        # a flusher thread woken up while the interpreter shuts down would fail
+        self._stop_flusher()
+        self.Flush()
+
+    def _due(self):
+        # called with the lock held, after a write is made pending
+        if len(self._pending) >= self._batch_size or \
+                time.time() - self._last_flush >= self._flush_interval:
+            return True
+        # commit the write in time even if no other write comes
+        if self._flusher is None:
+            flusher = [Event(), Event()]
+            # the cache is referred to weakly, and the thread stopped once it is dropped
+            ref = weakref.ref(self, lambda ref: _stop_flusher(*flusher))
+            thread = Thread(target = _run_flusher, name = 'SqliteCache flusher',
+                args = (ref, self._flush_interval) + tuple(flusher))
+            thread.setDaemon(True)
+            thread.start()
+            flusher.append(thread)
+            self._flusher = tuple(flusher)
+        self._flusher[0].set()
+        return False
+
+    def _stop_flusher(self):
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            _stop_flusher(*flusher)
+
+    def _lookup(self, key, column):
+        return self._lookup_hashed(md5hash(key), column)
+
+    def _lookup_hashed(self, hashed_key, column):
+        with self._lock:
+            pending = self._pending.get(hashed_key) or self._flushing.get(hashed_key)
+        if pending is not None:
+            return (pending[['cached_time', 'data', 'validators'].index(column)],)
+        return self._connection().execute(
+            "SELECT %s FROM cache WHERE key = ?" % column, (hashed_key,)).fetchone()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout = SqliteCache.BUSY_TIMEOUT)
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _close_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _execute(self, sql, args = ()):
+        conn = self._connection()
+        try:
+            cursor = conn.execute(sql, args)
+            conn.commit()
+            return cursor
+        except:
+            conn.rollback()
+            raise
+
+    def _executemany(self, sql, rows):
+        conn = self._connection()
+        try:
+            conn.executemany(sql, rows)
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            cached_time REAL NOT NULL,
+            data BLOB NOT NULL,
+            validators TEXT)""")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(cache)")]
+        if 'validators' not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN validators TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_cached_time ON cache (cached_time)")
+        conn.commit()
+
+    def __repr__(self):
+        return "<lastfm.util.SqliteCache: %s>" % self._path
+
+def _stop_flusher(wakeup, stop, thread):
+    stop.set()
+    wakeup.set()
+    # not joined by itself, when it drops the last reference to the cache
+    if thread is not currentThread():
+        thread.join()
+
+def _run_flusher(ref, interval, wakeup, stop):
+    while not stop.isSet():
+        wakeup.wait()
+        wakeup.clear()
+        # the writes made pending meanwhile are committed in the same batch
+        stop.wait(interval)
+        cache = ref()
+        if cache is None:
+            return
+        try:
+            cache.Flush()
+        except sqlite3.Error:
+            # the batch is kept pending, for the next flush
+            pass
+        del cache
+    cache = ref()
+    if cache is not None:
+        cache._close_connection()
+
+def _encode_validators(validators):
+    return ''.join(["%s: %s\n" % (k, v) for (k, v) in validators.items()])
+
+def _decode_validators(value):
+    if not value:
+        return {}
+    return dict([line.split(': ', 1) for line in value.splitlines()])
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""Module for running the functions on a bounded pool of worker threads"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+from threading import Condition, Lock, Thread
+import Queue
+import sys
+import traceback
+
+_lock = Lock()
+
+class CancelledError(Exception):
+    """Raised when the result of a cancelled call is requested"""
+
+class Future(object):
+    """The result of a function call which may not have completed yet."""
+    def __init__(self):
+        self._condition = Condition()
+        self._done = False
+        self._running = False
+        self._cancelled = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        """
+        Is the call completed or cancelled?
+        @rtype: L{bool}
+        """
+        with self._condition:
+            return self._done
+
+    def running(self):
+        """
+        Is the call running now?
+        @rtype: L{bool}
+        """
+        with self._condition:
+            return self._running and not self._done
+
+    def cancelled(self):
+        """
+        Is the call cancelled?
+        @rtype: L{bool}
+        """
+        with self._condition:
+            return self._cancelled
+
+    def cancel(self):
+        """
+        Cancel the call if it has not started running yet.
+
+        @return:    True if the call is cancelled
+        @rtype:     L{bool}
+        """
+        with self._condition:
+            if self._cancelled:
+                return True
+            if self._running or self._done:
+                return False
+            self._cancelled = True
+            self._done = True
+            self._condition.notifyAll()
+        self._run_callbacks()
+        return True
+
+    def add_done_callback(self, func):
+        """
+        Add a function to be called with the future, when the call is completed or
+        cancelled. If the call is already done, the function is called right away.
+
+        @param func:   the function to call
+        @type func:    C{function}
+        """
+        with self._condition:
+            if not self._done:
+                self._callbacks.append(func)
+                return
+        self._call(func)
+
+    def result(self, timeout = None):
+        """
+        Get the return value of the call, waiting for it to complete if required.
+
+        @param timeout:   maximum time, in seconds, to wait (optional)
+        @type timeout:    L{float}
+
+        @return:          the return value of the call
+        @raise Exception: The exception raised by the call is re-raised.
+        @raise RuntimeError: If the call does not complete within the timeout.
+        @raise CancelledError: If the call is cancelled.
+        """
+        self._wait(timeout)
+        if self._cancelled:
+            raise CancelledError("the call is cancelled")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout = None):
+        """
+        Get the exception raised by the call, waiting for it to complete if required.
+
+        @param timeout:   maximum time, in seconds, to wait (optional)
+        @type timeout:    L{float}
+
+        @return:          the exception raised by the call, or None
+        @rtype:           C{Exception}
+        @raise RuntimeError: If the call does not complete within the timeout.
+        @raise CancelledError: If the call is cancelled.
+        """
+        self._wait(timeout)
+        if self._cancelled:
+            raise CancelledError("the call is cancelled")
+        return self._exception
+
+    def set_running(self):
+        """
+        Mark the call as running, unless it has been cancelled.
+
+        @return:    False if the call is cancelled and should not be run
+        @rtype:     L{bool}
+        """
+        with self._condition:
+            if self._cancelled:
+                return False
+            self._running = True
+            return True
+
+    def set_result(self, result):
+        with self._condition:
+            if self._done:
+                return
+            self._result = result
+            self._done = True
+            self._condition.notifyAll()
+        self._run_callbacks()
+
+    def set_exception(self, exception):
+        with self._condition:
+            if self._done:
+                return
+            self._exception = exception
+            self._done = True
+            self._condition.notifyAll()
+        self._run_callbacks()
+
+    def _run_callbacks(self):
+        with self._condition:
+            callbacks, self._callbacks = self._callbacks, []
+        for func in callbacks:
+            self._call(func)
+
+    def _call(self, func):
+        try:
+            func(self)
+        except Exception:
+            # the callback runs on a worker thread, the best we can do is to report it
+            traceback.print_exc(file = sys.stderr)
+
+    def _wait(self, timeout):
+        with self._condition:
+            if not self._done:
+                self._condition.wait(timeout)
+            if not self._done:
+                raise RuntimeError("timed out waiting for the result")
+
+    def __repr__(self):
+        if self.cancelled():
+            state = "cancelled"
+        elif self.done():
+            state = "done"
+        elif self.running():
+            state = "running"
+        else:
+            state = "pending"
+        return "<lastfm.util.Future: %s>" % state
+
+class ThreadPool(object):
+    """
+    A pool of at most C{max_workers} threads, which run the submitted functions
+    in the order of submission. The threads are started lazily.
+    """
+    DEFAULT_MAX_WORKERS = 16
+    """Size of the process wide default pool"""
+
+    _default = None
+
+    def __init__(self, max_workers):
+        """
+        @param max_workers:    maximum number of worker threads
+        @type max_workers:     L{int}
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self._max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = Lock()
+        self._shutdown = False
+
+    @property
+    def max_workers(self):
+        """
+        maximum number of worker threads
+        @rtype: L{int}
+        """
+        return self._max_workers
+
+    @staticmethod
+    def get_default():
+        """
+        Get the process wide default pool, which is shared by all the asynchronous
+        calls in the package.
+
+        @return:    the default pool
+        @rtype:     L{ThreadPool}
+        """
+        with _lock:
+            if ThreadPool._default is None:
+                ThreadPool._default = ThreadPool(ThreadPool.DEFAULT_MAX_WORKERS)
+            return ThreadPool._default
+
+    @staticmethod
+    def set_default_size(max_workers):
+        """
+        Set the size of the process wide default pool. The already submitted
+        functions are still run by the previous pool.
+
+        @param max_workers:    maximum number of worker threads
+        @type max_workers:     L{int}
+        """
+        with _lock:
+            ThreadPool.DEFAULT_MAX_WORKERS = max_workers
+            previous, ThreadPool._default = ThreadPool._default, None
+        if previous is not None:
+            previous.shutdown(wait = False)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule a function to be run on the pool.
+
+        @param func:   the function to run
+        @type func:    C{function}
+
+        @return:       the future result of the function
+        @rtype:        L{Future}
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit to a pool which is shut down")
+            self._queue.put((future, func, args, kwargs))
+            if len(self._threads) < self._max_workers:
+                thread = Thread(target = self._work)
+                thread.setDaemon(True)
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def shutdown(self, wait = True):
+        """
+        Stop the worker threads after the already submitted functions are run.
+
+        @param wait:   block till the worker threads exit (optional)
+        @type wait:    L{bool}
+        """
+        with self._lock:
+            self._shutdown = True
+            threads = self._threads[:]
+        for t in threads:
+            self._queue.put(None)
+        if wait:
+            for t in threads:
+                t.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            if not future.set_running():
+                continue
+            try:
+                result = func(*args, **kwargs)
+            except Exception, e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def __repr__(self):
+        return "<lastfm.util.ThreadPool: max_workers=%s>" % self._max_workers
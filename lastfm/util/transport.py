@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+"""Module for the HTTP transports used to talk to the web service"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm.util"
+
+import httplib
+import select
+import socket
+import time
+import urllib2
+import urlparse
+from threading import Lock
+
+class Response(object):
+    """The response of an HTTP request."""
+    def __init__(self, status, headers, body):
+        """
+        @param status:    HTTP status code of the response
+        @type status:     L{int}
+        @param headers:   HTTP headers of the response, with lowercased names
+        @type headers:    L{dict}
+        @param body:      body of the response
+        @type body:       L{str}
+        """
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def __repr__(self):
+        return "<lastfm.util.Response: %s, %s bytes>" % (self.status, len(self.body))
+
+class StreamingResponse(object):
+    """
+    The response of an HTTP request, with a body to be read incrementally, like a file.
+    """
+    def __init__(self, status, headers, fp, on_close = None):
+        """
+        @param status:    HTTP status code of the response
+        @type status:     L{int}
+        @param headers:   HTTP headers of the response, with lowercased names
+        @type headers:    L{dict}
+        @param fp:        file like object to read the body from
+        @type fp:         C{file}
+        @param on_close:  function to call with the response when it is closed
+                          (optional)
+        @type on_close:   C{function}
+        """
+        self.status = status
+        self.headers = headers
+        self._fp = fp
+        self._on_close = on_close
+        self._chunks = None
+        self._bytes_read = 0
+        self._complete = False
+
+    @property
+    def bytes_read(self):
+        """
+        number of bytes of the body read so far
+        @rtype: L{int}
+        """
+        return self._bytes_read
+
+    @property
+    def complete(self):
+        """
+        whether the whole body has been read
+        @rtype: L{bool}
+        """
+        return self._complete
+
+    @property
+    def body(self):
+        """
+        the part of the body read since L{keep_body} was called
+        @rtype: L{str}
+        """
+        return self._chunks is not None and ''.join(self._chunks) or None
+
+    def keep_body(self):
+        """Keep the read body in memory, to be returned by L{body}."""
+        if self._chunks is None:
+            self._chunks = []
+
+    def read(self, size = None):
+        if size is None or size < 0:
+            data = self._fp.read()
+        else:
+            data = self._fp.read(size)
+        if not data and size != 0:
+            self._complete = True
+        self._bytes_read += len(data)
+        if self._chunks is not None:
+            self._chunks.append(data)
+        return data
+
+    def close(self):
+        if self._fp is None:
+            return
+        self._fp.close()
+        self._fp = None
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def __repr__(self):
+        return "<lastfm.util.StreamingResponse: %s, %s bytes read>" % \
+            (self.status, self._bytes_read)
+
+class UrllibTransport(object):
+    """
+    Transport which sends the requests through an urllib2 compatible module.
+    The opener is built once and reused, it is rebuilt only when a different
+    opener is installed in the module.
+    """
+    def __init__(self, urllib = urllib2):
+        """
+        @param urllib:    an instance that supports the same API as the urllib2 module
+        @type urllib:     urllib2
+        """
+        self._urllib = urllib
+        self._opener = None
+        self._installed_opener = None
+        self._lock = Lock()
+
+    def open(self, url, data = None, headers = None):
+        """
+        Send an HTTP request. If data is provided, the request is a POST request.
+
+        @param url:       the URL to request
+        @type url:        L{str}
+        @param data:      urlencoded data to post (optional)
+        @type data:       L{str}
+        @param headers:   HTTP headers to send (optional)
+        @type headers:    L{dict}
+
+        @return:          the response. HTTP error responses are returned, not raised.
+        @rtype:           L{Response}
+        """
+        request = self._urllib.Request(url, data, headers or {})
+        try:
+            response = self._get_opener().open(request)
+        except self._urllib.HTTPError, e:
+            response = e
+        return Response(response.code,
+            dict((k.lower(), v) for (k, v) in response.info().items()),
+            response.read())
+
+    def open_stream(self, url, data = None, headers = None):
+        """
+        Send an HTTP request, and return as soon as the headers of the response are
+        received. If data is provided, the request is a POST request.
+
+        @param url:       the URL to request
+        @type url:        L{str}
+        @param data:      urlencoded data to post (optional)
+        @type data:       L{str}
+        @param headers:   HTTP headers to send (optional)
+        @type headers:    L{dict}
+
+        @return:          the response, to be closed by the caller. HTTP error
+                          responses are returned, not raised.
+        @rtype:           L{StreamingResponse}
+        """
+        request = self._urllib.Request(url, data, headers or {})
+        try:
+            response = self._get_opener().open(request)
+        except self._urllib.HTTPError, e:
+            response = e
+        return StreamingResponse(response.code,
+            dict((k.lower(), v) for (k, v) in response.info().items()),
+            response)
+
+    def _get_opener(self):
+        installed = getattr(self._urllib, '_opener', None)
+        with self._lock:
+            if self._opener is None or installed is not self._installed_opener:
+                if installed is not None:
+                    self._opener = self._urllib.build_opener(*installed.handlers)
+                else:
+                    self._opener = self._urllib.build_opener()
+                self._installed_opener = installed
+            return self._opener
+
+    def __repr__(self):
+        return "<lastfm.util.UrllibTransport>"
+
+class PooledTransport(object):
+    """
+    Transport which keeps persistent HTTP/1.1 connections to the hosts and
+    reuses them for subsequent requests. A GET request failing on a reused
+    connection, which the server may have closed, is sent again on a new one.
+    The POST requests are never sent again.
+    """
+    def __init__(self,
+                 pool_size = 4,
+                 idle_timeout = 30,
+                 timeout = None,
+                 connection_class = None):
+        """
+        @param pool_size:        maximum number of idle connections kept per host (optional)
+        @type pool_size:         L{int}
+        @param idle_timeout:     time, in seconds, after which an idle connection is
+                                 closed instead of being reused (optional)
+        @type idle_timeout:      L{float}
+        @param timeout:          socket timeout, in seconds (optional)
+        @type timeout:           L{float}
+        @param connection_class: class used for creating the connections (optional).
+                                 Defaults to C{httplib.HTTPConnection} and
+                                 C{httplib.HTTPSConnection}.
+        @type connection_class:  C{class}
+        """
+        self._pool_size = pool_size
+        self._idle_timeout = idle_timeout
+        self._timeout = timeout
+        self._connection_class = connection_class
+        self._pools = {}
+        self._lock = Lock()
+
+    def open(self, url, data = None, headers = None):
+        """
+        Send an HTTP request. If data is provided, the request is a POST request.
+
+        @param url:       the URL to request
+        @type url:        L{str}
+        @param data:      urlencoded data to post (optional)
+        @type data:       L{str}
+        @param headers:   HTTP headers to send (optional)
+        @type headers:    L{dict}
+
+        @return:          the response. HTTP error responses are returned, not raised.
+        @rtype:           L{Response}
+
+        @raise urllib2.URLError: If the host cannot be reached.
+        """
+        (key, method, selector, headers) = self._prepare(url, data, headers)
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, selector, data, headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (httplib.HTTPException, socket.error), e:
+                conn.close()
+                if reused and method == 'GET':
+                    # the server dropped the kept-alive connection, retry on another one.
+                    # The writes are not retried, the server may have done them already
+                    continue
+                raise urllib2.URLError(e)
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return Response(response.status,
+                dict((k.lower(), v) for (k, v) in response.getheaders()),
+                body)
+
+    def open_stream(self, url, data = None, headers = None):
+        """
+        Send an HTTP request, and return as soon as the headers of the response are
+        received. If data is provided, the request is a POST request. The connection
+        goes back to the pool when the response is closed after reading the whole body.
+
+        @param url:       the URL to request
+        @type url:        L{str}
+        @param data:      urlencoded data to post (optional)
+        @type data:       L{str}
+        @param headers:   HTTP headers to send (optional)
+        @type headers:    L{dict}
+
+        @return:          the response, to be closed by the caller. HTTP error
+                          responses are returned, not raised.
+        @rtype:           L{StreamingResponse}
+
+        @raise urllib2.URLError: If the host cannot be reached.
+        """
+        (key, method, selector, headers) = self._prepare(url, data, headers)
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, selector, data, headers)
+                response = conn.getresponse()
+            except (httplib.HTTPException, socket.error), e:
+                conn.close()
+                if reused and method == 'GET':
+                    continue
+                raise urllib2.URLError(e)
+            def release(streaming_response, conn = conn, response = response):
+                # a partly read response leaves the connection unusable
+                if response.will_close or not streaming_response.complete:
+                    conn.close()
+                else:
+                    self._release(key, conn)
+            return StreamingResponse(response.status,
+                dict((k.lower(), v) for (k, v) in response.getheaders()),
+                response, release)
+
+    def close(self):
+        """Close all the idle connections."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for (conn, last_used) in pool:
+                conn.close()
+
+    def _prepare(self, url, data, headers):
+        (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(url)
+        selector = urlparse.urlunparse(('', '', path or '/', params, query, ''))
+        headers = dict(headers or {})
+        if data is None:
+            method = 'GET'
+        else:
+            method = 'POST'
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        return ((scheme, netloc), method, selector, headers)
+
+    def _acquire(self, key):
+        now = time.time()
+        stale = []
+        conn = None
+        with self._lock:
+            pool = self._pools.get(key, [])
+            while pool:
+                c, last_used = pool.pop()
+                if now - last_used > self._idle_timeout or not self._is_healthy(c):
+                    stale.append(c)
+                else:
+                    conn = c
+                    break
+        for c in stale:
+            c.close()
+        if conn is not None:
+            return (conn, True)
+        return (self._connect(key), False)
+
+    def _release(self, key, conn):
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self._pool_size:
+                pool.append((conn, time.time()))
+                return
+        conn.close()
+
+    def _connect(self, key):
+        (scheme, netloc) = key
+        cls = self._connection_class
+        if cls is None:
+            cls = (scheme == 'https') and httplib.HTTPSConnection or httplib.HTTPConnection
+        if self._timeout is not None:
+            return cls(netloc, timeout = self._timeout)
+        return cls(netloc)
+
+    def _is_healthy(self, conn):
+        sock = getattr(conn, 'sock', None)
+        if sock is None:
+            return False
+        try:
+            # an idle connection should have nothing to read, readable means
+            # that the server has closed it (or sent garbage)
+            readable = select.select([sock], [], [], 0)[0]
+        except (AttributeError, TypeError, ValueError, select.error, socket.error):
+            return False
+        return not readable
+
+    def __repr__(self):
+        return "<lastfm.util.PooledTransport: pool_size=%s, idle_timeout=%s>" % \
+            (self._pool_size, self._idle_timeout)
@@ -8,6 +8,7 @@ __package__ = "lastfm"
 from lastfm.base import LastfmBase
 from lastfm.mixin import mixin
 from lastfm.decorators import cached_property, depaginate
+from lastfm.util.schema import Schema, Entity, Int
 
 @mixin("crawlable", "searchable", "cacheable", "property_adder")
 class Venue(LastfmBase):
@@ -15,6 +16,7 @@ class Venue(LastfmBase):
     
     class Meta(object):
         properties = ["id", "name", "location", "url"]
+        key_properties = ["url"]
         
     def init(self, api, **kwargs):
         if not isinstance(api, Api):
@@ -67,30 +69,6 @@ class Venue(LastfmBase):
         params.update(extra_params)
         return params
     
-    @staticmethod
-    def _search_yield_func(api, venue):
-        latitude = venue.findtext('location/{%s}point/{%s}lat' % ((Location.XMLNS,)*2))
-        longitude = venue.findtext('location/{%s}point/{%s}long' % ((Location.XMLNS,)*2))
-        
-        return Venue(
-                     api,
-                     id = int(venue.findtext('id')),
-                     name = venue.findtext('name'),
-                     location = Location(
-                                         api,
-                                         city = venue.findtext('location/city'),
-                                         country = Country(
-                                            api,
-                                            name = venue.findtext('location/country')
-                                            ),
-                                         street = venue.findtext('location/street'),
-                                         postal_code = venue.findtext('location/postalcode'),
-                                         latitude = (latitude.strip()!= '') and float(latitude) or None,
-                                         longitude = (longitude.strip()!= '') and float(longitude) or None,
-                                       ),
-                     url = venue.findtext('url')
-                     )
-    
     @staticmethod
     def _hash_func(*args, **kwds):
         try:
@@ -112,5 +90,14 @@ class Venue(LastfmBase):
     
 from lastfm.api import Api
 from lastfm.event import Event
-from lastfm.geo import Location, Country
-from lastfm.error import InvalidParametersError
\ No newline at end of file
+from lastfm.geo import _LOCATION_SCHEMA
+from lastfm.error import InvalidParametersError
+
+_SEARCH_SCHEMA = Schema(Venue, {
+    'id':       Int('id'),
+    'name':     'name',
+    'location': Entity(_LOCATION_SCHEMA, 'location'),
+    'url':      'url',
+    }, element_last = True)
+
+Venue._search_yield_func = staticmethod(_SEARCH_SCHEMA.extract)
\ No newline at end of file
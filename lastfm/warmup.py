@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+Warm up the response cache from a manifest of the web service calls to prefetch.
+
+The manifest has one entry per line. Blank lines and lines starting with C{#}
+are ignored. An entry is either a kind followed by the subject::
+    artist Bon Jovi
+    album Bon Jovi<TAB>Crush
+    user RJ
+    tag rock
+    chart user RJ
+    chart group Last.fm Web Services
+or the query string of a web service call::
+    method=artist.getTopTracks&artist=Bon+Jovi
+
+Run as::
+    python -m lastfm.warmup --api-key KEY --checkpoint warmup.ckpt manifest.txt
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+__package__ = "lastfm"
+
+import cgi
+import os
+import sys
+import time
+
+def _artist(subject):
+    return [{'method': 'artist.getInfo', 'artist': subject}]
+
+def _album(subject):
+    if '\t' not in subject:
+        raise ValueError("album entries need the artist and the album separated by a tab")
+    artist, album = subject.split('\t', 1)
+    return [{'method': 'album.getInfo', 'artist': artist.strip(), 'album': album.strip()}]
+
+def _user(subject):
+    return [{'method': 'user.getInfo', 'user': subject}]
+
+def _tag(subject):
+    return [{'method': 'tag.getTopArtists', 'tag': subject}]
+
+def _chart(subject):
+    parts = subject.split(None, 1)
+    if len(parts) != 2:
+        raise ValueError("chart entries need the kind and the name of the subject")
+    kind, name = parts
+    return [{'method': '%s.getWeeklyChartList' % kind, kind: name},
+            {'method': '%s.getWeeklyArtistChart' % kind, kind: name}]
+
+KINDS = {
+    'artist': _artist,
+    'album': _album,
+    'user': _user,
+    'tag': _tag,
+    'chart': _chart,
+}
+"""Map of the kinds of the manifest entries to the functions creating their calls"""
+
+def read_manifest(lines):
+    """
+    Read the web service calls listed in a manifest.
+
+    @param lines:    the lines of the manifest
+    @type lines:     iterable of L{str}
+
+    @return:         the parameters of the web service calls
+    @rtype:          L{list} of L{dict}
+
+    @raise ValueError: if an entry can not be understood
+    """
+    requests = []
+    for (number, line) in enumerate(lines):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            if line.startswith('method='):
+                requests.append(dict(cgi.parse_qsl(line)))
+                continue
+            parts = line.strip().split(None, 1)
+            if len(parts) != 2 or parts[0] not in KINDS:
+                raise ValueError("unknown entry")
+            requests.extend(KINDS[parts[0]](parts[1].strip(' ')))
+        except ValueError, e:
+            raise ValueError("line %d: %s: %r" % (number + 1, e, line))
+    return requests
+
+def warm_up(api, requests, checkpoint = None, batch_size = 50, max_workers = 4,
+            report = None):
+    """
+    Fetch the web service calls into the cache of the Api, in batches, using
+    L{Api.fetch_many}. The calls already cached are not sent again. After every batch
+    the number of calls done is written to the checkpoint file, along with a hash of
+    the calls, and a later run with the same checkpoint file resumes from there. The
+    checkpoint is ignored if the calls are not the same ones, in the same order.
+
+    @param api:          the Api whose cache is to be warmed up
+    @type api:           L{Api}
+    @param requests:     the parameters of the web service calls
+    @type requests:      L{list} of L{dict}
+    @param checkpoint:   path of the checkpoint file (optional)
+    @type checkpoint:    L{str}
+    @param batch_size:   number of calls between the checkpoints (optional)
+    @type batch_size:    L{int}
+    @param max_workers:  maximum number of calls run at the same time (optional)
+    @type max_workers:   L{int}
+    @param report:       function called after every batch with the number of calls
+                         done, the total number of calls, the number of errors and
+                         the throughput in calls per second (optional)
+    @type report:        C{function}
+
+    @return:             the number of calls done and the number of errors
+    @rtype:              L{tuple}
+    """
+    manifest_hash = _hash_requests(requests)
+    done = _read_checkpoint(checkpoint, manifest_hash)
+    errors = 0
+    start = time.time()
+    started_at = done
+    while done < len(requests):
+        batch = requests[done:done + batch_size]
+        for (result, error) in api.fetch_many(batch, max_workers):
+            if error is not None:
+                errors += 1
+        done += len(batch)
+        _write_checkpoint(checkpoint, manifest_hash, done)
+        if report is not None:
+            elapsed = time.time() - start
+            report(done, len(requests), errors,
+                elapsed and (done - started_at) / elapsed or 0.0)
+    return (done, errors)
+
+def _hash_requests(requests):
+    return md5hash(repr([sorted(r.items()) for r in requests]))
+
+def _read_checkpoint(checkpoint, manifest_hash):
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return 0
+    parts = open(checkpoint).read().split()
+    if len(parts) != 2 or parts[0] != manifest_hash:
+        # written for another manifest
+        return 0
+    try:
+        return int(parts[1])
+    except ValueError:
+        return 0
+
+def _write_checkpoint(checkpoint, manifest_hash, done):
+    if checkpoint is None:
+        return
+    temp = checkpoint + '.tmp'
+    f = open(temp, 'w')
+    f.write("%s %d\n" % (manifest_hash, done))
+    f.close()
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    os.rename(temp, checkpoint)
+
+def main(argv = None):
+    from optparse import OptionParser
+    parser = OptionParser(usage = "%prog --api-key KEY [options] manifest",
+        description = "Prefetch the web service calls listed in the manifest into the cache.")
+    parser.add_option("-k", "--api-key", help = "last.fm API key")
+    parser.add_option("-d", "--cache-dir", help = "directory of the file cache")
+    parser.add_option("-s", "--sqlite", help = "path of a SQLite cache to use instead")
+    parser.add_option("-c", "--checkpoint", help = "checkpoint file, to resume an interrupted run")
+    parser.add_option("-b", "--batch-size", type = "int", default = 50,
+        help = "number of calls between the checkpoints [default: %default]")
+    parser.add_option("-w", "--workers", type = "int", default = 4,
+        help = "number of calls run at the same time [default: %default]")
+    parser.add_option("-r", "--rate", type = "float",
+        help = "maximum number of requests per second [default: the Api default]")
+    (options, args) = parser.parse_args(argv)
+    if not options.api_key:
+        parser.error("the API key is required")
+    if len(args) != 1:
+        parser.error("exactly one manifest has to be given")
+
+    try:
+        requests = read_manifest(open(args[0]))
+    except (IOError, ValueError), e:
+        parser.error(str(e))
+
+    api = Api(options.api_key)
+    cache = None
+    if options.sqlite:
+        cache = SqliteCache(options.sqlite, codec = ZlibCodec())
+    elif options.cache_dir:
+        cache = FileCache(options.cache_dir, codec = ZlibCodec())
+    if cache is not None:
+        api.set_cache(cache)
+    if options.rate:
+        api.set_rate_limiter(RateLimiter(options.rate))
+
+    def report(done, total, errors, rate):
+        sys.stderr.write("\r%d/%d calls done, %d errors, %.1f calls/s" % (done, total, errors, rate))
+        sys.stderr.flush()
+    done, errors = warm_up(api, requests, options.checkpoint,
+        options.batch_size, options.workers, report)
+    if hasattr(cache, 'Flush'):
+        cache.Flush()
+    sys.stderr.write("\n")
+    return errors and 1 or 0
+
+from lastfm.api import Api
+from lastfm.util import FileCache, SqliteCache, ZlibCodec, RateLimiter
+from lastfm.util.filecache import md5hash
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,4 +9,18 @@ import test_geo
 import test_group
 import test_playlist
 import test_track
-import test_user
\ No newline at end of file
+import test_user
+import test_ratelimiter
+import test_transport
+import test_api
+import test_asyncapi
+import test_threadpool
+import test_memorycache
+import test_sqlitecache
+import test_filecache
+import test_compression
+import test_warmup
+import test_cacheserver
+import test_snapshot
+import test_schema
+import test_dates
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Benchmark of the compression of the cached responses, over the recorded responses
+in test/data. Run as: python test/bench_compression.py [rounds]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import glob
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lastfm.util import FileCache, ZlibCodec
+
+def load_responses():
+    pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', '*.xml')
+    return [(os.path.basename(path), open(path, 'rb').read())
+            for path in sorted(glob.glob(pattern))]
+
+def bench_cache(responses, codec, rounds):
+    directory = tempfile.mkdtemp()
+    try:
+        cache = FileCache(directory, codec = codec)
+        start = time.time()
+        for i in xrange(rounds):
+            for (key, data) in responses:
+                cache.Set(key, data)
+        write = (time.time() - start) / (rounds * len(responses))
+        start = time.time()
+        for i in xrange(rounds):
+            for (key, data) in responses:
+                cache.Get(key)
+        read = (time.time() - start) / (rounds * len(responses))
+        return (cache.size, write, read)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    rounds = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+    responses = load_responses()
+    total = sum([len(data) for (key, data) in responses])
+    print "%d responses, %d bytes" % (len(responses), total)
+    print "%-22s %10s %7s %12s %12s" % ('codec', 'stored', 'ratio', 'write (us)', 'read (us)')
+    for codec in [None, ZlibCodec(1), ZlibCodec(6), ZlibCodec(9)]:
+        size, write, read = bench_cache(responses, codec, rounds)
+        name = codec is None and 'none' or 'zlib level %d' % codec.level
+        print "%-22s %10d %7.2f %12.1f %12.1f" % \
+            (name, size, float(total) / size, write * 1e6, read * 1e6)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Benchmark of parsing the dates of the recorded responses in test/data, with
+time.strptime as before and with lastfm.util.dates, with the memo emptied before
+each round (cold) and kept (warm), and with the uts attributes of the scrobbles.
+Run as: python test/bench_dates.py [rounds]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import time
+from datetime import datetime
+import xml.etree.cElementTree as ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from lastfm.util import dates
+from lastfm.util.dates import parse_date, parse_element_date
+from bench_parsed_cache import load_responses
+
+FORMATS = [
+    ('date', '%a, %d %b %Y %H:%M:%S'),
+    ('date', '%d %b %Y, %H:%M'),
+    ('date', '%Y-%m-%dT%H:%M:%S'),
+    ('startDate', '%a, %d %b %Y %H:%M:%S'),
+    ('startDate', '%a, %d %b %Y'),
+    ('published', '%a, %d %b %Y %H:%M:%S +0000'),
+    ]
+
+def load_dates():
+    found = []
+    for (name, data) in load_responses():
+        for (tag, format) in FORMATS:
+            for elem in ElementTree.XML(data).getiterator(tag):
+                text = (elem.text or '').strip()
+                try:
+                    time.strptime(text, format)
+                except ValueError:
+                    continue
+                found.append((elem, text, (format,)))
+    return found
+
+def strptime(found):
+    for (elem, text, formats) in found:
+        datetime(*time.strptime(text, formats[0])[0:6])
+
+def cold(found):
+    dates._memo.clear()
+    for (elem, text, formats) in found:
+        parse_date(text, formats)
+
+def warm(found):
+    for (elem, text, formats) in found:
+        parse_date(text, formats)
+
+def uts(found):
+    dates._memo.clear()
+    for (elem, text, formats) in found:
+        parse_element_date(elem, formats)
+
+def best(func, found, rounds):
+    func(found)
+    times = []
+    for i in xrange(5):
+        start = time.clock()
+        for j in xrange(rounds):
+            func(found)
+        times.append((time.clock() - start) / (rounds * len(found)))
+    return min(times)
+
+if __name__ == '__main__':
+    rounds = len(sys.argv) > 1 and int(sys.argv[1]) or 10
+    found = load_dates()
+    for (elem, text, formats) in found:
+        assert parse_date(text, formats) == datetime(*time.strptime(text, formats[0])[0:6])
+    print "%d dates, %d distinct, %d with uts" % (len(found),
+        len(set([text for (elem, text, formats) in found])),
+        len([elem for (elem, text, formats) in found if elem.get('uts')]))
+    times = [(label, best(func, found, rounds)) for (label, func) in
+             (('strptime', strptime), ('cold', cold), ('warm', warm), ('uts', uts))]
+    for (label, t) in times:
+        print "%-10s %6.2f us per date, %5.1fx" % (label, t * 1e6, times[0][1] / t)
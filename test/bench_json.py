@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Benchmark of creating the objects from the responses in the XML and the JSON formats,
+over the recorded responses in test/data and their JSON conversions. Each case calls
+the Api like an application would, through a transport serving the responses from
+memory, and reads all the properties of the objects created. The objects created from
+both formats are compared first. The responses are then only decoded, to tell the
+cost of the decoding from the cost of creating the objects.
+Run as: python test/bench_json.py [rounds]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import gc
+import re
+import time
+import urllib2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from wsgi_intercept.urllib2_intercept import install_opener
+import wsgi_intercept
+from wsgi_test_app import create_wsgi_app
+
+from lastfm import Api
+from lastfm.base import LastfmBase
+from lastfm.stats import Stats
+from lastfm.wiki import Wiki
+from lastfm.util import objectcache, UrllibTransport
+from lastfm.util.transport import Response
+from json_fixtures import xml_to_json
+
+def weekly_chart(api, kind):
+    user = api.get_user('RJ')
+    wc = user.weekly_chart_list[0]
+    return getattr(user, 'get_weekly_%s_chart' % kind)(wc.start, wc.end)
+
+CASES = [
+    ('artist info', lambda api: [api.get_artist('Bon Jovi')]),
+    ('artist search', lambda api: api.search_artist('Bon Jovi')[:10]),
+    ('similar artists', lambda api: api.get_artist('Bon Jovi').similar),
+    ('album info', lambda api: [api.get_album('Supersonic', 'Oasis')]),
+    ('track info', lambda api: [api.get_track('Lithium', 'Evanescence')]),
+    ('track search', lambda api: api.search_track('baby')[:10]),
+    ('user info', lambda api: [api.get_user('RJ')]),
+    ('recent tracks', lambda api: api.get_user('RJ').recent_tracks),
+    ('library tracks', lambda api: api.get_user('RJ').library.tracks[:50]),
+    ('tag top artists', lambda api: api.get_tag('rock').most_similar.top_artists),
+    ('events', lambda api: [api.get_event(216156)] + api.get_artist('Bon Jovi').events),
+    ('weekly charts', lambda api: [weekly_chart(api, k)
+                                   for k in ('album', 'artist', 'track')]),
+]
+
+class RecordingTransport(object):
+    """Keeps the responses served by the recorded responses of test/data."""
+    def __init__(self):
+        self._transport = UrllibTransport(urllib2)
+        self.bodies = {}
+
+    def open(self, url, data = None, headers = None):
+        response = self._transport.open(url, data, headers)
+        self.bodies[url] = response.body
+        return response
+
+class ReplayTransport(object):
+    """Serves the responses from memory, converted to JSON for the JSON requests."""
+    _FORMAT_RE = re.compile(r'format=json&?')
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.json_bodies = dict([(url, xml_to_json(body)) for (url, body) in bodies.items()])
+
+    def open(self, url, data = None, headers = None):
+        if 'format=json' in url:
+            return Response(200, {}, self.json_bodies[self._FORMAT_RE.sub('', url).rstrip('&')])
+        return Response(200, {}, self.bodies[url])
+
+def read(value, depth = 0):
+    # all the properties of the objects which have been read from the responses
+    if isinstance(value, LastfmBase):
+        if depth > 2:
+            return value.__class__.__name__
+        value._hydrate()
+        return dict([(p, read(value.__dict__.get('_' + p), depth + 1))
+                     for p in value.Meta.properties +
+                     getattr(value.Meta, 'fillable_properties', [])])
+    if isinstance(value, (Stats, Wiki)):
+        return dict([(k, read(v, depth + 1))
+                     for (k, v) in value.__dict__.items() if k != '_subject'])
+    if isinstance(value, (list, tuple)):
+        return [read(v, depth) for v in value]
+    if hasattr(value, '__dict__'):
+        return value.__class__.__name__
+    return value
+
+def create_api(format, transport):
+    api = Api('1234', no_cache = True)
+    api.set_rate_limiter(None)
+    api.set_transport(transport)
+    api.set_format(format)
+    return api
+
+def best(func, rounds):
+    times = []
+    for i in xrange(rounds):
+        objectcache._registry.clear()
+        gc.collect()
+        start = time.clock()
+        func()
+        times.append(time.clock() - start)
+    return min(times)
+
+if __name__ == '__main__':
+    rounds = len(sys.argv) > 1 and int(sys.argv[1]) or 20
+    install_opener()
+    wsgi_intercept.add_wsgi_intercept('ws.audioscrobbler.com', 80, create_wsgi_app)
+    recorder = RecordingTransport()
+    api = create_api('xml', recorder)
+    for (label, case) in CASES:
+        objectcache._registry.clear()
+        read(list(case(api)))
+    transport = ReplayTransport(recorder.bodies)
+    xml, json = create_api('xml', transport), create_api('json', transport)
+    for (label, case) in CASES:
+        objectcache._registry.clear()
+        expected = read(list(case(xml)))
+        objectcache._registry.clear()
+        assert read(list(case(json))) == expected, label
+    xml_bodies = recorder.bodies.values()
+    json_bodies = [transport.json_bodies[u] for u in recorder.bodies]
+    print "%d responses, %d bytes of XML, %d bytes of JSON" % (len(xml_bodies),
+        sum([len(b) for b in xml_bodies]), sum([len(b) for b in json_bodies]))
+    print "decoded and created, best of %d, CPU:" % rounds
+    totals = [0, 0]
+    for (label, case) in CASES:
+        times = [best(lambda: read(list(case(api))), rounds) for api in (xml, json)]
+        totals = [t + s for (t, s) in zip(totals, times)]
+        print "  %-16s xml %7.2f ms, json %7.2f ms, json/xml %.2f" % \
+            (label, times[0] * 1e3, times[1] * 1e3, times[1] / times[0])
+    print "  %-16s xml %7.2f ms, json %7.2f ms, json/xml %.2f" % \
+        ('all', totals[0] * 1e3, totals[1] * 1e3, totals[1] / totals[0])
+    times = [best(lambda: [api._parse_response('bench', b) for b in bodies], rounds)
+             for (api, bodies) in ((xml, xml_bodies), (json, json_bodies))]
+    print "decoded only:      xml %7.2f ms, json %7.2f ms, json/xml %.2f" % \
+        (times[0] * 1e3, times[1] * 1e3, times[1] / times[0])
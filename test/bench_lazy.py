@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Benchmark of creating the tracks of a library, eagerly and lazily, from the tracks
+of the recorded library.getTracks response in test/data, copied with distinct names
+up to the given number. The tracks are iterated for their names only, and for their
+names and play counts. The memory of the tracks of one response holding them all is
+measured in a process of its own for each mode: the peak of the resident memory while
+they are created, then, once the response is dropped, the objects tracked by the
+garbage collector and the elements kept by the tracks for their lazy reads.
+Run as: python test/bench_lazy.py [tracks]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import gc
+import glob
+import resource
+import subprocess
+import tempfile
+import time
+import xml.etree.cElementTree as ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lastfm import Api
+from lastfm.user import _LIBRARY_TRACK_SCHEMA
+from lastfm.util import objectcache
+
+def load_tracks(count):
+    pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', '*.xml')
+    tracks = []
+    for name in sorted(glob.glob(pattern)):
+        data = open(name, 'rb').read()
+        if '<tracks user=' in data[:400]:
+            tracks.extend([ElementTree.tostring(t)
+                           for t in ElementTree.XML(data).findall('tracks/track')])
+    elements = []
+    for i in xrange(count):
+        element = ElementTree.XML(tracks[i % len(tracks)])
+        element.find('name').text += ' %d' % i
+        elements.append(element)
+    return elements
+
+def names(api, elements):
+    for element in elements:
+        _LIBRARY_TRACK_SCHEMA(element, api, 'library').name
+
+def playcounts(api, elements):
+    for element in elements:
+        track = _LIBRARY_TRACK_SCHEMA(element, api, 'library')
+        track.name, track.stats.playcount
+
+def best(api, func, elements, repeat = 5):
+    times = []
+    for i in xrange(repeat):
+        objectcache._registry.clear()
+        gc.collect()
+        start = time.clock()
+        func(api, elements)
+        times.append(time.clock() - start)
+    return min(times)
+
+def resident():
+    # the resident memory of the process, in bytes (Linux only)
+    return int(open('/proc/self/statm').read().split()[1]) * resource.getpagesize()
+
+def memory(mode, path):
+    # the tracks of one response, like a library page of the Api, parsed whole
+    data = open(path, 'rb').read()
+    api = Api('1234', no_cache = True)
+    api.set_lazy(mode != 'eager')
+    gc.collect()
+    (before, objects) = (resident(), len(gc.get_objects()))
+    root = ElementTree.XML(data)
+    tracks = [_LIBRARY_TRACK_SCHEMA(t, api, 'library') for t in root.findall('track')]
+    if mode == 'lazy, read':
+        for track in tracks:
+            track.stats.playcount
+    del root
+    gc.collect()
+    objects = len(gc.get_objects()) - objects
+    # the elements kept for the lazy reads, and about their size with their texts
+    elements = {}
+    for entity in tracks + [t.artist for t in tracks]:
+        source = entity.__dict__.get('_source') or ()
+        for value in source:
+            if not ElementTree.iselement(value):
+                continue
+            for e in value.iter():
+                elements[id(e)] = sys.getsizeof(e) + sum([sys.getsizeof(v) for v in
+                    (e.text, e.tail, e.keys() and e.attrib or None) if v is not None])
+    # ru_maxrss is in kilobytes on Linux
+    print resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - before, objects, \
+        len(elements), sum(elements.values())
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--memory']:
+        memory(sys.argv[2], sys.argv[3])
+        sys.exit()
+    count = len(sys.argv) > 1 and int(sys.argv[1]) or 50000
+    elements = load_tracks(count)
+    eager, lazy = Api('1234', no_cache = True), Api('1234', no_cache = True)
+    lazy.set_lazy(True)
+    for element in elements[:100]:
+        objectcache._registry.clear()
+        expected = _LIBRARY_TRACK_SCHEMA(element, eager, 'library')
+        expected = (expected.name, expected.artist.url, expected.stats.playcount,
+                    expected.full_track, expected.image)
+        objectcache._registry.clear()
+        track = _LIBRARY_TRACK_SCHEMA(element, lazy, 'library')
+        assert (track.name, track.artist.url, track.stats.playcount,
+                track.full_track, track.image) == expected
+    print "%d tracks" % count
+    for (label, func) in (('names', names), ('playcounts', playcounts)):
+        eager_time, lazy_time = best(eager, func, elements), best(lazy, func, elements)
+        print "%-12s eager %7.1f ms, lazy %7.1f ms, %5.2fx" % \
+            (label, eager_time * 1e3, lazy_time * 1e3, eager_time / lazy_time)
+    (handle, path) = tempfile.mkstemp('.xml')
+    try:
+        os.write(handle, '<tracks user="RJ">%s</tracks>' % ''.join(
+            [ElementTree.tostring(e) for e in elements]))
+        os.close(handle)
+        del elements
+        print "%d tracks kept, after their response is dropped" % count
+        for mode in ('eager', 'lazy', 'lazy, read'):
+            (peak, objects, kept, size) = [int(v) for v in subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--memory', mode, path],
+                stdout = subprocess.PIPE).communicate()[0].split()]
+            print "%-12s peak %6.1f MB, %8d objects, %8d elements of %6.1f MB kept" % \
+                (mode, peak / 1e6, objects, kept, size / 1e6)
+    finally:
+        os.remove(path)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Benchmark of the cost of a cache hit, with and without the parsed response cache,
+over the recorded responses in test/data. Run as: python test/bench_parsed_cache.py [rounds]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import glob
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lastfm import Api
+from lastfm.util import MemoryCache, ParsedCache
+
+def load_responses():
+    pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', '*.xml')
+    responses = [(os.path.basename(path), open(path, 'rb').read())
+                 for path in sorted(glob.glob(pattern))]
+    return [(name, data) for (name, data) in responses if 'status="ok"' in data[:200]]
+
+def bench(responses, parsed_cache, rounds):
+    api = Api('1234', no_cache = True)
+    api.set_cache(MemoryCache(64*1024*1024))
+    api._no_cache = False
+    api.set_parsed_cache(parsed_cache)
+    calls = []
+    for (name, data) in responses:
+        params = {'method': 'bench.fixture', 'name': name}
+        api._cache.Set(api._get_cache_key(Api.API_ROOT_URL, api._prepare_params(params)), data)
+        calls.append(params)
+    for params in calls:
+        api._fetch_data(params)
+    start = time.clock()
+    for i in xrange(rounds):
+        for params in calls:
+            api._fetch_data(params)
+    return (time.clock() - start) / (rounds * len(calls))
+
+if __name__ == '__main__':
+    rounds = len(sys.argv) > 1 and int(sys.argv[1]) or 20
+    responses = load_responses()
+    print "%d responses, %d bytes" % (len(responses), sum([len(d) for (n, d) in responses]))
+    before = bench(responses, None, rounds)
+    after = bench(responses, ParsedCache(), rounds)
+    print "%-26s %10.1f us CPU per hit" % ('response cache only', before * 1e6)
+    print "%-26s %10.1f us CPU per hit" % ('with parsed cache', after * 1e6)
+    print "speedup: %.1fx" % (before / after)
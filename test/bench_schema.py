@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""
+Benchmark of creating the objects from the responses, with the schemas of the entity
+modules against the hand-written code of a git revision, by default the one before the
+schemas, over the recorded responses in test/data. The revision is exported with
+C{git archive}, and both trees are run in their own processes calling the same entry
+points, alternately, the runs being compared by pairs. The objects created by both are
+compared, and the differences shown.
+Run as: python test/bench_schema.py [rounds] [revision]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import gc
+import glob
+import cPickle as pickle
+import shutil
+import subprocess
+import tempfile
+import time
+import xml.etree.cElementTree as ElementTree
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_elements(path):
+    pattern = os.path.join(ROOT, 'test', 'data', '*.xml')
+    elements = []
+    for name in sorted(glob.glob(pattern)):
+        data = open(name, 'rb').read()
+        if 'status="ok"' in data[:200]:
+            elements.extend(ElementTree.XML(data).findall(path))
+    return elements
+
+def cases():
+    # the entry points of the objects, the same in the trees before and after the schemas
+    from lastfm import Album, Artist, Event, Tag, Track, Venue
+    from lastfm.chart import WeeklyAlbumChart, WeeklyArtistChart, WeeklyTrackChart
+
+    def filler(cls):
+        def create(api, data):
+            cls._fetch_data = staticmethod(lambda *args: data)
+            subject = object.__new__(cls)
+            subject._api, subject._stats = api, None
+            subject._name, subject._artist = 'name', Artist(api, name = 'artist')
+            subject._fill_info()
+            return subject
+        return create
+
+    def chart(cls):
+        def create(api, data):
+            return cls.create_from_data(api,
+                Artist(api, name = data.get('user') or 'subject'), data)
+        return create
+
+    return [
+        ('artist search', 'results/artistmatches/artist', Artist._search_yield_func),
+        ('artist info', 'artist', filler(Artist)),
+        ('album search', 'results/albummatches/album', Album._search_yield_func),
+        ('album info', 'album', filler(Album)),
+        ('track search', 'results/trackmatches/track', Track._search_yield_func),
+        ('track info', 'track', filler(Track)),
+        ('tag search', 'results/tagmatches/tag', Tag._search_yield_func),
+        ('venue search', 'results/venuematches/venue', Venue._search_yield_func),
+        ('event', 'events/event', Event.create_from_data),
+        ('weekly album chart', 'weeklyalbumchart', chart(WeeklyAlbumChart)),
+        ('weekly artist chart', 'weeklyartistchart', chart(WeeklyArtistChart)),
+        ('weekly track chart', 'weeklytrackchart', chart(WeeklyTrackChart)),
+    ]
+
+def _blank(value):
+    return isinstance(value, basestring) and not value
+
+def describe(value, depth = 0):
+    from lastfm.base import LastfmBase
+    from lastfm.stats import Stats
+    from lastfm.wiki import Wiki
+    # the blank values are left out, the schemas giving None where the code gave ''
+    if isinstance(value, (LastfmBase, Stats, Wiki)):
+        if depth > 3:
+            return repr(value)
+        return dict([(k, describe(v, depth + 1)) for (k, v) in value.__dict__.items()
+            if k not in ('_api', '_subject') and v is not None and not _blank(v)])
+    if isinstance(value, list):
+        return [describe(v, depth) for v in value]
+    return value
+
+def bench(api, create, elements, rounds):
+    # without the collections of the garbage left by the previous runs, like timeit
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.clock()
+        for i in xrange(rounds):
+            for element in elements:
+                create(api, element)
+        return (time.clock() - start) / (rounds * len(elements))
+    finally:
+        gc.enable()
+
+def serve(tree, rounds):
+    # in the process of a tree: the objects of the cases, then their times on demand
+    sys.path.insert(0, tree)
+    from lastfm import Api
+    from lastfm.util import objectcache
+    api = Api('1234', no_cache = True)
+    runs, results = [], []
+    for (name, path, create) in cases():
+        elements = load_elements(path)
+        objects = []
+        for element in elements:
+            objectcache._registry.clear()
+            objects.append(describe(create(api, element)))
+        runs.append((create, elements))
+        results.append((name, len(elements), objects))
+    data = pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+    sys.stdout.write("%d\n%s" % (len(data), data))
+    sys.stdout.flush()
+    for line in iter(sys.stdin.readline, ''):
+        (create, elements) = runs[int(line)]
+        objectcache._registry.clear()
+        sys.stdout.write("%r\n" % bench(api, create, elements, rounds))
+        sys.stdout.flush()
+
+def baseline():
+    # the revision before the one adding the schemas
+    added = subprocess.Popen(['git', 'log', '--diff-filter=A', '--format=%H', '--',
+        'lastfm/util/schema.py'], cwd = ROOT, stdout = subprocess.PIPE).communicate()[0]
+    return added.split()[-1] + '^'
+
+def export(revision, directory):
+    archive = subprocess.Popen(['git', 'archive', revision, 'lastfm'], cwd = ROOT,
+                               stdout = subprocess.PIPE)
+    subprocess.check_call(['tar', '-x', '-C', directory], stdin = archive.stdout)
+    if archive.wait() != 0:
+        raise RuntimeError("git archive of %s failed" % revision)
+
+class Tree(object):
+    """The process running the cases with the package of a tree."""
+    def __init__(self, tree, rounds):
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+            '--serve', tree, str(rounds)], stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+        size = self.process.stdout.readline()
+        if not size:
+            raise RuntimeError("the benchmark of %s failed" % tree)
+        self.results = pickle.loads(self.process.stdout.read(int(size)))
+
+    def time(self, case):
+        self.process.stdin.write("%d\n" % case)
+        self.process.stdin.flush()
+        return float(self.process.stdout.readline())
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+def median(values):
+    return sorted(values)[len(values) / 2]
+
+def main(rounds, revision, repeat = 50):
+    directory = tempfile.mkdtemp()
+    try:
+        export(revision, directory)
+        (before, after) = (Tree(directory, rounds), Tree(ROOT, rounds))
+        # the runs of both trees alternated, for the noise of the machine to be
+        # shared by the pairs of runs, and compared by their medians
+        times = [[(before.time(i), after.time(i)) for j in xrange(repeat)]
+                 for i in xrange(len(before.results))]
+        before.close()
+        after.close()
+    finally:
+        shutil.rmtree(directory)
+    print "%s against the working tree, the medians of %d runs" % (revision, repeat)
+    print "%-20s %13s %12s %12s %7s %7s" % ('', '', 'before', 'after', 'speedup', 'faster')
+    total_before = total_after = 0
+    for ((name, count, objects), runs, (n, c, after_objects)) in \
+            zip(before.results, times, after.results):
+        before_time = median([b for (b, a) in runs])
+        after_time = median([a for (b, a) in runs])
+        total_before += before_time
+        total_after += after_time
+        print "%-20s %4d elements %9.1f us %9.1f us %6.2fx %6d%%" % (name, count,
+            before_time * 1e6, after_time * 1e6, median([b / a for (b, a) in runs]),
+            100 * len([b for (b, a) in runs if a < b]) / len(runs))
+        for (b, a) in zip(objects, after_objects):
+            if b != a:
+                print "    differs:", diff(b, a)
+    print "%-20s %24.1f us %9.1f us %6.2fx" % \
+        ('all', total_before * 1e6, total_after * 1e6, total_before / total_after)
+
+def diff(before, after, path = ''):
+    if isinstance(before, dict) and isinstance(after, dict):
+        return ", ".join([diff(before.get(k), after.get(k), "%s.%s" % (path, k))
+            for k in sorted(set(before) | set(after)) if before.get(k) != after.get(k)])
+    if isinstance(before, list) and isinstance(after, list) and len(before) == len(after):
+        return ", ".join([diff(b, a, "%s[%d]" % (path, i))
+            for (i, (b, a)) in enumerate(zip(before, after)) if b != a])
+    return "%s %r -> %r" % (path, before, after)
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(len(sys.argv) > 1 and int(sys.argv[1]) or 5,
+             len(sys.argv) > 2 and sys.argv[2] or baseline())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+Benchmark of the transports against a local keep-alive HTTP server serving
+the recorded responses. Run as: python test/bench_transport.py [requests]
+"""
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import sys, os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lastfm import Api
+from lastfm.util import UrllibTransport, PooledTransport
+from http_test_server import start_server
+
+def bench(server, transport, n):
+    api = Api('1234', no_cache = True)
+    api.set_rate_limiter(None)
+    api.set_transport(transport)
+    params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+    server.connections = 0
+    start = time.time()
+    for i in xrange(n):
+        api._fetch_url(server.root_url, params)
+    elapsed = time.time() - start
+    return (n/elapsed, server.connections)
+
+if __name__ == '__main__':
+    n = len(sys.argv) > 1 and int(sys.argv[1]) or 2000
+    server = start_server()
+    for (name, transport) in [('UrllibTransport', UrllibTransport()),
+                              ('PooledTransport', PooledTransport())]:
+        rps, connections = bench(server, transport, n)
+        print "%-16s %8.1f requests/s  (%d requests, %d connections)" % \
+            (name, rps, n, connections)
+    server.shutdown()
@@ -0,0 +1,70 @@
+"""
+A simple keep-alive HTTP server serving the recorded responses, for testing
+and benchmarking the transports against a real socket.
+"""
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from threading import Thread
+import os
+import re
+import socket
+import sys
+if sys.version < '2.6':
+    import md5
+    def md5hash(string):
+        return md5.new(string).hexdigest()
+else:
+    from hashlib import md5
+    def md5hash(string):
+        return md5(string).hexdigest()
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data')
+
+class TestRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # do not let Nagle's algorithm delay the responses on kept-alive connections
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        # the recorded responses are keyed on the last.fm URL
+        url = 'http://ws.audioscrobbler.com%s' % self.path
+        url_without_apikey = re.sub(r'(api_key=[^&]+.)','', url)
+        data_file = os.path.join(CACHE_PATH, "%s.xml" % md5hash(url_without_apikey))
+        try:
+            filedata = open(data_file).read()
+            self.send_response(200)
+        except IOError:
+            filedata = '<?xml version="1.0" encoding="utf-8"?>\n' \
+                '<lfm status="failed">\n<error code="6">Not found</error></lfm>\n'
+            self.send_response(400)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(filedata)))
+        self.end_headers()
+        self.wfile.write(filedata)
+
+    def log_message(self, *args):
+        pass
+
+class TestServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), TestRequestHandler)
+        self.connections = 0
+        self.requests = 0
+
+    @property
+    def root_url(self):
+        return 'http://127.0.0.1:%s/2.0/' % self.server_address[1]
+
+def start_server():
+    server = TestServer()
+    thread = Thread(target = server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    return server
@@ -0,0 +1,67 @@
+"""
+Converts the recorded XML responses to JSON responses laid out like the ones of the
+web service, for testing and benchmarking the JSON format against the same data.
+"""
+import re
+import urllib2
+import xml.etree.cElementTree as ElementTree
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+from lastfm.util import UrllibTransport
+from lastfm.util.jsontree import NAMESPACES
+from lastfm.util.transport import Response
+
+def xml_to_json(xml):
+    root = ElementTree.XML(xml)
+    if root.get('status') != 'ok':
+        error = root.find('error')
+        return json.dumps({'error': int(error.get('code')), 'message': error.text})
+    return json.dumps(dict((_prefixed(child.tag), _convert(child)) for child in root))
+
+def _convert(elem):
+    children = list(elem)
+    if not children:
+        if elem.attrib:
+            value = dict(elem.attrib)
+            value['#text'] = elem.text or ''
+            return value
+        return elem.text or ''
+    value = {}
+    for child in children:
+        converted = _convert(child)
+        tag = _prefixed(child.tag)
+        if tag not in value:
+            value[tag] = converted
+        elif isinstance(value[tag], list):
+            value[tag].append(converted)
+        else:
+            value[tag] = [value[tag], converted]
+    if elem.attrib:
+        value['@attr'] = dict(elem.attrib)
+    return value
+
+def _prefixed(tag):
+    if tag[:1] != '{':
+        return tag
+    namespace, tag = tag[1:].split('}', 1)
+    if namespace not in NAMESPACES:
+        return tag
+    return '%s:%s' % (NAMESPACES[namespace], tag)
+
+class JsonTransport(object):
+    """Serves the recorded XML responses as JSON, to the requests asking for JSON."""
+    _FORMAT_RE = re.compile(r'format=json&?')
+
+    def __init__(self, transport = None):
+        self._transport = transport or UrllibTransport(urllib2)
+
+    def open(self, url, data = None, headers = None):
+        if 'format=json' not in url:
+            return self._transport.open(url, data, headers)
+        url = self._FORMAT_RE.sub('', url).rstrip('&')
+        response = self._transport.open(url, data, headers)
+        return Response(response.status, response.headers, xml_to_json(response.body))
@@ -0,0 +1,633 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+import threading
+import time
+import urllib2
+from cStringIO import StringIO
+
+from wsgi_intercept.urllib2_intercept import install_opener
+import wsgi_intercept
+from wsgi_test_app import create_wsgi_app
+
+install_opener()
+wsgi_intercept.add_wsgi_intercept('ws.audioscrobbler.com', 80, create_wsgi_app)
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api, Artist, Track, User
+from lastfm.base import LastfmBase
+from lastfm.stats import Stats
+from lastfm.wiki import Wiki
+from lastfm.util import objectcache
+from lastfm.util import FileCache, RateLimiter, SingleFlight, ParsedCache, Histogram
+from lastfm.util.transport import Response, StreamingResponse
+from lastfm.error import InvalidParametersError, RateLimitExceededError, OperationFailedError
+from json_fixtures import JsonTransport
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+        super(CountingRateLimiter, self).__init__()
+        self.count = 0
+
+    def reserve(self):
+        self.count += 1
+        return super(CountingRateLimiter, self).reserve()
+
+class SlowRateLimiter(CountingRateLimiter):
+    def reserve(self):
+        super(SlowRateLimiter, self).reserve()
+        return 0.3
+
+class DictCache(object):
+    def __init__(self):
+        self.data = {}
+        self.times = {}
+
+    def Get(self, key):
+        return self.data.get(key)
+
+    def Set(self, key, data):
+        self.data[key] = data
+        self.times[key] = time.time()
+
+    def Remove(self, key):
+        self.data.pop(key, None)
+        self.times.pop(key, None)
+
+    def GetCachedTime(self, key):
+        return self.times.get(key)
+
+    def age(self, seconds):
+        for key in self.times:
+            self.times[key] -= seconds
+
+class FailingTransport(object):
+    def open(self, url, data = None, headers = None):
+        raise urllib2.URLError("unreachable")
+
+class ValidatingTransport(object):
+    body = '<lfm status="ok"><user><name>RJ</name></user></lfm>'
+
+    def __init__(self):
+        self.requests = []
+
+    def open(self, url, data = None, headers = None):
+        self.requests.append(headers)
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            return Response(304, {'etag': '"v1"'}, '')
+        return Response(200, {'etag': '"v1"'}, self.body)
+
+class ErrorTransport(object):
+    def __init__(self, code):
+        self.code = code
+        self.requests = 0
+
+    def open(self, url, data = None, headers = None):
+        self.requests += 1
+        return Response(400, {}, '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<lfm status="failed">\n<error code="%s">Error</error></lfm>' % self.code)
+
+class TestApi(unittest.TestCase):
+    """ A test class for the Api module. """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.api = Api(api_key, no_cache = True)
+        self.api.set_rate_limiter(CountingRateLimiter())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testFetchMany(self):
+        results = self.api.fetch_many([
+            {'method': 'artist.getInfo', 'artist': 'Bon Jovi'},
+            Artist(self.api, name = 'Bon Jovi'),
+            Track(self.api, name = 'No Artist', artist = None),
+            {'method': 'user.getInfo', 'user': 'RJ'},
+        ])
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0][0].findtext('artist/name'), 'Bon Jovi')
+        self.assertEqual(results[0][1], None)
+        self.assertEqual(results[1][0].stats.listeners, 718040)
+        self.assertEqual(results[2][0], None)
+        self.assert_(isinstance(results[2][1], Exception))
+        self.assertEqual(results[3][0].findtext('user/name'), 'RJ')
+
+    def _enable_cache(self):
+        self.api.set_cache(FileCache(self.cache_dir))
+        self.api._no_cache = False
+
+    def testFetchManyCacheHits(self):
+        self._enable_cache()
+        requests = [{'method': 'artist.getInfo', 'artist': 'Bon Jovi'},
+                    {'method': 'user.getInfo', 'user': 'RJ'}]
+        first = self.api.fetch_many(requests)
+        self.assertEqual(self.api.rate_limiter.count, 2)
+        second = self.api.fetch_many(requests)
+        self.assertEqual(self.api.rate_limiter.count, 2)
+        self.assertEqual([r.findtext('*/name') for (r, e) in first],
+                         [r.findtext('*/name') for (r, e) in second])
+
+    def testCachePolicy(self):
+        self.assertEqual(self.api.get_cache_timeout('auth.getSession'), 0)
+        self.assertEqual(self.api.get_cache_timeout('user.getRecentTracks'), 0)
+        self.assertEqual(self.api.get_cache_timeout('user.getInfo'), Api.DEFAULT_CACHE_TIMEOUT)
+        self.api.set_cache_timeout(60)
+        self.api.set_cache_policy('user.*', 10)
+        self.assertEqual(self.api.get_cache_timeout('user.getInfo'), 10)
+        self.assertEqual(self.api.get_cache_timeout('user.getRecentTracks'), 0)
+        self.api.set_cache_policy('user.*', None)
+        self.assertEqual(self.api.get_cache_timeout('user.getInfo'), 60)
+
+    def testCachePolicyAppliesToFetches(self):
+        self._enable_cache()
+        params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+        self.api._fetch_data(params)
+        self.api._fetch_data(params)
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        self.api.set_cache_policy('artist.getInfo', 0)
+        self.api._fetch_data(params)
+        self.assertEqual(self.api.rate_limiter.count, 2)
+
+    def testStaleWhileRevalidate(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        self.api._fetch_data(params)
+        cache.age(2*Api.DEFAULT_CACHE_TIMEOUT)
+        self.api.set_stale_while_revalidate(Api.DEFAULT_CACHE_TIMEOUT)
+        self.assertEqual(self.api._fetch_data(params).findtext('user/name'), 'RJ')
+        for i in xrange(100):
+            if self.api.rate_limiter.count == 2 and not self.api._revalidating:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.api.rate_limiter.count, 2)
+        self.assert_(time.time() - cache.times.values()[0] < 60)
+        self.api._fetch_data(params)
+        self.assertEqual(self.api.rate_limiter.count, 2)
+
+    def testStaleIfError(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        self.api._fetch_data(params)
+        cache.age(Api.DEFAULT_CACHE_TIMEOUT + 60)
+        self.api.set_transport(FailingTransport())
+        self.assertRaises(urllib2.URLError, self.api._fetch_data, params)
+        self.api.set_stale_if_error(Api.DEFAULT_CACHE_TIMEOUT)
+        self.assertEqual(self.api._fetch_data(params).findtext('user/name'), 'RJ')
+        cache.age(Api.DEFAULT_CACHE_TIMEOUT)
+        self.assertRaises(urllib2.URLError, self.api._fetch_data, params)
+
+    def testConditionalRevalidation(self):
+        self._enable_cache()
+        transport = ValidatingTransport()
+        self.api.set_transport(transport)
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        self.api._fetch_data(params)
+        self.assertEqual(transport.requests[0].get('If-None-Match'), None)
+        key = self.api._get_cache_key(Api.API_ROOT_URL, self.api._prepare_params(params))
+        then = time.time() - 2*Api.DEFAULT_CACHE_TIMEOUT
+        os.utime(self.api._cache._GetPath(key), (then, then))
+        self.assertEqual(self.api._fetch_data(params).findtext('user/name'), 'RJ')
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(transport.requests[1]['If-None-Match'], '"v1"')
+        self.assert_(time.time() - self.api._cache.GetCachedTime(key) < 60)
+
+    def testNegativeCaching(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        params = {'method': 'artist.getInfo', 'artist': 'Nobody'}
+        transport = ErrorTransport(6)
+        self.api.set_transport(transport)
+        self.assertRaises(InvalidParametersError, self.api._fetch_data, params)
+        self.assertRaises(InvalidParametersError, self.api._fetch_data, params)
+        self.assertEqual(transport.requests, 1)
+        cache.age(Api.DEFAULT_NEGATIVE_CACHE_TIMEOUT)
+        self.assertRaises(InvalidParametersError, self.api._fetch_data, params)
+        self.assertEqual(transport.requests, 2)
+
+    def testTransientErrorsAreNotCached(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+        transport = ErrorTransport(29)
+        self.api.set_transport(transport)
+        self.assertRaises(RateLimitExceededError, self.api._fetch_data, params)
+        self.assertRaises(RateLimitExceededError, self.api._fetch_data, params)
+        self.assertEqual(transport.requests, 2)
+        self.assertEqual(cache.data, {})
+
+    def testCacheKeyWithoutCredentials(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        other = Api('5678', no_cache = True)
+        other.set_cache(cache)
+        other._no_cache = False
+        other.set_rate_limiter(self.api.rate_limiter)
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        self.api._fetch_data(params)
+        self.assertEqual(other._fetch_data(params).findtext('user/name'), 'RJ')
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        self.assert_('api_key' not in cache.data.keys()[0])
+        signed = self.api._get_cache_key(Api.API_ROOT_URL,
+            {'method': 'user.getInfo', 'api_key': api_key, 'sk': 'x', 'api_sig': 'y'})
+        self.assert_('api_key' in signed and 'sk=x' in signed)
+
+    def testParsedCache(self):
+        cache = DictCache()
+        self.api.set_cache(cache)
+        self.api._no_cache = False
+        self.api.set_parsed_cache(ParsedCache())
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        first = self.api._fetch_data(params)
+        self.assert_(self.api._fetch_data(params) is first)
+        self.assert_(self.api.fetch_many([params])[0][0] is first)
+        self.assertEqual(self.api.parsed_cache.hits, 2)
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        method = self.api.stats()['methods']['user.getInfo']
+        self.assertEqual((method['parsed_hits'], method['misses']), (2, 1))
+        self.assertAlmostEqual(method['hit_ratio'], 2.0 / 3)
+
+    def testParsedCacheExpiry(self):
+        cache = ParsedCache(2)
+        cache.Set('a', 'element a', time.time() - 100)
+        self.assertEqual(cache.Get('a', 200), 'element a')
+        self.assertEqual(cache.Get('a', 50), None)
+        cache.Set('a', 'element a', time.time())
+        cache.Set('b', 'element b', time.time())
+        cache.Set('c', 'element c', time.time())
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.Get('a', 200), None)
+
+    def testConcurrentFetchesAreCoalesced(self):
+        self._enable_cache()
+        self.api.set_rate_limiter(SlowRateLimiter())
+        artists = []
+        def fetch():
+            artists.append(self.api._fetch_data({'method': 'artist.getInfo', 'artist': 'Bon Jovi'}))
+        threads = [threading.Thread(target = fetch) for i in xrange(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(artists), 5)
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        self.assertEqual(self.api.single_flight.executed, 1)
+        self.assertEqual(self.api.single_flight.coalesced, 4)
+        self.assertEqual(self.api.single_flight.in_flight(), 0)
+
+    def testSingleFlightSharesErrors(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+        def fail():
+            started.set()
+            release.wait()
+            raise ValueError("failed")
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError, e:
+                errors.append(e)
+        leader = threading.Thread(target = call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target = call)
+        follower.start()
+        while flight.coalesced < 1:
+            follower.join(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(errors), 2)
+        self.assert_(errors[0] is errors[1])
+
+class TestStats(unittest.TestCase):
+    """ A test class for the instrumentation of the Api. """
+
+    def setUp(self):
+        self.api = Api(api_key, no_cache = True)
+        self.api.set_rate_limiter(CountingRateLimiter())
+        self.cache = DictCache()
+        self.api.set_cache(self.cache)
+        self.api._no_cache = False
+
+    def testHitsAndMisses(self):
+        params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+        self.api._fetch_data(params)
+        self.api._fetch_data(params)
+        stats = self.api.stats()
+        method = stats['methods']['artist.getInfo']
+        self.assertEqual(method['misses'], 1)
+        self.assertEqual(method['hits'], 1)
+        self.assertEqual(method['requests'], 1)
+        self.assertEqual(method['hit_ratio'], 0.5)
+        self.assert_(method['bytes_downloaded'] > 0)
+        self.assertEqual(method['bytes_read'], method['bytes_downloaded'])
+        self.assertEqual(method['bytes_written'], method['bytes_downloaded'])
+        self.assertEqual(method['upstream_latency']['count'], 1)
+        self.assertEqual(method['rate_limit_wait']['count'], 1)
+        self.assertEqual(method['parse_latency']['count'], 2)
+        self.assertEqual(method['age']['count'], 1)
+        self.assertEqual(stats['total']['hits'], 1)
+        self.assertEqual(stats['single_flight']['executed'], 1)
+
+    def testStaleAndErrors(self):
+        self.api.set_stale_if_error(3600)
+        params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+        self.api._fetch_data(params)
+        self.cache.age(self.api.get_cache_timeout('artist.getInfo') + 60)
+        self.api.set_transport(FailingTransport())
+        self.api._fetch_data(params)
+        method = self.api.stats()['methods']['artist.getInfo']
+        self.assertEqual(method['stale'], 1)
+        self.assertEqual(method['errors'], 1)
+        self.assertEqual(method['misses'], 2)
+
+    def testResetStats(self):
+        self.api._fetch_data({'method': 'user.getInfo', 'user': 'RJ'})
+        self.api.reset_stats()
+        stats = self.api.stats()
+        self.assertEqual(stats['methods'], {})
+        self.assertEqual(stats['total']['misses'], 0)
+        self.assertEqual(stats['total']['hit_ratio'], None)
+
+    def testHistogram(self):
+        histogram = Histogram((1, 10))
+        for value in (0.5, 2, 20, 30):
+            histogram.record(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], [(1, 1), (10, 1), (None, 2)])
+        self.assertEqual(snapshot['min'], 0.5)
+        self.assertEqual(snapshot['max'], 30)
+        self.assertEqual(snapshot['mean'], 13.125)
+
+class StreamingTransport(object):
+    def __init__(self, body):
+        self.body = body
+        self.responses = []
+
+    def open_stream(self, url, data = None, headers = None):
+        response = StreamingResponse(200, {}, StringIO(self.body))
+        self.responses.append(response)
+        return response
+
+class TestStreaming(unittest.TestCase):
+    """ A test class for the streaming parse mode of the Api. """
+
+    def setUp(self):
+        self.api = Api(api_key, no_cache = True)
+        self.api.set_rate_limiter(CountingRateLimiter())
+        self.api.set_streaming(True)
+        self.other = Api(api_key, no_cache = True)
+
+    def testSameResults(self):
+        self.assertEqual(
+            [m.name for m in self.api.get_group('Rock').members[:10]],
+            [m.name for m in self.other.get_group('Rock').members[:10]])
+        self.assertEqual(
+            [(t.name, t.artist.name) for t in self.api.get_user('RJ').recent_tracks[:10]],
+            [(t.name, t.artist.name) for t in self.other.get_user('RJ').recent_tracks[:10]])
+        self.assertEqual(
+            [(t.name, t.stats.playcount) for t in self.api.get_user('RJ').library.tracks[10:20]],
+            [(t.name, t.stats.playcount) for t in self.other.get_user('RJ').library.tracks[10:20]])
+
+    def testIncremental(self):
+        body = '<?xml version="1.0" encoding="utf-8"?>\n<lfm status="ok">\n' \
+            '<members for="Big" page="1" perPage="5000" totalPages="1" total="5000">\n' + \
+            ''.join(['<user><name>user%d</name><url>http://www.last.fm/user/user%d</url>'
+                     '</user>\n' % (i, i) for i in range(5000)]) + '</members></lfm>'
+        transport = StreamingTransport(body)
+        self.api.set_transport(transport)
+        data, users = self.api._fetch_items(
+            {'method': 'group.getMembers', 'group': 'Big'}, 'members', 'user')
+        self.assertEqual(data.get('total'), '5000')
+        self.assertEqual(users.next().findtext('name'), 'user0')
+        self.assert_(transport.responses[0].bytes_read < len(body) / 2)
+        self.assert_(len(data) < 1000)
+        self.assertEqual(len(list(users)), 4999)
+        self.assertEqual(len(data), 0)
+        self.assertEqual(transport.responses[0].bytes_read, len(body))
+
+    def testCached(self):
+        self.api.set_cache(DictCache())
+        self.api._no_cache = False
+        params = {'method': 'group.getMembers', 'group': 'Rock'}
+        names = [u.findtext('name') for u in self.api._fetch_items(params, 'members', 'user')[1]]
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        self.api.set_transport(FailingTransport())
+        data, users = self.api._fetch_items(params, 'members', 'user')
+        self.assertEqual([u.findtext('name') for u in users], names)
+        self.assertEqual(self.api.rate_limiter.count, 1)
+
+    def testError(self):
+        self.api.set_transport(ErrorTransport(6))
+        self.assertRaises(InvalidParametersError, self.api._fetch_items,
+            {'method': 'group.getMembers', 'group': 'Nobody'}, 'members', 'user')
+
+def describe(value, depth = 0):
+    """The properties of the entities, as they have been read, to compare them."""
+    if isinstance(value, LastfmBase):
+        if depth > 2:
+            return repr(value)
+        value._hydrate()
+        assert '_source' not in value.__dict__
+        return dict([(p, describe(value.__dict__.get('_' + p), depth + 1))
+                     for p in value.Meta.properties +
+                     getattr(value.Meta, 'fillable_properties', [])])
+    if isinstance(value, (Stats, Wiki)):
+        return dict([(k, describe(v, depth + 1))
+                     for (k, v) in value.__dict__.items() if k != '_subject'])
+    if isinstance(value, (list, tuple)):
+        return [describe(v, depth) for v in value]
+    if hasattr(value, '__dict__'):
+        # like the library of a user, compared by identity
+        return repr(value)
+    return value
+
+class TestLazy(unittest.TestCase):
+    """ A test class for the lazy creation mode of the Api. """
+
+    def setUp(self):
+        self.api = Api(api_key, no_cache = True)
+        self.api.set_lazy(True)
+        self.other = Api(api_key, no_cache = True)
+
+    def assertSameResults(self, get):
+        objectcache._registry.clear()
+        results = list(get(self.api))
+        self.assert_(results)
+        self.assert_([r for r in results if '_source' in r.__dict__])
+        lazy = describe(results)
+        objectcache._registry.clear()
+        self.assertEqual(lazy, describe(list(get(self.other))))
+
+    def testSearch(self):
+        self.assertSameResults(lambda api: api.search_artist("Bon Jovi")[:10])
+        self.assertSameResults(lambda api: api.search_album("paradice")[:10])
+        self.assertSameResults(lambda api: api.search_track('baby')[:10])
+        self.assertSameResults(lambda api: api.search_tag('alternative')[:10])
+
+    def testChart(self):
+        def chart(api, kind):
+            user = api.get_user('RJ')
+            wc = user.weekly_chart_list[0]
+            return getattr(user, 'get_weekly_%s_chart' % kind)(wc.start, wc.end)
+        self.assertSameResults(lambda api: chart(api, 'album').albums[:10])
+        self.assertSameResults(lambda api: chart(api, 'artist').artists[:10])
+        self.assertSameResults(lambda api: chart(api, 'track').tracks[:10])
+
+    def testLibrary(self):
+        self.assertSameResults(lambda api: api.get_user('RJ').library.albums[10:20])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.artists[10:20])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.tracks[10:20])
+
+    def testEvent(self):
+        def events(api):
+            # the artist kept, as the artists of its events are looked up in the
+            # registry, which holds the objects weakly
+            self.artist = api.get_artist("Bon Jovi")
+            return self.artist.events
+        self.assertSameResults(events)
+        self.assertSameResults(lambda api: [api.get_event(216156)])
+
+class TestJson(unittest.TestCase):
+    """ A test class for the JSON format of the Api. """
+
+    def setUp(self):
+        self.api = Api(api_key, no_cache = True)
+        self.api.set_format('json')
+        self.api.set_transport(JsonTransport())
+        self.other = Api(api_key, no_cache = True)
+
+    def assertSameResults(self, get):
+        objectcache._registry.clear()
+        results = describe(list(get(self.api)))
+        self.assert_(results)
+        objectcache._registry.clear()
+        self.assertEqual(results, describe(list(get(self.other))))
+
+    def testArtist(self):
+        self.assertSameResults(lambda api: [api.get_artist('Bon Jovi')])
+        self.assertSameResults(lambda api: api.get_artist('Bon Jovi').similar[:10])
+        self.assertSameResults(lambda api: api.get_artist('Bon Jovi').top_tags[:10])
+        self.assertSameResults(lambda api: api.get_artist('Bon Jovi').top_albums[:10])
+        self.assertSameResults(lambda api: api.get_artist('Bon Jovi').top_tracks[:10])
+        self.assertSameResults(lambda api: api.get_artist('Bon Jovi').top_fans[:10])
+        self.assertSameResults(lambda api: api.search_artist('Bon Jovi')[:10])
+
+    def testAlbum(self):
+        self.assertSameResults(lambda api: [api.get_album('Supersonic', 'Oasis')])
+        self.assertSameResults(lambda api: api.search_album('paradice')[:10])
+
+    def testTrack(self):
+        self.assertSameResults(lambda api: [api.get_track('Lithium', 'Evanescence')])
+        self.assertSameResults(lambda api: api.get_track('Lithium', 'Evanescence').similar[:10])
+        self.assertSameResults(lambda api: api.get_track('Lithium', 'Evanescence').top_fans[:10])
+        self.assertSameResults(lambda api: api.search_track('baby')[:10])
+
+    def testUser(self):
+        self.assertSameResults(lambda api: [api.get_user('RJ')])
+        self.assertSameResults(lambda api: api.get_user('RJ').friends[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').neighbours[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').recent_tracks[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').loved_tracks[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').top_albums[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').top_artists[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').top_tracks[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').top_tags[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.albums[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.artists[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.tracks[:10])
+
+    def testTag(self):
+        self.assertSameResults(lambda api: api.get_tag('rock').similar[:10])
+        self.assertSameResults(lambda api: api.get_tag('rock').most_similar.top_albums[:10])
+        self.assertSameResults(lambda api: api.get_tag('rock').most_similar.top_artists[:10])
+        self.assertSameResults(lambda api: api.get_tag('rock').most_similar.top_tracks[:10])
+        self.assertSameResults(lambda api: api.get_global_top_tags()[:10])
+        self.assertSameResults(lambda api: api.search_tag('alternative')[:10])
+
+    def testEvent(self):
+        self.assertSameResults(lambda api: [api.get_event(216156)])
+        def events(api):
+            # the artist kept, as the artists of its events are looked up in the
+            # registry, which holds the objects weakly
+            self.artist = api.get_artist('Bon Jovi')
+            return self.artist.events
+        self.assertSameResults(events)
+
+    def testChart(self):
+        self.assertSameResults(lambda api: api.get_user('RJ').weekly_chart_list[:10])
+        def chart(api, kind):
+            user = api.get_user('RJ')
+            wc = user.weekly_chart_list[0]
+            return getattr(user, 'get_weekly_%s_chart' % kind)(wc.start, wc.end)
+        for kind in ('album', 'artist', 'track', 'tag'):
+            self.assertSameResults(lambda api: [chart(api, kind)])
+        self.assertSameResults(lambda api: chart(api, 'album').albums[:10])
+        self.assertSameResults(lambda api: chart(api, 'artist').artists[:10])
+        self.assertSameResults(lambda api: chart(api, 'track').tracks[:10])
+        self.assertSameResults(lambda api: chart(api, 'tag').tags[:10])
+
+    def testLazy(self):
+        self.api.set_lazy(True)
+        self.assertSameResults(lambda api: api.search_artist('Bon Jovi')[:10])
+        self.assertSameResults(lambda api: api.get_user('RJ').library.tracks[:10])
+
+    def testElement(self):
+        # laid out like a response of the web service
+        data = self.api._check_json('{"recenttracks": {"track": [{"name": "A", '
+            '"artist": {"#text": "X", "mbid": ""}, "@attr": {"nowplaying": "true"}}, '
+            '{"name": "B", "artist": {"#text": "Y", "mbid": "m"}, "image": '
+            '[{"#text": "", "size": "small"}, {"#text": "u", "size": "large"}]}], '
+            '"@attr": {"user": "RJ", "page": "1", "totalPages": "2"}}}')
+        tracks = data.find('recenttracks')
+        self.assertEqual(tracks.attrib['totalPages'], '2')
+        self.assertEqual([t.findtext('name') for t in tracks.findall('track')], ['A', 'B'])
+        self.assertEqual(data.findtext('recenttracks/track/artist'), 'X')
+        self.assertEqual(tracks.find('track').attrib['nowplaying'], 'true')
+        self.assertEqual(tracks.find('track').find('artist').get('mbid'), '')
+        second = tracks.findall('track')[1]
+        self.assertEqual(second.find('artist').attrib['mbid'], 'm')
+        self.assertEqual([(i.get('size'), i.text) for i in second.findall('image')],
+            [('small', None), ('large', 'u')])
+        self.assertEqual(second.findtext('mbid'), None)
+        self.assertEqual(second.findtext('image'), '')
+
+    def testError(self):
+        self.assertRaises(InvalidParametersError, self.api._check_json,
+            '{"error": 6, "message": "Artist not found"}')
+        self.assertRaises(OperationFailedError, self.api._check_json, '{"error')
+        self.assertEqual(self.api._get_error_code('{"error": 29, "message": "Slow down"}'), 29)
+        self.assertEqual(self.api._get_error_code('{"artist": {"name": "error"}}'), None)
+        self.api.set_transport(JsonTransport(ErrorTransport(6)))
+        self.assertRaises(InvalidParametersError, self.api._fetch_items,
+            {'method': 'group.getMembers', 'group': 'Nobody'}, 'members', 'user')
+
+    def testFormatParameter(self):
+        params = self.api._prepare_params({'method': 'auth.getSession', 'token': 't'})
+        self.assertEqual(params['format'], 'json')
+        params = self.api._prepare_params({'method': 'playlist.fetch'})
+        self.assert_('format' not in params)
+        self.assert_('format' not in self.other._prepare_params({'method': 'auth.getSession'}))
+        self.assertRaises(ValueError, self.api.set_format, 'yaml')
+
+from apikey import api_key
+
+if __name__ == '__main__':
+    unittest.main()
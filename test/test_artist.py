@@ -159,7 +159,7 @@ data = {
     'image': {'large': 'http://userserve-ak.last.fm/serve/126/24125.jpg',
              'medium': 'http://userserve-ak.last.fm/serve/64/24125.jpg',
              'small': 'http://userserve-ak.last.fm/serve/34/24125.jpg'},
-    'streamable': False
+    'streamable': True
 }
 
 for k,v in data.iteritems():
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import socket
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api, AsyncApi, Artist, User
+from lastfm.asyncapi import Request
+from lastfm.error import LastfmError
+from http_test_server import start_server
+
+class TestAsyncApi(unittest.TestCase):
+    """ A test class for the AsyncApi module. """
+
+    def setUp(self):
+        self.server = start_server()
+        self.root_url = Api.API_ROOT_URL
+        Api.API_ROOT_URL = self.server.root_url
+        self.api = AsyncApi(api_key, no_cache = True)
+        self.api.api.set_rate_limiter(None)
+
+    def tearDown(self):
+        self.api.close()
+        Api.API_ROOT_URL = self.root_url
+        self.server.shutdown()
+
+    def testGetArtist(self):
+        future = self.api.get_artist("Bon Jovi")
+        self.assertFalse(future.done())
+        self.api.run(timeout = 10)
+        artist = future.result()
+        self.assert_(isinstance(artist, Artist))
+        self.assertEqual(artist.stats.listeners, 718040)
+
+    def testConcurrentCalls(self):
+        results = []
+        futures = [self.api.get_artist("Bon Jovi", callback = results.append),
+                   self.api.get_user("RJ", callback = results.append)]
+        self.api.run(timeout = 10)
+        self.assertEqual(len(results), 2)
+        self.assert_(isinstance(futures[0].result(), Artist))
+        self.assert_(isinstance(futures[1].result(), User))
+        self.assertEqual(futures[1].result().name, 'RJ')
+
+    def testSteps(self):
+        steps = []
+        parsed = []
+        parse_response = self.api.api._parse_response
+        def count_parses(method, xml):
+            parsed.append(method)
+            return parse_response(method, xml)
+        self.api.api._parse_response = count_parses
+        def get_names(api, artist, user):
+            steps.append('start')
+            data = yield Request({'method': 'artist.getInfo', 'artist': artist})
+            steps.append('artist')
+            names = [data.findtext('artist/name')]
+            data = yield Request({'method': 'user.getInfo', 'user': user})
+            steps.append('user')
+            names.append(data.findtext('user/name'))
+            yield names
+        future = self.api.call(get_names, "Bon Jovi", "RJ")
+        self.api.run(timeout = 10)
+        self.assertEqual(future.result(), ['Bon Jovi', 'RJ'])
+        self.assertEqual(steps, ['start', 'artist', 'user'])
+        self.assertEqual(parsed, ['artist.getInfo', 'user.getInfo'])
+
+    def testErrorThrownIntoSteps(self):
+        cleaned_up = []
+        def get_name(api, artist):
+            try:
+                try:
+                    data = yield Request({'method': 'artist.getInfo', 'artist': artist})
+                except Exception, e:
+                    yield e
+            finally:
+                cleaned_up.append(artist)
+        future = self.api.call(get_name, "No Such Artist In Fixtures")
+        self.api.run(timeout = 10)
+        self.assert_(isinstance(future.result(), LastfmError))
+        self.assertEqual(cleaned_up, ["No Such Artist In Fixtures"])
+
+    def testKeepAlive(self):
+        for i in range(3):
+            future = self.api.get_artist("Bon Jovi")
+            self.api.run(timeout = 10)
+            self.assert_(isinstance(future.result(), Artist))
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def testResolve(self):
+        Api.API_ROOT_URL = self.server.root_url.replace('127.0.0.1', 'localhost')
+        future = self.api.get_artist("Bon Jovi")
+        self.api.run(timeout = 10)
+        self.assertEqual(future.result().name, "Bon Jovi")
+
+    def testErrorResponse(self):
+        future = self.api.get_artist("No Such Artist In Fixtures")
+        self.api.run(timeout = 10)
+        self.assert_(future.exception() is not None)
+
+    def testRequestTimeout(self):
+        # a server accepting the connections and never answering
+        stalled = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        stalled.bind(('127.0.0.1', 0))
+        stalled.listen(5)
+        Api.API_ROOT_URL = 'http://127.0.0.1:%s/2.0/' % stalled.getsockname()[1]
+        try:
+            self.api.set_request_timeout(0.2)
+            future = self.api.get_artist("Bon Jovi")
+            start = time.time()
+            self.api.run(timeout = 10)
+            self.assert_(time.time() - start < 5)
+            self.assert_(isinstance(future.exception(), socket.timeout))
+            self.assertFalse(self.api.loop.pending())
+        finally:
+            stalled.close()
+
+    def testSearch(self):
+        names = []
+        albums = self.api.search_album("paradice")
+        def collect(album):
+            names.append(album.name)
+            if len(names) < 10:
+                albums.next(collect)
+        albums.next(collect)
+        self.api.run(timeout = 10)
+        sync_api = Api(api_key, no_cache = True)
+        self.assertEqual(names,
+            [album.name for album in sync_api.search_album("paradice")[:10]])
+
+from apikey import api_key
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api
+from lastfm.util import CacheServer, CacheClient
+from lastfm.util.transport import Response
+
+class SlowTransport(object):
+    def __init__(self):
+        self.count = 0
+
+    def open(self, url, data = None, headers = None):
+        self.count += 1
+        time.sleep(0.2)
+        return Response(200, {}, '<lfm status="ok"><user><name>RJ</name></user></lfm>')
+
+class TestCacheServer(unittest.TestCase):
+    """ A test class for the cacheserver module. """
+
+    def setUp(self):
+        self.socket_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.socket_dir, 'cache.sock')
+        self.server = CacheServer(self.path)
+        self.server.start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.Close()
+        self.server.shutdown()
+        shutil.rmtree(self.socket_dir)
+
+    def _client(self):
+        client = CacheClient(self.path)
+        self.clients.append(client)
+        return client
+
+    def testGetSet(self):
+        cache = self._client()
+        self.assertEqual(cache.Get('http://a'), None)
+        self.assertEqual(cache.GetCachedTime('http://a'), None)
+        cache.Set('http://a', '<lfm status="ok"/>\n\x00')
+        self.assertEqual(cache.Get('http://a'), '<lfm status="ok"/>\n\x00')
+        self.assertEqual(self._client().Get('http://a'), '<lfm status="ok"/>\n\x00')
+        self.assert_(time.time() - cache.GetCachedTime('http://a') < 5)
+        cache.Remove('http://a')
+        self.assertEqual(cache.Get('http://a'), None)
+
+    def testValidators(self):
+        cache = self._client()
+        cache.Set('a', 'data a')
+        self.assertEqual(cache.GetValidators('a'), {})
+        cache.SetValidators('a', {'etag': '"v1"', 'last-modified': 'Mon, 01 Jun 2009'})
+        self.assertEqual(self._client().GetValidators('a'),
+            {'etag': '"v1"', 'last-modified': 'Mon, 01 Jun 2009'})
+        cached_time = cache.GetCachedTime('a')
+        time.sleep(0.01)
+        cache.Touch('a')
+        self.assert_(cache.GetCachedTime('a') > cached_time)
+
+    def testLease(self):
+        first, second = self._client(), self._client()
+        self.assert_(first.Acquire('a', 5))
+        results = []
+        waiter = threading.Thread(target = lambda: results.append(second.Acquire('a', 5)))
+        waiter.start()
+        time.sleep(0.1)
+        self.assertEqual(results, [])
+        first.Release('a')
+        waiter.join()
+        self.assertEqual(results, [False])
+        self.assert_(second.Acquire('a', 5))
+        self.assertEqual(first.Acquire('a', 0.05), False)
+
+    def testLeaseReleasedOnDisconnect(self):
+        first, second = self._client(), self._client()
+        self.assert_(first.Acquire('a', 5))
+        first.Close()
+        start = time.time()
+        if not second.Acquire('a', 5):
+            self.assert_(second.Acquire('a', 5))
+        self.assert_(time.time() - start < 2)
+
+    def testReconnect(self):
+        cache = self._client()
+        cache.Set('a', 'data a')
+        self.server.shutdown()
+        self.server = CacheServer(self.path)
+        self.server.start()
+        self.assertEqual(cache.Get('a'), None)
+
+    def testMalformedMessage(self):
+        errors = []
+        self.server._server.handle_error = lambda request, address: errors.append(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(self.path)
+        try:
+            sock.sendall('1\nnot a length\n')
+            self.assertEqual(sock.recv(100), '')
+        finally:
+            sock.close()
+        cache = self._client()
+        cache.Set('a', 'data a')
+        self.assertEqual(cache.Get('a'), 'data a')
+        self.assertEqual(errors, [])
+
+    def testServerRunning(self):
+        self.assertRaises(socket.error, CacheServer, self.path)
+
+    def testWithoutUnixSockets(self):
+        from lastfm.util import cacheserver
+        af_unix = socket.AF_UNIX
+        del socket.AF_UNIX
+        try:
+            reload(cacheserver)
+            self.assertRaises(NotImplementedError, cacheserver.CacheServer, self.path)
+            self.assertRaises(NotImplementedError, cacheserver.CacheClient, self.path)
+        finally:
+            socket.AF_UNIX = af_unix
+            reload(cacheserver)
+
+    def testSingleFetchAcrossApis(self):
+        transport = SlowTransport()
+        apis = []
+        for i in range(3):
+            api = Api('key', no_cache = True)
+            api.set_cache(self._client())
+            api.set_rate_limiter(None)
+            api.set_transport(transport)
+            api._no_cache = False
+            apis.append(api)
+        results = []
+        params = {'method': 'user.getInfo', 'user': 'RJ'}
+        threads = [threading.Thread(
+            target = lambda api = api: results.append(api._fetch_url(Api.API_ROOT_URL, params)))
+            for api in apis]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(transport.count, 1)
+        self.assertEqual(len(set(results)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import ZlibCodec, FileCache, SqliteCache
+
+class TestCompression(unittest.TestCase):
+    """ A test class for the compression module. """
+
+    xml = '<?xml version="1.0" encoding="utf-8"?>\n<lfm status="ok">' + \
+          '<track><name>Paradise</name></track>' * 100 + '</lfm>'
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testCodec(self):
+        codec = ZlibCodec(level = 9, threshold = 100)
+        encoded = codec.encode(self.xml)
+        self.assert_(encoded.startswith(ZlibCodec.MAGIC))
+        self.assert_(len(encoded) < len(self.xml) / 10)
+        self.assertEqual(ZlibCodec.decode(encoded), self.xml)
+        self.assertEqual(codec.encode('<lfm/>'), '<lfm/>')
+        self.assertEqual(ZlibCodec.decode('<lfm/>'), '<lfm/>')
+        self.assertRaises(ValueError, ZlibCodec, 10)
+
+    def testFileCache(self):
+        plain = FileCache(self.cache_dir)
+        plain.Set('old', self.xml)
+        cache = FileCache(self.cache_dir, codec = ZlibCodec())
+        cache.Set('new', self.xml)
+        self.assertEqual(cache.Get('old'), self.xml)
+        self.assertEqual(cache.Get('new'), self.xml)
+        self.assertEqual(plain.Get('new'), self.xml)
+        self.assert_(os.path.getsize(cache._GetPath('new')) < len(self.xml) / 10)
+
+    def testSqliteCache(self):
+        cache = SqliteCache(os.path.join(self.cache_dir, 'cache.sqlite'),
+            batch_size = 1, codec = ZlibCodec())
+        cache.Set('a', self.xml)
+        self.assertEqual(cache.Get('a'), self.xml)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import time
+from datetime import datetime
+import xml.etree.cElementTree as ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import dates
+from lastfm.util.dates import parse_date, parse_timestamp, parse_element_date
+
+class TestDates(unittest.TestCase):
+    """ A test class for the dates module. """
+
+    def setUp(self):
+        dates._memo.clear()
+
+    def testFormats(self):
+        for (text, format) in [('5 Mar 2009, 00:28', '%d %b %Y, %H:%M'),
+                               ('2008-11-24T07:03:59', '%Y-%m-%dT%H:%M:%S'),
+                               ('Sun, 1 Feb 2009 12:00:09', '%a, %d %b %Y %H:%M:%S'),
+                               ('Fri, 02 Jan 2009 23:53:53 +0000', '%a, %d %b %Y %H:%M:%S +0000'),
+                               ('Thu, 30 Apr 2009', '%a, %d %b %Y'),
+                               ('28 jul 1994,  00:00', '%d %b %Y, 00:00'),
+                               ('2009 063', '%Y %j')]:
+            self.assertEqual(parse_date(text, (format,)),
+                datetime(*time.strptime(text, format)[0:6]))
+
+    def testFallback(self):
+        formats = ('%a, %d %b %Y %H:%M:%S', '%a, %d %b %Y')
+        self.assertEqual(parse_date(' Thu, 30 Apr 2009 ', formats), datetime(2009, 4, 30))
+        self.assertEqual(parse_date('30 Foo 2009, 00:00', ('%d %b %Y, %H:%M',)), None)
+        self.assertEqual(parse_date('31 Feb 2009, 00:00', ('%d %b %Y, %H:%M',)), None)
+        self.assertEqual(parse_date('  ', formats), None)
+        self.assertEqual(parse_date(None, formats), None)
+
+    def testTimestamp(self):
+        self.assertEqual(parse_timestamp('1236212894'), datetime(2009, 3, 5, 0, 28, 14))
+        self.assertEqual(parse_timestamp(''), None)
+        elem = ElementTree.XML('<date uts="1236212894">5 Mar 2009, 00:28</date>')
+        self.assertEqual(parse_element_date(elem, ('%d %b %Y, %H:%M',)),
+                         datetime(2009, 3, 5, 0, 28, 14))
+        elem = ElementTree.XML('<date>5 Mar 2009, 00:28</date>')
+        self.assertEqual(parse_element_date(elem, ('%d %b %Y, %H:%M',)),
+                         datetime(2009, 3, 5, 0, 28))
+        self.assertEqual(parse_element_date(None, ('%d %b %Y, %H:%M',)), None)
+
+    def testMemo(self):
+        date = parse_date('5 Mar 2009, 00:28', ('%d %b %Y, %H:%M',))
+        self.assert_(parse_date('5 Mar 2009, 00:28', ('%d %b %Y, %H:%M',)) is date)
+        for i in xrange(dates.MAX_MEMO_ENTRIES + 10):
+            parse_date(str(i), ('%Y',))
+        self.assert_(len(dates._memo) <= dates.MAX_MEMO_ENTRIES)
+
+if __name__ == '__main__':
+    unittest.main()
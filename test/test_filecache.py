@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import FileCache
+
+class TestFileCache(unittest.TestCase):
+    """ A test class for the FileCache module. """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _age(self, cache, key, seconds):
+        path = cache._GetPath(key)
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+    def testFootprint(self):
+        cache = FileCache(self.cache_dir)
+        cache.Set('a', 'x'*10)
+        cache.Set('b', 'x'*20)
+        cache = FileCache(self.cache_dir)
+        self.assertEqual((cache.entries, cache.size), (2, 30))
+        cache.Set('a', 'x'*5)
+        cache.Remove('b')
+        self.assertEqual((cache.entries, cache.size), (1, 5))
+
+    def testMaxEntries(self):
+        cache = FileCache(self.cache_dir, max_entries = 3)
+        for key in 'abc':
+            cache.Set(key, 'data')
+        cache.Get('a')
+        cache.Set('d', 'data')
+        self.assert_(cache.entries <= 3)
+        self.assertEqual(cache.Get('a'), 'data')
+        self.assertEqual(cache.Get('b'), None)
+
+    def testMaxSizeEvictsExpiredFirst(self):
+        cache = FileCache(self.cache_dir, max_size = 100, max_age = 60)
+        cache.Set('old', 'x'*40)
+        cache.Set('new', 'x'*40)
+        cache.Rescan()
+        self._age(cache, 'old', 120)
+        cache.Rescan()
+        cache.Get('old')
+        cache.Set('newer', 'x'*40)
+        self.assertEqual(cache.Get('old'), None)
+        self.assertEqual(cache.Get('new'), 'x'*40)
+        self.assert_(cache.size <= 100)
+
+    def testCollect(self):
+        cache = FileCache(self.cache_dir, max_age = 60)
+        for key in 'abcd':
+            cache.Set(key, 'data')
+        self._age(cache, 'a', 120)
+        self._age(cache, 'c', 120)
+        cache.Rescan()
+        self.assertEqual(cache.Collect(limit = 2) + cache.Collect(limit = 2), 2)
+        self.assertEqual(cache.entries, 2)
+        self.assertEqual(cache.Get('a'), None)
+        self.assertEqual(cache.Get('b'), 'data')
+
+    def testBackgroundCollector(self):
+        cache = FileCache(self.cache_dir, max_age = 60)
+        cache.Set('a', 'data')
+        self._age(cache, 'a', 120)
+        cache.Rescan()
+        cache.StartCollector(interval = 0.01)
+        for i in xrange(100):
+            if not cache.entries:
+                break
+            time.sleep(0.01)
+        cache.StopCollector()
+        self.assertEqual(cache.entries, 0)
+
+    def testRemovedBehindTheCache(self):
+        cache = FileCache(self.cache_dir, max_entries = 10)
+        cache.Set('a', 'data')
+        cache.SetValidators('a', {'etag': '"1"'})
+        path = cache._GetPath('a')
+        os.remove(path)
+        os.remove(path + FileCache.VALIDATORS_SUFFIX)
+        self.assertEqual(cache.GetValidators('a'), {})
+        cache.Touch('a')
+        self.assertEqual(cache.GetCachedTime('a'), None)
+        self.assertEqual(cache.entries, 0)
+        cache.Set('a', 'data')
+        os.remove(path)
+        self.assertEqual(cache.Get('a'), None)
+        self.assertEqual(cache.entries, 0)
+        cache.Remove('a')
+
+    def testConcurrentRemoval(self):
+        cache = FileCache(self.cache_dir, max_entries = 10)
+        errors = []
+        stop = threading.Event()
+        def remove():
+            while not stop.isSet():
+                for key in 'abc':
+                    cache.Remove(key)
+        thread = threading.Thread(target = remove)
+        thread.start()
+        try:
+            for i in xrange(300):
+                for key in 'abc':
+                    try:
+                        cache.Set(key, 'data')
+                        self.assert_(cache.Get(key) in ('data', None))
+                        cache.GetCachedTime(key)
+                        cache.Touch(key)
+                    except (IOError, OSError), e:
+                        errors.append(e)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+
+if __name__ == '__main__':
+    unittest.main()
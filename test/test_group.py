@@ -16,6 +16,7 @@ wsgi_intercept.add_wsgi_intercept('ws.audioscrobbler.com', 80, create_wsgi_app)
     
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from lastfm import Api
+from lastfm.util import objectcache
 from apikey import api_key
 
 class TestGroup(unittest.TestCase):
@@ -121,7 +122,12 @@ class TestGroup(unittest.TestCase):
                 ('psychedelic', 61), 
                 ('thrash metal', 54), 
                 ('heavy metal', 47)]
+        # the tags were recorded with the artists of the album chart of the week,
+        # which have no chart stats, reused from the registry: kept here, instead
+        # of the ones left by the other tests, or none if they are collected
+        objectcache._registry.clear()
         wc = self.group.weekly_chart_list[0]
+        album_chart = self.group.get_weekly_album_chart(wc.start, wc.end)
         self.assertEqual(
              [(tag.name, tag.stats.count)
                 for tag
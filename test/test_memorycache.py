@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import FileCache, MemoryCache
+
+class CountingFileCache(FileCache):
+    def __init__(self, *args):
+        super(CountingFileCache, self).__init__(*args)
+        self.reads = 0
+
+    def Get(self, key):
+        self.reads += 1
+        return super(CountingFileCache, self).Get(key)
+
+    def GetCachedTime(self, key):
+        self.reads += 1
+        return super(CountingFileCache, self).GetCachedTime(key)
+
+class CountingLock(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.acquired += 1
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+class TestMemoryCache(unittest.TestCase):
+    """ A test class for the MemoryCache module. """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.backend = CountingFileCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testGetSet(self):
+        cache = MemoryCache(1024)
+        self.assertEqual(cache.Get('a'), None)
+        self.assertEqual(cache.GetCachedTime('a'), None)
+        cache.Set('a', 'data')
+        self.assertEqual(cache.Get('a'), 'data')
+        self.assert_(cache.GetCachedTime('a') is not None)
+        self.assertEqual(cache.size, 5)
+        cache.Remove('a')
+        self.assertEqual(cache.Get('a'), None)
+        self.assertEqual(cache.size, 0)
+
+    def testLruEviction(self):
+        cache = MemoryCache(25)
+        cache.Set('a', 'x'*9)
+        cache.Set('b', 'x'*9)
+        cache.Get('a')
+        cache.Set('c', 'x'*9)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.Get('b'), None)
+        self.assertEqual(cache.Get('a'), 'x'*9)
+        cache.Set('d', 'x'*100)
+        self.assertEqual(cache.Get('d'), None)
+        self.assert_(cache.size <= cache.max_bytes)
+
+    def testBackend(self):
+        cache = MemoryCache(1024, self.backend)
+        cache.Set('a', 'data')
+        self.assertEqual(self.backend.Get('a'), 'data')
+        cache = MemoryCache(1024, self.backend)
+        self.backend.reads = 0
+        self.assertEqual(cache.GetCachedTime('a'), self.backend.GetCachedTime('a'))
+        self.assertEqual(cache.Get('a'), 'data')
+        reads = self.backend.reads
+        self.assertEqual(cache.Get('a'), 'data')
+        cache.GetCachedTime('a')
+        self.assertEqual(self.backend.reads, reads)
+        cache.Remove('a')
+        self.assertEqual(self.backend.Get('a'), None)
+
+    def testLocking(self):
+        cache = MemoryCache(1024)
+        cache.Set('a', 'data')
+        cache._lock = lock = CountingLock()
+        for call in (lambda: cache.GetCachedTime('a'),
+                     lambda: cache.SetValidators('a', {'etag': '"1"'}),
+                     lambda: cache.GetValidators('a'),
+                     lambda: cache.Touch('a')):
+            acquired = lock.acquired
+            call()
+            self.assertEqual(lock.acquired, acquired + 1)
+        self.assertEqual(cache.GetValidators('a'), {'etag': '"1"'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import time
+from threading import Thread
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api
+from lastfm.util import RateLimiter
+
+class TestRateLimiter(unittest.TestCase):
+    """ A test class for the RateLimiter module. """
+
+    def testUnlimited(self):
+        limiter = RateLimiter()
+        for i in xrange(100):
+            self.assertEqual(limiter.reserve(), 0)
+
+    def testBurst(self):
+        limiter = RateLimiter(rate = 10, burst = 3)
+        self.assertEqual([limiter.reserve() for i in xrange(3)], [0, 0, 0])
+        self.assert_(0.09 < limiter.reserve() <= 0.1)
+        self.assert_(0.19 < limiter.reserve() <= 0.2)
+
+    def testConcurrentRequestsInFlight(self):
+        limiter = RateLimiter(rate = 100, burst = 4)
+        in_flight = []
+        def request():
+            limiter.wait()
+            in_flight.append(1)
+            time.sleep(0.2)
+        threads = [Thread(target = request) for i in xrange(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        self.assertEqual(len(in_flight), 4)
+        for t in threads:
+            t.join()
+
+    def testSharedPerApiKey(self):
+        self.assert_(Api('abcd', no_cache = True).rate_limiter is Api('abcd', no_cache = True).rate_limiter)
+        self.assert_(Api('abcd', no_cache = True).rate_limiter is not Api('efgh', no_cache = True).rate_limiter)
+
+if __name__ == '__main__':
+    unittest.main()
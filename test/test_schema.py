@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+from datetime import datetime
+import xml.etree.cElementTree as ElementTree
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.base import LastfmBase
+from lastfm.mixin import property_adder
+from lastfm.util import Schema, JsonElement
+from lastfm.util.jsontree import json
+from lastfm.util.schema import Arg, Compute, Const, Date, Element, Elements, Entity, \
+    EntityList, Flag, Images, Int, Float, Ref, Text, Timestamp
+
+XML = """<artist rank="2">
+  <name>Bon Jovi</name>
+  <streamable>1</streamable>
+  <listeners>  </listeners>
+  <playcount>0</playcount>
+  <image size="small">s.jpg</image>
+  <image size="large">l.jpg</image>
+  <point xmlns="http://www.w3.org/2003/01/geo/wgs84_pos#"><lat>40.5</lat></point>
+  <published>Sun, 1 Feb 2009 12:00:00 +0000</published>
+  <similar>
+    <artist><name>Europe</name></artist>
+    <artist><name>Poison</name></artist>
+  </similar>
+  <chart from="1233403200" to="1234008000"/>
+</artist>"""
+
+# the same artist, as the web service gives it in the JSON format
+JSON = """{"name": "Bon Jovi", "streamable": "1", "listeners": "  ", "playcount": "0",
+  "image": [{"#text": "s.jpg", "size": "small"}, {"#text": "l.jpg", "size": "large"}],
+  "geo:point": {"geo:lat": "40.5"},
+  "published": "Sun, 1 Feb 2009 12:00:00 +0000",
+  "similar": {"artist": [{"name": "Europe"}, {"name": "Poison"}]},
+  "chart": {"#text": "", "from": "1233403200", "to": "1234008000"},
+  "@attr": {"rank": "2"}}"""
+
+class LazyApi(object):
+    def __init__(self, lazy):
+        self._lazy = lazy
+
+@property_adder
+class Entry(LastfmBase):
+    class Meta(object):
+        properties = ["name", "rank", "similar"]
+        key_properties = ["name"]
+
+    def __init__(self, api, **kwargs):
+        self.init(api, **kwargs)
+
+    def init(self, api, **kwargs):
+        Entry.inits += 1
+        super(Entry, self).init(**kwargs)
+
+Entry.inits = 0
+
+class TestSchema(unittest.TestCase):
+    """ A test class for the schema module. """
+
+    def setUp(self):
+        self.elem = ElementTree.XML(XML)
+        self.json = JsonElement('artist', json.loads(JSON))
+
+    def fields(self):
+        return Schema(dict, {
+            'name':       'name',
+            'rank':       Int('@rank'),
+            'streamable': Flag('streamable'),
+            'listeners':  Int('listeners'),
+            'playcount':  Int('playcount'),
+            'missing':    Text('missing/name'),
+            'image':      Images(),
+            'latitude':   Float('{http://www.w3.org/2003/01/geo/wgs84_pos#}point/'
+                                '{http://www.w3.org/2003/01/geo/wgs84_pos#}lat'),
+            'published':  Date('published', '%d %b %Y', '%a, %d %b %Y %H:%M:%S +0000'),
+            'start':      Timestamp('chart@from'),
+            'end':        Timestamp('missing@to'),
+            }, args = ())
+
+    def entities(self):
+        similar = Schema(lambda api, **kwargs: (api, kwargs), {
+            'name':   'name',
+            'rank':   Arg('rank'),
+            }, params = ('api', 'rank'))
+        return Schema(dict, {
+            '_name':   'name',
+            'upper':   Compute(lambda n: n.upper(), Ref('_name')),
+            'similar': EntityList(similar, 'similar/artist', rank = Ref('upper')),
+            'first':   Entity(similar, 'similar/artist', rank = Const(1)),
+            'group':   Entity(similar, 'group', default = 'none'),
+            }, args = ())
+
+    def testFields(self):
+        self.assertEqual(self.fields()(self.elem), {
+            'name': 'Bon Jovi', 'rank': 2, 'streamable': True, 'listeners': None,
+            'playcount': 0, 'missing': None,
+            'image': {'small': 's.jpg', 'large': 'l.jpg'}, 'latitude': 40.5,
+            'published': datetime(2009, 2, 1, 12, 0, 0),
+            'start': datetime(2009, 1, 31, 12, 0, 0), 'end': None})
+
+    def testEntities(self):
+        self.assertEqual(self.entities()(self.elem, 'API'), {
+            'upper': 'BON JOVI',
+            'similar': [('API', {'name': 'Europe', 'rank': 'BON JOVI'}),
+                        ('API', {'name': 'Poison', 'rank': 'BON JOVI'})],
+            'first': ('API', {'name': 'Europe', 'rank': 1}),
+            'group': 'none'})
+
+    def testExtend(self):
+        schema = Schema(dict, {'name': 'name'}, args = ())
+        extended = schema.extend({'rank': Int('@rank')}, params = ('api', 'subject'))
+        self.assertEqual(schema(self.elem), {'name': 'Bon Jovi'})
+        self.assertEqual(extended(self.elem), {'name': 'Bon Jovi', 'rank': 2})
+        self.assertEqual(extended.params, ('api', 'subject'))
+        self.assert_('def extract(elem, api=None, subject=None)' in extended.source)
+        last = schema.extend(element_last = True)
+        self.assertEqual(last(None, self.elem), {'name': 'Bon Jovi'})
+        self.assert_('def extract(api, elem)' in last.source)
+        self.assertEqual(last.extend().element_last, False)
+
+    def testLazy(self):
+        schema = Schema(Entry, {
+            'name':    'name',
+            'rank':    Int('@rank'),
+            'similar': EntityList(Schema(Entry, {'name': 'name', 'rank': Int('@rank')}),
+                                  'similar/artist'),
+            })
+        self.assertEqual(schema.keys, ('name',))
+        self.assertEqual(Schema(dict, {'name': 'name'}, args = ()).keys, None)
+        eager = schema(self.elem, LazyApi(False))
+        self.assert_('_source' not in eager.__dict__)
+        entry = schema(self.elem, LazyApi(True))
+        self.assertEqual(entry.name, 'Bon Jovi')
+        self.assert_('_source' in entry.__dict__ and '_rank' not in entry.__dict__)
+        # the texts of the other fields are recorded, not the element
+        self.assertFalse([v for v in entry._source if ElementTree.iselement(v)])
+        inits = Entry.inits
+        self.assertEqual(entry.rank, 2)
+        self.assert_('_source' not in entry.__dict__)
+        self.assertEqual(Entry.inits, inits)
+        self.assertEqual([(e.name, e.rank) for e in entry.similar],
+                         [(e.name, e.rank) for e in eager.similar])
+        last = schema.extend(element_last = True)(LazyApi(True), self.elem)
+        self.assert_('_source' in last.__dict__)
+        self.assertEqual(last.rank, 2)
+
+    def testJson(self):
+        for schema in (self.fields(), self.entities()):
+            self.assertEqual(schema(self.json, 'API'), schema(self.elem, 'API'))
+            # the values are read by the compiled function, not through the view
+            self.assert_(schema._json_extract is not None)
+        elements = Schema(dict, {'similar': Elements('similar/artist'),
+                                 'chart':   Element('chart')}, args = ())(self.json)
+        self.assertEqual([e.findtext('name') for e in elements['similar']],
+                         ['Europe', 'Poison'])
+        self.assertEqual(elements['chart'].get('from'), '1233403200')
+        schema = Schema(Entry, {'name': 'name', 'rank': Int('@rank'), 'image': Images()})
+        entry = schema(self.json, LazyApi(True))
+        self.assert_('_source' in entry.__dict__)
+        self.assertFalse([v for v in entry._source if isinstance(v, (dict, JsonElement))])
+        self.assertEqual((entry.name, entry.rank), ('Bon Jovi', 2))
+
+    def testErrors(self):
+        self.assertRaises(ValueError, Schema, dict, {'a': Ref('b')}, args = ())
+        self.assertRaises(ValueError, Schema, dict, {'a': Ref('a')}, args = ())
+        self.assertRaises(ValueError, Schema, dict, {'a': Arg('subject')}, args = ())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import FileCache, SqliteCache, ZlibCodec, SnapshotReader, \
+    export_snapshot, import_snapshot
+
+class TestSnapshot(unittest.TestCase):
+    """ A test class for the snapshot module. """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'cache.snapshot')
+        self.source = FileCache(os.path.join(self.temp_dir, 'source'), codec = ZlibCodec())
+        self.source.Set('http://a', '<lfm status="ok">%s</lfm>' % ('a' * 5000))
+        self.source.SetValidators('http://a', {'etag': '"v1"'})
+        self.source.Set('http://b', '<lfm status="ok"/>')
+        self.a_time = self.source.GetCachedTime('http://a')
+        os.utime(self.source._GetPath('http://b'), (time.time() - 7200, time.time() - 7200))
+        self.b_time = self.source.GetCachedTime('http://b')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def testExportImport(self):
+        self.assertEqual(export_snapshot(self.source, self.path), 2)
+        for target in (FileCache(os.path.join(self.temp_dir, 'target')),
+                       SqliteCache(os.path.join(self.temp_dir, 'target.sqlite'))):
+            self.assertEqual(import_snapshot(self.path, target), (2, 0))
+            self.assertEqual(target.Get('http://a'), self.source.Get('http://a'))
+            self.assertEqual(target.Get('http://b'), '<lfm status="ok"/>')
+            self.assertAlmostEqual(target.GetCachedTime('http://a'), self.a_time, 2)
+            self.assertAlmostEqual(target.GetCachedTime('http://b'), self.b_time, 2)
+            self.assertEqual(target.GetValidators('http://a'), {'etag': '"v1"'})
+            self.assertEqual(target.GetValidators('http://b'), {})
+            self.assertEqual(import_snapshot(self.path, target), (0, 2))
+
+    def testMaxAge(self):
+        self.assertEqual(export_snapshot(self.source, self.path, max_age = 3600), 1)
+        export_snapshot(self.source, self.path)
+        target = FileCache(os.path.join(self.temp_dir, 'target'))
+        self.assertEqual(import_snapshot(self.path, target, max_age = 3600), (1, 1))
+        self.assertEqual(target.Get('http://b'), None)
+
+    def testReader(self):
+        export_snapshot(SqliteCache(os.path.join(self.temp_dir, 'empty.sqlite')), self.path)
+        self.assertEqual(len(SnapshotReader(self.path)), 0)
+        export_snapshot(self.source, self.path)
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(len(list(reader)), 2)
+        cached_time, data, validators = reader.Get('http://a')
+        self.assertEqual(data, self.source.Get('http://a'))
+        self.assertEqual(validators, {'etag': '"v1"'})
+        self.assertEqual(reader.Get('http://c'), None)
+        reader.Close()
+        self.assert_(os.path.getsize(self.path) < 1000)
+
+    def testTruncated(self):
+        export_snapshot(self.source, self.path)
+        data = open(self.path, 'rb').read()
+        open(self.path, 'wb').write(data[:-10])
+        self.assertRaises(ValueError, SnapshotReader, self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm.util import SqliteCache
+
+class SlowSqliteCache(SqliteCache):
+    """A cache whose commits wait for a go, to be seen while they are made."""
+    def __init__(self, *args, **kwargs):
+        super(SlowSqliteCache, self).__init__(*args, **kwargs)
+        self.writing = threading.Event()
+        self.go = threading.Event()
+
+    def _executemany(self, sql, rows):
+        self.writing.set()
+        self.go.wait()
+        super(SlowSqliteCache, self)._executemany(sql, rows)
+
+class TestSqliteCache(unittest.TestCase):
+    """ A test class for the SqliteCache module. """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testGetSet(self):
+        cache = SqliteCache(self.path)
+        self.assertEqual(cache.Get('http://a'), None)
+        self.assertEqual(cache.GetCachedTime('http://a'), None)
+        cache.Set('http://a', '<lfm status="ok"/>')
+        self.assertEqual(cache.Get('http://a'), '<lfm status="ok"/>')
+        self.assert_(cache.GetCachedTime('http://a') is not None)
+        cache.Remove('http://a')
+        self.assertEqual(cache.Get('http://a'), None)
+
+    def testBatchedWrites(self):
+        cache = SqliteCache(self.path, batch_size = 3, flush_interval = 60)
+        other = SqliteCache(self.path)
+        cache.Set('a', 'data a')
+        cache.Set('b', 'data b')
+        self.assertEqual(cache.Get('a'), 'data a')
+        self.assertEqual(other.Get('a'), None)
+        cache.Set('c', 'data c')
+        self.assertEqual(other.Get('a'), 'data a')
+        cache.Set('d', 'data d')
+        cache.Flush()
+        self.assertEqual(other.Get('d'), 'data d')
+
+    def testFlushInterval(self):
+        cache = SqliteCache(self.path, batch_size = 10, flush_interval = 0.2)
+        other = SqliteCache(self.path)
+        cache.Set('a', 'data a')
+        self.assertEqual(other.Get('a'), None)
+        time.sleep(1)
+        self.assertEqual(other.Get('a'), 'data a')
+
+    def testValidators(self):
+        cache = SqliteCache(self.path, batch_size = 2)
+        cache.Set('a', 'data a')
+        cache.SetValidators('a', {'etag': '"v1"'})
+        self.assertEqual(cache.GetValidators('a'), {'etag': '"v1"'})
+        cache.Flush()
+        cache.Touch('a')
+        other = SqliteCache(self.path)
+        self.assertEqual(other.GetValidators('a'), {'etag': '"v1"'})
+        self.assertEqual(other.GetValidators('b'), {})
+
+    def testExpire(self):
+        cache = SqliteCache(self.path, batch_size = 1)
+        cache.Set('a', 'data a')
+        self.assertEqual(cache.Expire(60), 0)
+        self.assertEqual(cache.Expire(-1), 1)
+        self.assertEqual(cache.Get('a'), None)
+
+    def testThreads(self):
+        cache = SqliteCache(self.path, batch_size = 5)
+        errors = []
+        def work(n):
+            try:
+                for i in xrange(20):
+                    cache.Set('%s-%s' % (n, i), 'x' * i)
+                    cache.Get('%s-%s' % (n, i/2))
+                cache.Flush()
+            except Exception, e:
+                errors.append(e)
+        threads = [threading.Thread(target = work, args = (n,)) for n in xrange(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(SqliteCache(self.path).Get('3-19'), 'x' * 19)
+
+    def testVisibleWhileFlushed(self):
+        cache = SlowSqliteCache(self.path, flush_interval = 60)
+        cache.Set('a', 'old')
+        first = threading.Thread(target = cache.Flush)
+        first.start()
+        cache.writing.wait()
+        self.assertEqual(cache.Get('a'), 'old')
+        self.assert_(cache.GetCachedTime('a') is not None)
+        cache.Set('a', 'new')
+        second = threading.Thread(target = cache.Flush)
+        second.start()
+        cache.go.set()
+        first.join()
+        second.join()
+        self.assertEqual(SqliteCache(self.path).Get('a'), 'new')
+
+    def testFlusherThread(self):
+        def flushers():
+            return [t for t in threading.enumerate() if t.getName() == 'SqliteCache flusher']
+        before = len(flushers())
+        cache = SqliteCache(self.path, batch_size = 100, flush_interval = 0.05)
+        for i in xrange(5):
+            cache.Set('key %d' % i, 'data')
+            time.sleep(0.02)
+        self.assertEqual(len(flushers()), before + 1)
+        time.sleep(0.3)
+        self.assertEqual(SqliteCache(self.path).Get('key 4'), 'data')
+        cache.Close()
+        self.assertEqual(len(flushers()), before)
+        cache.Set('key', 'data')
+        del cache
+        for i in xrange(100):
+            if len(flushers()) == before:
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(flushers()), before)
+
+if __name__ == '__main__':
+    unittest.main()
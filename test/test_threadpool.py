@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import threading
+from threading import Event
+
+from wsgi_intercept.urllib2_intercept import install_opener
+import wsgi_intercept
+from wsgi_test_app import create_wsgi_app
+
+install_opener()
+wsgi_intercept.add_wsgi_intercept('ws.audioscrobbler.com', 80, create_wsgi_app)
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api, Artist
+from lastfm.util import ThreadPool, CancelledError
+
+class TestThreadPool(unittest.TestCase):
+    """ A test class for the ThreadPool module. """
+
+    def testSubmit(self):
+        pool = ThreadPool(2)
+        futures = [pool.submit(lambda x: x*x, i) for i in xrange(10)]
+        self.assertEqual([f.result(timeout = 5) for f in futures], [i*i for i in xrange(10)])
+        pool.shutdown()
+        self.assert_(len(pool._threads) <= 2)
+
+    def testException(self):
+        pool = ThreadPool(1)
+        future = pool.submit(int, 'x')
+        self.assert_(isinstance(future.exception(timeout = 5), ValueError))
+        self.assertRaises(ValueError, future.result)
+        pool.shutdown()
+
+    def testTimeoutAndCancel(self):
+        pool = ThreadPool(1)
+        gate = Event()
+        blocker = pool.submit(gate.wait)
+        waiting = pool.submit(lambda: 1)
+        self.assertRaises(RuntimeError, waiting.result, 0.05)
+        self.assertFalse(blocker.cancel())
+        self.assert_(waiting.cancel())
+        self.assert_(waiting.cancelled())
+        self.assertRaises(CancelledError, waiting.result)
+        gate.set()
+        pool.shutdown()
+
+    def testDoneCallback(self):
+        pool = ThreadPool(1)
+        done = []
+        future = pool.submit(lambda: 42)
+        future.result(timeout = 5)
+        future.add_done_callback(lambda f: done.append(f.result()))
+        self.assertEqual(done, [42])
+        pool.shutdown()
+
+    def testAsyncCallbackUsesDefaultPool(self):
+        ThreadPool.set_default_size(2)
+        api = Api(api_key, no_cache = True)
+        results = []
+        threads = threading.activeCount()
+        futures = [api.get_artist("Bon Jovi", callback = results.append) for i in xrange(6)]
+        artists = [f.result(timeout = 10) for f in futures]
+        self.assert_(threading.activeCount() <= threads + 2)
+        self.assertEqual(artists, [artists[0]]*6)
+        self.assert_(isinstance(artists[0], Artist))
+        ThreadPool.get_default().shutdown()
+        self.assertEqual(len(results), 6)
+
+from apikey import api_key
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import httplib
+import socket
+import urllib2
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api
+from lastfm.util import UrllibTransport, PooledTransport
+from http_test_server import start_server
+
+class DroppedConnection(httplib.HTTPConnection):
+    """A connection dropped by the server once it is kept alive."""
+    def request(self, *args, **kwargs):
+        if self.sock is not None:
+            raise socket.error("connection reset by peer")
+        httplib.HTTPConnection.request(self, *args, **kwargs)
+
+class TestTransport(unittest.TestCase):
+    """ A test class for the transport module. """
+
+    def setUp(self):
+        self.server = start_server()
+        self.params = {'method': 'artist.getInfo', 'artist': 'Bon Jovi'}
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def _fetch(self, transport, n):
+        api = Api(api_key, no_cache = True)
+        api.set_rate_limiter(None)
+        api.set_transport(transport)
+        return [api._fetch_url(self.server.root_url, self.params) for i in xrange(n)]
+
+    def testUrllibTransport(self):
+        data = self._fetch(UrllibTransport(), 3)
+        self.assert_('<name>Bon Jovi</name>' in data[0])
+        self.assertEqual(self.server.connections, 3)
+
+    def testPooledTransportReusesConnection(self):
+        data = self._fetch(PooledTransport(), 5)
+        self.assertEqual(data, [data[0]]*5)
+        self.assert_('<name>Bon Jovi</name>' in data[0])
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def testPooledTransportIdleTimeout(self):
+        self._fetch(PooledTransport(idle_timeout = -1), 3)
+        self.assertEqual(self.server.connections, 3)
+
+    def testPooledTransportErrorResponse(self):
+        response = PooledTransport().open(self.server.root_url + '?method=artist.getInfo')
+        self.assertEqual(response.status, 400)
+        self.assert_('<error code="6">' in response.body)
+
+    def testPooledTransportDroppedConnection(self):
+        transport = PooledTransport()
+        api = Api(api_key, no_cache = True)
+        api.set_rate_limiter(None)
+        api.set_transport(transport)
+        api._fetch_url(self.server.root_url, self.params)
+        for pool in transport._pools.values():
+            for (conn, last_used) in pool:
+                conn.sock.close()
+        self.assert_('<name>Bon Jovi</name>' in api._fetch_url(self.server.root_url, self.params))
+
+    def testPooledTransportRetriesOnlyReads(self):
+        transport = PooledTransport(connection_class = DroppedConnection)
+        url = self.server.root_url + '?api_key=%s&artist=Bon+Jovi&method=artist.getInfo' % api_key
+        for i in xrange(2):
+            self.assert_('<name>Bon Jovi</name>' in transport.open(url).body)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.server.connections, 2)
+        self.assertRaises(urllib2.URLError, transport.open, url, 'method=track.love')
+        self.assertEqual(self.server.requests, 2)
+
+    def testPooledTransportStream(self):
+        transport = PooledTransport()
+        url = self.server.root_url + '?api_key=%s&artist=Bon+Jovi&method=artist.getInfo' % api_key
+        for i in xrange(3):
+            response = transport.open_stream(url)
+            self.assertEqual(response.status, 200)
+            self.assert_('<name>Bon Jovi</name>' in response.read())
+            self.assert_(response.read() == '' and response.complete)
+            response.close()
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+
+from apikey import api_key
+
+if __name__ == '__main__':
+    unittest.main()
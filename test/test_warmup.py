@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+__author__ = "Abhinav Sarkar <abhinav@abhinavsarkar.net>"
+__version__ = "0.2"
+__license__ = "GNU Lesser General Public License"
+
+import unittest
+import sys, os
+import shutil
+import tempfile
+
+from wsgi_intercept.urllib2_intercept import install_opener
+import wsgi_intercept
+from wsgi_test_app import create_wsgi_app
+
+install_opener()
+wsgi_intercept.add_wsgi_intercept('ws.audioscrobbler.com', 80, create_wsgi_app)
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from lastfm import Api
+from lastfm.util import FileCache
+from lastfm.warmup import read_manifest, warm_up
+from test_api import CountingRateLimiter
+
+class TestWarmup(unittest.TestCase):
+    """ A test class for the warmup module. """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.cache_dir, 'warmup.ckpt')
+        self.api = Api(api_key)
+        self.api.set_cache(FileCache(os.path.join(self.cache_dir, 'cache')))
+        self.api.set_rate_limiter(CountingRateLimiter())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def testReadManifest(self):
+        requests = read_manifest([
+            '# artists',
+            'artist Bon Jovi',
+            '',
+            'album Bon Jovi\tCrush',
+            'chart user RJ',
+            'method=artist.getTopTracks&artist=Bon+Jovi',
+        ])
+        self.assertEqual(requests, [
+            {'method': 'artist.getInfo', 'artist': 'Bon Jovi'},
+            {'method': 'album.getInfo', 'artist': 'Bon Jovi', 'album': 'Crush'},
+            {'method': 'user.getWeeklyChartList', 'user': 'RJ'},
+            {'method': 'user.getWeeklyArtistChart', 'user': 'RJ'},
+            {'method': 'artist.getTopTracks', 'artist': 'Bon Jovi'},
+        ])
+        self.assertRaises(ValueError, read_manifest, ['singer Bon Jovi'])
+
+    def testWarmUpAndResume(self):
+        requests = read_manifest(['artist Bon Jovi', 'user RJ'])
+        progress = []
+        def interrupt(*args):
+            progress.append(args)
+            raise KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, warm_up, self.api, requests, self.checkpoint,
+            batch_size = 1, report = interrupt)
+        self.assertEqual(len(progress), 1)
+        self.assertEqual(progress[0][:3], (1, 2, 0))
+        done, errors = warm_up(self.api, requests, self.checkpoint, batch_size = 1)
+        self.assertEqual((done, errors), (2, 0))
+        self.assertEqual(self.api.rate_limiter.count, 2)
+        self.assertEqual(open(self.checkpoint).read().split()[1], '2')
+        self.api._fetch_data(requests[0])
+        self.api._fetch_data(requests[1])
+        self.assertEqual(self.api.rate_limiter.count, 2)
+
+    def testCheckpointOfAnotherManifest(self):
+        requests = read_manifest(['artist Bon Jovi', 'user RJ'])
+        warm_up(self.api, requests[:1], self.checkpoint, batch_size = 1)
+        self.assertEqual(self.api.rate_limiter.count, 1)
+        # the checkpoint of the first call is not taken for the reordered calls
+        done, errors = warm_up(self.api, list(reversed(requests)), self.checkpoint,
+            batch_size = 1)
+        self.assertEqual((done, errors), (2, 0))
+        self.assertEqual(self.api.rate_limiter.count, 2)
+
+from apikey import api_key
+
+if __name__ == '__main__':
+    unittest.main()